@@ -1,6 +1,8 @@
+from common.utils.query_budget import EndpointBudget, QueryBudgetMixin
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 from store.models import Category
 
 from .models import Address, CustomUser
@@ -90,3 +92,66 @@ class AccountsAPITestCase(APITestCase):
         response = self.client.patch(url, patch_data, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["data"]["full_name"], "Patch Name")
+
+
+class AccountsQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    urls_module = "accounts.urls"
+    namespace = "accounts"
+    budgets = [
+        EndpointBudget("register-seller", 4, seed="seed_registration", method="post"),
+        EndpointBudget("token_obtain_pair", 2, seed="seed_login", method="post"),
+        EndpointBudget("token_refresh", 2, seed="seed_token_refresh", method="post"),
+        EndpointBudget("token_verify", 0, seed="seed_token_verify", method="post"),
+        EndpointBudget("account-me", 1, seed="seed_sellers", user="user"),
+        EndpointBudget("account-edit", 1, seed="seed_account_edit", method="patch", user="user"),
+    ]
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Test Category")
+        self.user = CustomUser.objects.create_user(
+            phone_number="998900000000",
+            full_name="Budget Seller",
+            password="testpassword",
+            is_active=True,
+            address=Address.objects.create(name="Tashkent", lat=41.3, long=69.2),
+        )
+
+    def seed_sellers(self, size):
+        addresses = Address.objects.bulk_create(Address(name=f"Address {i}") for i in range(size))
+        CustomUser.objects.bulk_create(
+            CustomUser(
+                phone_number=f"99891{i:07d}",
+                full_name=f"Seller {i}",
+                category=self.category,
+                address=address,
+            )
+            for i, address in enumerate(addresses)
+        )
+
+    def seed_registration(self, size):
+        self.seed_sellers(size)
+        return {
+            "data": {
+                "full_name": "New Seller",
+                "project_name": "New Project",
+                "phone_number": "998909999999",
+                "category": self.category.id,
+                "address": {"name": "Tashkent", "lat": 41.3, "long": 69.2},
+            }
+        }
+
+    def seed_login(self, size):
+        self.seed_sellers(size)
+        return {"data": {"phone_number": self.user.phone_number, "password": "testpassword"}}
+
+    def seed_token_refresh(self, size):
+        self.seed_sellers(size)
+        return {"data": {"refresh": str(RefreshToken.for_user(self.user))}}
+
+    def seed_token_verify(self, size):
+        self.seed_sellers(size)
+        return {"data": {"token": str(RefreshToken.for_user(self.user).access_token)}}
+
+    def seed_account_edit(self, size):
+        self.seed_sellers(size)
+        return {"data": {"full_name": "Edited Seller"}}
@@ -6,4 +6,5 @@ class CommonConfig(AppConfig):
     name = "common"
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
+        from .utils import task_metrics  # noqa: F401
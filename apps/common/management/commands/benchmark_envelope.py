@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from common.renderers import error_list
+from common.utils.custom_response_decorator import custom_response
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+def card(i):
+    published = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i, microseconds=i)
+    return {
+        "id": i,
+        "name": f"Объявление {i}",
+        "slug": f"ad-{i}",
+        "price": 1000 + i,
+        "photo": f"/media/products/{i}.jpg",
+        "published_at": published,
+        "address": "Toshkent",
+        "seller": {"id": i, "full_name": "Seller", "phone_number": "998901112233"},
+        "is_liked": bool(i % 2),
+        "updated_time": published,
+    }
+
+
+PAYLOADS = {
+    "empty": (status.HTTP_204_NO_CONTENT, None),
+    "20 cards": (status.HTTP_200_OK, [card(i) for i in range(20)]),
+    "100 cards": (status.HTTP_200_OK, [card(i) for i in range(100)]),
+    "errors": (status.HTTP_400_BAD_REQUEST, {"name": ["Required."], "price": ["Invalid."]}),
+}
+
+
+class PayloadView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, payload):
+        status_code, data = PAYLOADS[payload]
+        return Response(data, status=status_code)
+
+
+@custom_response
+class EnvelopeView(PayloadView):
+    pass
+
+
+class ReferenceView(PayloadView):
+    # The envelope built in the view and rendered by DRF's JSONRenderer, as the dispatch
+    # wrapper used to do.
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request, payload):
+        response = super().get(request, payload)
+        if status.is_success(response.status_code):
+            response.data = {"success": True, "data": response.data}
+        else:
+            response.data = {"success": False, "errors": error_list(response.data)}
+        return response
+
+
+class Command(BaseCommand):
+    help = "Time the per-request cost of the response envelope against DRF's JSONRenderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per payload.")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/")
+        views = {"reference": ReferenceView.as_view(), "envelope": EnvelopeView.as_view()}
+
+        self.stdout.write(f"{'payload':<12}{'reference µs':>14}{'envelope µs':>13}  speedup")
+        for payload in PAYLOADS:
+            timings, bodies = {}, {}
+            for name, view in views.items():
+                started = time.perf_counter()
+                for _ in range(options["requests"]):
+                    response = view(request, payload=payload).render()
+                timings[name] = (time.perf_counter() - started) / options["requests"] * 1e6
+                bodies[name] = response.content
+            reference, envelope = timings["reference"], timings["envelope"]
+            line = f"{payload:<12}{reference:>14.1f}{envelope:>13.1f}  {reference / envelope:6.2f}x"
+            same = bodies["reference"] == bodies["envelope"]
+            self.stdout.write(line + ("" if same else "  OUTPUT DIFFERS"))
@@ -0,0 +1,25 @@
+from common.utils.response_cache import reset_response_cache_stats, response_cache_stats
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Report the response cache hit ratio of every cached view."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Start counting again after the report."
+        )
+
+    def handle(self, *args, **options):
+        stats = response_cache_stats()
+        if not stats:
+            self.stdout.write("No cached responses were requested yet.")
+        width = max((len(view_name) for view_name in stats), default=0)
+        for view_name, row in sorted(stats.items()):
+            self.stdout.write(
+                f"{view_name.ljust(width)}  {row['hits']:>8} hits  {row['misses']:>8} misses  "
+                f"{row['ratio']:7.1%}"
+            )
+        if options["reset"]:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,29 @@
+from common.utils.task_metrics import queue_depths, reset_task_stats, task_stats
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Report the depth of every Celery queue and the runs, latency and failures per task."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Start counting again after the report."
+        )
+
+    def handle(self, *args, **options):
+        for queue, depth in queue_depths().items():
+            self.stdout.write(f"queue {queue}: {depth} waiting")
+
+        stats = task_stats()
+        if not stats:
+            self.stdout.write("No tasks have run yet.")
+        width = max((len(name) for name in stats), default=0)
+        for name, row in sorted(stats.items()):
+            self.stdout.write(
+                f"{name.ljust(width)}  {row['runs']:>8} runs  {row['wait'] * 1000:>9.1f} ms queued"
+                f"  {row['run'] * 1000:>9.1f} ms running  {row['retry']:>6} retries"
+                f"  {row['failure']:>6} failures"
+            )
+        if options["reset"]:
+            reset_task_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -1,4 +1,110 @@
-from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    LimitOffsetPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple("KeysetCursor", ["reverse", "position", "pk"])
+SectionCursor = namedtuple("SectionCursor", ["section", "position", "pk"])
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from PostgreSQL planner statistics, or ``None`` when there is none.
+    Unfiltered querysets read ``pg_class.reltuples``; filtered ones use the EXPLAIN row estimate.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table has been vacuumed or analyzed.
+            return int(row[0]) if row and row[0] >= 0 else None
+
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedPage(Page):
+    def __init__(self, object_list, number, paginator, has_following):
+        super().__init__(object_list, number, paginator)
+        self.has_following = has_following
+
+    def has_next(self):
+        return self.has_following
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A planner estimate is only shown as ``count``. Pages past it are still served, and
+    whether one follows is told by fetching one row more than the page holds.
+    """
+
+    exact_count_threshold = 10000
+
+    @cached_property
+    def estimate(self):
+        if isinstance(self.object_list, QuerySet):
+            return estimate_count(self.object_list)
+        return None
+
+    @cached_property
+    def count_is_exact(self):
+        return self.estimate is None or self.estimate < self.exact_count_threshold
+
+    @cached_property
+    def count(self):
+        if self.count_is_exact:
+            return super().count
+        return self.estimate
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return EstimatedPage(rows[: self.per_page], number, self, len(rows) > self.per_page)
 
 
 class CustomPagination(PageNumberPagination):
@@ -7,6 +113,31 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class EstimatedCountPagination(CustomPagination):
+    """
+    Returns a planner estimate instead of ``COUNT(*)`` for large result sets. Small or narrowly
+    filtered results are still counted exactly; ``count_exact`` tells the client which it got.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_exact": self.page.paginator.count_is_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {"type": "boolean", "example": True}
+        return response_schema
+
+
 class CustomLimitOffsetPagination(LimitOffsetPagination):
     default_limit = 10
     max_limit = 100
@@ -14,11 +145,229 @@ class CustomLimitOffsetPagination(LimitOffsetPagination):
     offset_query_param = "offset"
 
 
+class BaseKeysetPagination(CursorPagination):
+    """
+    Helpers shared by the keyset paginations: the seek filter past a ``(value, pk)``
+    position and the base64 querystring the cursor tokens travel in.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    tie_breaker = "id"
+
+    def seek_filter(self, key_field, descending, position, pk):
+        """Rows after ``(position, pk)`` in ``(key_field, tie_breaker)`` order."""
+        lookup = "lt" if descending else "gt"
+        return Q(**{f"{key_field}__{lookup}": position}) | Q(
+            **{key_field: position, f"{self.tie_breaker}__{lookup}": pk}
+        )
+
+    def position_of(self, row, key_field):
+        """``(position, pk)`` of a model instance or a values() row, ready for a cursor."""
+        if isinstance(row, dict):
+            value, pk = row[key_field], row[self.tie_breaker]
+        else:
+            value, pk = getattr(row, key_field), getattr(row, self.tie_breaker)
+        return value.isoformat() if hasattr(value, "isoformat") else str(value), pk
+
+    def decode_tokens(self, request):
+        """The cursor's tokens, ``None`` without a cursor; raises ValueError when unreadable."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+        return parse.parse_qs(querystring, keep_blank_values=True)
+
+    def encode_tokens(self, tokens):
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class KeysetCursorPagination(BaseKeysetPagination):
+    """
+    Cursor pagination that seeks on ``(ordering field, pk)`` instead of using an offset,
+    so every page is a single indexed range scan regardless of how deep the client is.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.key_field = self.ordering[0].lstrip("-")
+        self.descending = self.ordering[0].startswith("-")
+        self.model_field = queryset.model._meta.get_field(self.key_field)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(self.cursor))
+
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.key_field}", f"{prefix}{self.tie_breaker}")
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.cursor is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_seek_filter(self, cursor):
+        descending = self.descending != cursor.reverse
+        return self.seek_filter(self.key_field, descending, cursor.position, cursor.pk)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._get_cursor_from_instance(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._get_cursor_from_instance(self.page[0], reverse=True))
+
+    def _get_cursor_from_instance(self, instance, reverse):
+        position, pk = self.position_of(instance, self.key_field)
+        return KeysetCursor(reverse=reverse, position=position, pk=pk)
+
+    def decode_cursor(self, request):
+        try:
+            tokens = self.decode_tokens(request)
+            if tokens is None:
+                return None
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+            position = self.model_field.to_python(tokens["p"][0])
+            pk = int(tokens["i"][0])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return KeysetCursor(reverse=reverse, position=position, pk=pk)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": cursor.position, "i": str(cursor.pk)}
+        if cursor.reverse:
+            tokens["r"] = "1"
+        return self.encode_tokens(tokens)
+
+
+class SectionedCursorPagination(BaseKeysetPagination):
+    """
+    Forward-only cursor over several querysets listed one after another, e.g. matching
+    categories and then matching ads. The cursor records the section and the keyset position
+    inside it, so a page costs at most one ``LIMIT`` query per section it touches.
+    """
+
+    def paginate_sections(self, sections, request):
+        """``sections`` is a list of ``(queryset, ordering)`` pairs such as ``(ads, "-published_at")``."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.sections = sections
+        cursor = self.decode_cursor(request)
+
+        self.page = []
+        self.next_cursor = None
+        for index in range(cursor.section if cursor else 0, len(sections)):
+            queryset, ordering = sections[index]
+            key_field = ordering.lstrip("-")
+            descending = ordering.startswith("-")
+            if cursor and index == cursor.section and cursor.position is not None:
+                queryset = queryset.filter(
+                    self.seek_filter(key_field, descending, cursor.position, cursor.pk)
+                )
+            prefix = "-" if descending else ""
+            queryset = queryset.order_by(f"{prefix}{key_field}", f"{prefix}{self.tie_breaker}")
+
+            # One extra row tells whether anything follows; with a full page it is just a probe.
+            remaining = self.page_size - len(self.page)
+            rows = list(queryset[: remaining + 1])
+            self.page += rows[:remaining]
+            if len(rows) > remaining:
+                if remaining:
+                    position, pk = self.position_of(rows[remaining - 1], key_field)
+                    self.next_cursor = SectionCursor(index, position, pk)
+                else:
+                    self.next_cursor = SectionCursor(index, None, None)
+                break
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return self.encode_cursor(self.next_cursor)
+
+    def decode_cursor(self, request):
+        try:
+            tokens = self.decode_tokens(request)
+            if tokens is None:
+                return None
+            section = int(tokens["s"][0])
+            if not 0 <= section < len(self.sections):
+                raise NotFound(self.invalid_cursor_message)
+            queryset, ordering = self.sections[section]
+            if "p" not in tokens:
+                return SectionCursor(section=section, position=None, pk=None)
+            model_field = queryset.model._meta.get_field(ordering.lstrip("-"))
+            position = model_field.to_python(tokens["p"][0])
+            pk = int(tokens["i"][0])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return SectionCursor(section=section, position=position, pk=pk)
+
+    def encode_cursor(self, cursor):
+        tokens = {"s": str(cursor.section)}
+        if cursor.position is not None:
+            tokens.update(p=cursor.position, i=str(cursor.pk))
+        return self.encode_tokens(tokens)
+
+
 class PageListPagination(CustomPagination):
     page_size = 10
 
 
-class AdListPagination(CustomPagination):
+class AdListPagination(EstimatedCountPagination):
+    page_size = 20
+
+
+class AdListCursorPagination(KeysetCursorPagination):
+    page_size = 20
+    ordering = "-published_at"
+
+
+class CategoryProductSearchPagination(SectionedCursorPagination):
     page_size = 20
 
 
@@ -0,0 +1,80 @@
+from common.exceptions import ObjectNotFound
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements/base.txt
+    orjson = None
+
+ORJSON_OPTIONS = (
+    # Dates go through DRF's encoder, which trims microseconds to milliseconds.
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson
+    else 0
+)
+
+
+def error_list(data, exception=False):
+    """
+    The ``errors`` of the envelope. Exceptions (see custom_exception_handler) give one entry per
+    field with its messages; other error responses one entry per message. Data that already
+    holds ``errors`` is kept as it is.
+    """
+    if exception:
+        if isinstance(data, list):
+            data = {"non_field_errors": data}
+        detail = data.get("detail")
+        if detail is not None:
+            if detail.code.lower() == "not_found":
+                error_detail = ErrorDetail(
+                    ObjectNotFound.default_detail, ObjectNotFound.default_code
+                )
+            else:
+                error_detail = ErrorDetail(detail, detail.code)
+            data = {"non_field_errors": [error_detail]}
+        return [{"field": field, "message": value} for field, value in data.items()]
+
+    if isinstance(data, dict) and "errors" in data:
+        return data["errors"]
+    if not isinstance(data, dict):
+        return [{"field": None, "message": str(data)}]
+    return [
+        {"field": field, "message": str(message)}
+        for field, messages in data.items()
+        for message in (messages if isinstance(messages, list) else [messages])
+    ]
+
+
+class EnvelopeJSONRenderer(JSONRenderer):
+    """
+    Renders ``{"success": true, "data": ...}`` or ``{"success": false, "errors": [...]}`` in a
+    single pass, with orjson when it is installed. Views opt in with ``custom_response``.
+    ``response.data`` is left as the envelope that was sent, for tests and middleware.
+    """
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            if not hasattr(response, "envelope"):
+                if 200 <= response.status_code < 300:
+                    response.envelope = {"success": True, "data": data}
+                else:
+                    response.envelope = {"success": False, "errors": error_list(data)}
+                response.data = response.envelope
+            data = response.envelope
+        elif data is None:
+            return b""
+
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=self.encoder.default, option=ORJSON_OPTIONS)
+        # As JSONRenderer: these are valid JSON but end a line in JavaScript.
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return content
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import District, Page, Region, Setting
+from .utils.conditional import bump_table_version
+from .utils.response_cache import invalidate_tags
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def bump_pages_version(sender, instance, **kwargs):
+    bump_table_version("pages")
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+def bump_regions_version(sender, instance, **kwargs):
+    bump_table_version("regions")
+
+
+@receiver(post_save, sender=Setting)
+@receiver(post_delete, sender=Setting)
+def bump_settings_version(sender, instance, **kwargs):
+    bump_table_version("settings")
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page_responses(sender, instance, **kwargs):
+    invalidate_tags("pages", f"page:{instance.pk}")
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+def invalidate_region_responses(sender, instance, **kwargs):
+    invalidate_tags("regions")
+
+
+@receiver(post_save, sender=Setting)
+@receiver(post_delete, sender=Setting)
+def invalidate_setting_responses(sender, instance, **kwargs):
+    invalidate_tags("settings")
@@ -1,11 +1,31 @@
+import json
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from io import StringIO
+
 from common.models import District, Page, Region, Setting
+from common.renderers import EnvelopeJSONRenderer, error_list
+from common.utils.query_budget import EndpointBudget, QueryBudgetMixin
+from common.utils.response_cache import clear_response_cache, response_cache_stats
+from django.conf import settings
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
 from django.urls import reverse
+from django.utils import translation
+from django.utils.translation import gettext_lazy
 from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.test import APITestCase
 
+from config.middleware import APILanguageMiddleware
+
 
 class CommonAPITestCase(APITestCase):
     def setUp(self):
+        clear_response_cache()
+
         # Regions va Districts
         self.region = Region.objects.create(name="Tashkent Region")
         self.district = District.objects.create(region=self.region, name="Yunusobod")
@@ -67,3 +87,212 @@ class CommonAPITestCase(APITestCase):
         self.assertEqual(response.data["data"]["working_hours"], self.setting.working_hours)
         self.assertEqual(response.data["data"]["app_version"], self.setting.app_version)
         self.assertEqual(response.data["data"]["maintenance_mode"], self.setting.maintenance_mode)
+
+    # ------------------ Conditional GET ------------------
+    def test_setting_not_modified(self):
+        url = reverse("common:setting")
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The language is part of the validator.
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_LANGUAGE="ru")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        self.setting.app_version = "1.0.1"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setting.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["app_version"], "1.0.1")
+
+    def test_conditional_get_without_redis(self):
+        # Nothing listens on port 1: every cache call fails as in a Redis outage.
+        caches = {"default": {**settings.CACHES["default"], "LOCATION": "redis://127.0.0.1:1/1"}}
+        with override_settings(CACHES=caches), self.assertLogs("common", "WARNING"):
+            for url in (reverse("common:setting"), reverse("common:regions-with-districts")):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotIn("ETag", response)
+
+            self.setting.app_version = "1.0.2"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.setting.save()
+        self.setting.refresh_from_db()
+        self.assertEqual(self.setting.app_version, "1.0.2")
+
+    def test_page_detail_not_modified(self):
+        url = reverse("common:pages-detail", args=[self.page.slug])
+        etag = self.client.get(url)["ETag"]
+        # Served from the response cache; its copy keeps the validators.
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.page.content = "Updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data["data"]["content"], "Updated")
+
+        response = self.client.get(reverse("common:pages-detail", args=["missing"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # ------------------ Response cache ------------------
+    def test_response_cache(self):
+        url = reverse("common:regions-with-districts")
+        self.assertEqual(self.client.get(url)["X-Response-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Response-Cache"], "hit")
+        self.assertEqual(response.data["data"][0]["name"], "Tashkent Region")
+
+        # Each language has its own entry; lang is not part of the query string key.
+        response = self.client.get(url, {"lang": "ru"})
+        self.assertEqual(response["X-Response-Cache"], "miss")
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_LANGUAGE="ru")["X-Response-Cache"], "hit")
+
+        # Only the responses tagged with the saved model are dropped.
+        setting_url = reverse("common:setting")
+        self.client.get(setting_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            District.objects.create(region=self.region, name="Chilonzor")
+        self.assertEqual(self.client.get(setting_url)["X-Response-Cache"], "hit")
+        response = self.client.get(url)
+        self.assertEqual(response["X-Response-Cache"], "miss")
+        self.assertEqual(len(response.data["data"][0]["districts"]), 2)
+
+        stats = response_cache_stats()
+        self.assertEqual(stats["RegionWithDistrictsView"], {"hits": 2, "misses": 3, "ratio": 0.4})
+        self.assertEqual(stats["SettingView"]["hits"], 1)
+
+        output = StringIO()
+        call_command("response_cache_stats", "--reset", stdout=output)
+        self.assertIn("40.0%", output.getvalue())
+        self.assertEqual(response_cache_stats(), {})
+
+
+class EnvelopeRendererTestCase(SimpleTestCase):
+    def render(self, renderer, data, status_code=200):
+        response = Response(data, status=status_code)
+        return renderer.render(data, "application/json", {"response": response}), response
+
+    def test_matches_json_renderer(self):
+        data = {
+            "published_at": datetime(2025, 5, 1, 9, 30, 15, 123456, tzinfo=UTC),
+            "day": date(2025, 5, 1),
+            "price": Decimal("12.50"),
+            "name": gettext_lazy("Uzbek"),
+            "text": "Телефон\u2028line",
+            "counts": {1: 2},
+            "tags": ("a", "b"),
+            "error": ErrorDetail("Required.", code="required"),
+        }
+        body, response = self.render(EnvelopeJSONRenderer(), data)
+        self.assertEqual(response.data, {"success": True, "data": data})
+        self.assertEqual(body, JSONRenderer().render({"success": True, "data": data}))
+
+    def test_error_shapes(self):
+        # Plain error responses: one entry per message.
+        _, response = self.render(EnvelopeJSONRenderer(), {"name": ["A", "B"], "price": "C"}, 400)
+        self.assertEqual(
+            response.data["errors"],
+            [
+                {"field": "name", "message": "A"},
+                {"field": "name", "message": "B"},
+                {"field": "price", "message": "C"},
+            ],
+        )
+        # Exceptions: one entry per field, already normalized by the exception handler.
+        errors = error_list({"name": ["A", "B"]}, exception=True)
+        _, response = self.render(EnvelopeJSONRenderer(), {"errors": errors}, 400)
+        self.assertEqual(
+            response.data, {"success": False, "errors": [{"field": "name", "message": ["A", "B"]}]}
+        )
+        not_found = error_list({"detail": ErrorDetail("Nope", code="not_found")}, exception=True)
+        self.assertEqual(not_found[0]["message"][0].code, "object_not_found")
+
+    def test_benchmark_envelope(self):
+        output = StringIO()
+        call_command("benchmark_envelope", "--requests", "2", stdout=output)
+        self.assertIn("100 cards", output.getvalue())
+        self.assertNotIn("DIFFERS", output.getvalue())
+
+
+class APILanguageMiddlewareTestCase(SimpleTestCase):
+    def negotiate(self, **kwargs):
+        request = RequestFactory().generic(**{"method": "GET", "path": "/", **kwargs})
+        APILanguageMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_accept_language(self):
+        cases = {
+            "ru": "ru",
+            "ru-RU,ru;q=0.9,en;q=0.8": "ru",
+            "en-US,en;q=0.9,ru;q=0.5,uz;q=0.7": "uz",
+            "uz;q=0, ru;q=0.1": "ru",
+            "ru;q=abc, uz": "uz",
+            "en, de": "uz",
+        }
+        for header, language in cases.items():
+            with self.subTest(header=header):
+                request = self.negotiate(HTTP_ACCEPT_LANGUAGE=header)
+                self.assertEqual(request.LANGUAGE_CODE, language)
+                self.assertEqual(translation.get_language(), language)
+
+    def test_lang_parameter_and_body(self):
+        self.assertEqual(self.negotiate(QUERY_STRING="lang=ru").LANGUAGE_CODE, "ru")
+        # The query parameter only applies when the header names no supported language.
+        request = self.negotiate(HTTP_ACCEPT_LANGUAGE="en", QUERY_STRING="lang=ru")
+        self.assertEqual(request.LANGUAGE_CODE, "ru")
+
+        request = self.negotiate(
+            method="POST", data=json.dumps({"lang": "ru"}), content_type="application/json"
+        )
+        self.assertEqual(request.LANGUAGE_CODE, "uz")
+        self.assertFalse(hasattr(request, "_body"))
+
+
+class CommonQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    urls_module = "common.urls"
+    namespace = "common"
+    budgets = [
+        EndpointBudget("pages-list", 2, seed="seed_pages"),
+        EndpointBudget("pages-detail", 1, seed="seed_page_detail"),
+        EndpointBudget("regions-with-districts", 2, seed="seed_regions"),
+        EndpointBudget("setting", 1, seed="seed_setting"),
+    ]
+
+    def create_pages(self, size):
+        return Page.objects.bulk_create(
+            Page(title=f"Page {i}", content="content", slug=f"page-{i}") for i in range(size)
+        )
+
+    def seed_pages(self, size):
+        self.create_pages(size)
+
+    def seed_page_detail(self, size):
+        pages = self.create_pages(size)
+        return {"kwargs": {"slug": pages[-1].slug}}
+
+    def seed_regions(self, size):
+        regions = Region.objects.bulk_create(Region(name=f"Region {i}") for i in range(size))
+        District.objects.bulk_create(
+            District(region=region, name=f"District {i}") for i, region in enumerate(regions)
+        )
+
+    def seed_setting(self, size):
+        Setting.objects.create(
+            phone="+998901234567",
+            support_email="support@test.com",
+            working_hours="9:00 - 18:00",
+            app_version="1.0.0",
+        )
@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Part of every ETag: bump it whenever the custom_response envelope changes shape, so clients
+# holding a body in the old shape download the new one.
+ENVELOPE_VERSION = 1
+TABLE_VERSION_CACHE_KEY = "common:table_version:{name}"
+
+
+def table_versions(*names):
+    """
+    Change stamps (Unix timestamps) of whole tables, for validating collections without reading
+    them. A stamp lost from Redis restarts at the current time, which only costs a full download.
+    """
+    keys = {name: TABLE_VERSION_CACHE_KEY.format(name=name) for name in names}
+    stamps = cache.get_many(keys.values())
+    missing = {key: time.time() for key in keys.values() if key not in stamps}
+    for key, stamp in missing.items():
+        cache.add(key, stamp, timeout=None)
+    stamps.update(cache.get_many(missing) if missing else {})
+    return [stamps[keys[name]] for name in names]
+
+
+def bump_table_version(*names):
+    if not names:
+        return
+
+    def bump():
+        try:
+            cache.set_many(
+                {TABLE_VERSION_CACHE_KEY.format(name=name): time.time() for name in names},
+                timeout=None,
+            )
+        except (ConnectionInterrupted, RedisError) as e:
+            logger.warning(f"Table versions of {', '.join(names)} were not bumped: {e}")
+
+    transaction.on_commit(bump)
+
+
+def collection_validators(*names, parts=()):
+    """
+    ``(etag parts, last modified)`` for a response built from the tables ``names``, or
+    ``None`` while the stamps cannot be read, so the response is sent without validators.
+    """
+    try:
+        stamps = table_versions(*names)
+    except (ConnectionInterrupted, RedisError) as e:
+        logger.warning(f"Table versions of {', '.join(names)} were not read: {e}")
+        return None
+    return (*parts, *names, *stamps), datetime.fromtimestamp(max(stamps), tz=timezone.utc)
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET with ``304 Not Modified`` when the client's ``If-None-Match`` or
+    ``If-Modified-Since`` still matches, before the queryset is serialized. Views implement
+    ``get_validators`` cheaply and return ``(etag parts, last modified)``, or ``None`` to skip.
+    A detail view that has to read its row for the validators keeps it in ``validated_object``,
+    so a full response does not read it again. The ETag also covers the negotiated language and
+    the response envelope.
+    """
+
+    validated_object = None
+
+    def get_validators(self, request):
+        # No validators: the view answers every GET in full.
+        return None
+
+    def not_modified(self, request):
+        # Work that must happen even when no body is sent.
+        pass
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        parts, last_modified = validators
+        etag = self.make_etag(request, parts)
+        # HTTP dates have whole seconds; compare at the precision the client was sent.
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.not_modified(request)
+        else:
+            response = super().get(request, *args, **kwargs)
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            # Revalidate every time: bodies can be per user (is_liked) and per language.
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Accept-Language"])
+        return response
+
+    def get_object(self):
+        if self.validated_object is None:
+            return super().get_object()
+        self.check_object_permissions(self.request, self.validated_object)
+        return self.validated_object
+
+    def make_etag(self, request, parts):
+        language = getattr(request, "LANGUAGE_CODE", "")
+        source = "|".join(map(str, (ENVELOPE_VERSION, language, *parts)))
+        return f'"{hashlib.sha1(source.encode()).hexdigest()}"'
@@ -1,41 +1,22 @@
+from common.renderers import EnvelopeJSONRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
 
 def custom_response(view):
+    """
+    Sends the view's responses in the ``{"success", "data"/"errors"}`` envelope, rendered by
+    EnvelopeJSONRenderer. Other configured renderers, such as the browsable API, stay available.
+    """
     assert issubclass(view, APIView), f"class {view.__name__} must be subclass of APIView"
 
-    def inner(self, request, *args, **kwargs):
-        response = super(view, self).dispatch(request, *args, **kwargs)
-
-        is_success = 200 <= response.status_code < 300
-
-        if not is_success and isinstance(response.data, dict) and "errors" in response.data:
-            response.data = {
-                "success": False,
-                "errors": response.data["errors"],
-            }
-            response._is_rendered = False
-            return response
-
-        formatted_response = {"success": is_success}
-
-        if is_success:
-            formatted_response["data"] = response.data
-        else:
-            formatted_response["errors"] = []
-
-            if isinstance(response.data, dict):
-                for field, messages in response.data.items():
-                    if not isinstance(messages, list):
-                        messages = [messages]
-                    for msg in messages:
-                        formatted_response["errors"].append({"field": field, "message": str(msg)})
-            else:
-                formatted_response["errors"].append({"field": None, "message": str(response.data)})
-
-        response.data = formatted_response
-        response._is_rendered = False
-        return response
-
-    view.dispatch = inner
+    view.renderer_classes = [
+        EnvelopeJSONRenderer,
+        *(
+            renderer
+            for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+            if not issubclass(renderer, JSONRenderer)
+        ),
+    ]
     return view
@@ -0,0 +1,118 @@
+import os
+import sys
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .response_cache import clear_response_cache
+
+
+class EndpointBudget:
+    """
+    Query budget for one URL name. ``seed`` names a method on the test case that receives
+    the number of rows to create and returns the request description
+    (``kwargs``, ``query``, ``data``, ``format``) for that run. ``user`` names the attribute
+    of the test case holding the user to authenticate as; requests are anonymous without it.
+    """
+
+    def __init__(self, url_name, budget, seed, method="get", user=None):
+        self.url_name = url_name
+        self.budget = budget
+        self.seed = seed
+        self.method = method
+        self.user = user
+
+    @property
+    def label(self):
+        return f"{self.method.upper()} {self.url_name}"
+
+
+class QueryBudgetMixin:
+    """
+    Seeds every endpoint with 1, 10 and 100 rows and checks that the number of SQL queries
+    stays flat and within the declared budget. Subclasses set ``urls_module``, ``namespace``
+    and ``budgets``; every named URL of ``urls_module`` must have at least one budget.
+    """
+
+    urls_module = None
+    namespace = None
+    budgets = []
+    seed_sizes = (1, 10, 100)
+
+    def reset_state(self):
+        # Cached responses would answer the next seed size without running the view.
+        clear_response_cache()
+
+    def test_every_url_has_budget(self):
+        url_names = {
+            pattern.name for pattern in import_module(self.urls_module).urlpatterns if pattern.name
+        }
+        missing = sorted(url_names - {budget.url_name for budget in self.budgets})
+        self.assertFalse(missing, f"URLs without a query budget: {', '.join(missing)}")
+
+    def test_query_budgets(self):
+        rows = [self.measure(budget) for budget in self.budgets]
+        failures = [row for row in rows if row["status"] != "ok"]
+        report = self.format_report(rows)
+
+        if os.environ.get("QUERY_BUDGET_REPORT"):
+            sys.stdout.write(f"\n{report}\n")
+        if failures:
+            self.fail(f"Query budget exceeded:\n{report}")
+
+    def measure(self, budget):
+        counts = []
+        for size in self.seed_sizes:
+            with transaction.atomic():
+                counts.append(self.count_queries(budget, size))
+                transaction.set_rollback(True)
+
+        if max(counts) > budget.budget:
+            status = "over budget"
+        elif len(set(counts)) > 1:
+            status = "grows with data"
+        else:
+            status = "ok"
+        return {"label": budget.label, "budget": budget.budget, "counts": counts, "status": status}
+
+    def count_queries(self, budget, size):
+        request = getattr(self, budget.seed)(size) or {}
+        url = reverse(f"{self.namespace}:{budget.url_name}", kwargs=request.get("kwargs"))
+        if request.get("query"):
+            url = f"{url}?{urlencode(request['query'])}"
+        user = getattr(self, budget.user) if budget.user else None
+        if user is not None:
+            # Nothing read by an earlier run is left cached on the instance.
+            user.refresh_from_db()
+        self.client.force_authenticate(user=user)
+        self.reset_state()
+
+        send = getattr(self.client, budget.method)
+        with CaptureQueriesContext(connection) as context:
+            if budget.method == "get":
+                response = send(url)
+            else:
+                response = send(url, request.get("data"), format=request.get("format", "json"))
+
+        self.assertLess(
+            response.status_code,
+            400,
+            f"{budget.label} with {size} rows returned {response.status_code}: {response.data}",
+        )
+        return len(context.captured_queries)
+
+    def format_report(self, rows):
+        sizes = [f"n={size}" for size in self.seed_sizes]
+        header = ["endpoint", "budget", *sizes, "status"]
+        lines = [header] + [
+            [row["label"], str(row["budget"]), *map(str, row["counts"]), row["status"]]
+            for row in rows
+        ]
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+            for line in lines
+        )
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+ENTRY_KEY = "common:response:{digest}"
+TAG_KEY = "common:response:tag:{tag}"
+STATS_KEY = "common:response:stats"
+# Tag sets outlive every entry they point to; entries may use any timeout up to this.
+MAX_TIMEOUT = 24 * 60 * 60
+# Headers set while building the response that a cached copy must repeat.
+CACHED_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Vary")
+# Read by APILanguageMiddleware only; the negotiated language is part of the key instead.
+IGNORED_PARAMS = {"lang"}
+
+# KEYS: entry, stats; ARGV: view name. The entry, or nil, counting a hit or a miss.
+READ_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('HINCRBY', KEYS[2], ARGV[1] .. ':hits', 1)
+else
+    redis.call('HINCRBY', KEYS[2], ARGV[1] .. ':misses', 1)
+end
+return value
+"""
+
+# KEYS: tag sets. Deletes every entry of every tag, then the tags.
+INVALIDATE_SCRIPT = """
+local deleted = 0
+for i = 1, #KEYS do
+    local entries = redis.call('SMEMBERS', KEYS[i])
+    for j = 1, #entries, 1000 do
+        deleted = deleted + redis.call('DEL', unpack(entries, j, math.min(j + 999, #entries)))
+    end
+    redis.call('DEL', KEYS[i])
+end
+return deleted
+"""
+
+
+def entry_key(request, view_name):
+    """
+    Path, query string with its parameters sorted and blanks dropped, and the negotiated
+    language. The host is included because bodies hold absolute media URLs.
+    """
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, values in request.GET.lists()
+            if key not in IGNORED_PARAMS
+            for value in values
+            if value
+        )
+    )
+    source = "|".join(
+        (view_name, request.get_host(), request.path, query, getattr(request, "LANGUAGE_CODE", ""))
+    )
+    return cache.make_key(ENTRY_KEY.format(digest=hashlib.sha1(source.encode()).hexdigest()))
+
+
+def tag_key(tag):
+    return cache.make_key(TAG_KEY.format(tag=tag))
+
+
+def read_entry(key, view_name):
+    value = get_redis_connection().eval(READ_SCRIPT, 2, key, cache.make_key(STATS_KEY), view_name)
+    return None if value is None else cache.client.decode(value)
+
+
+def write_entry(key, entry, tags, timeout):
+    pipe = get_redis_connection().pipeline(transaction=False)
+    pipe.set(key, cache.client.encode(entry), ex=timeout)
+    for tag in tags:
+        pipe.sadd(tag_key(tag), key)
+        pipe.expire(tag_key(tag), MAX_TIMEOUT)
+    pipe.execute()
+
+
+def invalidate_tags(*tags):
+    """Drops, once the transaction commits, every cached response that depends on ``tags``."""
+    if not tags:
+        return
+
+    def invalidate():
+        try:
+            keys = [tag_key(tag) for tag in tags]
+            get_redis_connection().eval(INVALIDATE_SCRIPT, len(keys), *keys)
+        except RedisError as e:
+            logger.warning(f"Cached responses of {', '.join(tags)} were not invalidated: {e}")
+
+    transaction.on_commit(invalidate)
+
+
+def clear_response_cache():
+    cache.delete_pattern("common:response:*")
+
+
+def response_cache_stats():
+    """``{view name: {"hits", "misses", "ratio"}}`` since the last reset."""
+    counts = get_redis_connection().hgetall(cache.make_key(STATS_KEY))
+    stats = {}
+    for field, count in counts.items():
+        view_name, outcome = field.decode().rsplit(":", 1)
+        stats.setdefault(view_name, {"hits": 0, "misses": 0})[outcome] = int(count)
+    for row in stats.values():
+        row["ratio"] = row["hits"] / (row["hits"] + row["misses"] or 1)
+    return stats
+
+
+def reset_response_cache_stats():
+    get_redis_connection().delete(cache.make_key(STATS_KEY))
+
+
+class ResponseCacheMixin:
+    """
+    Serves anonymous GETs from Redis. Entries are keyed on the path, the normalized query
+    string and the language, hold the response data before the envelope, and are deleted by
+    ``invalidate_tags`` for any tag from ``get_cache_tags``. Requests carrying one of
+    ``uncached_params`` (per-viewer values such as ``device_id``) are never cached. A response
+    built from rows read just before an invalidation can be stored just after it, so entries
+    keep a short ``cache_timeout`` as a bound.
+    """
+
+    cache_timeout = 60
+    cache_tags = ()
+    uncached_params = ()
+
+    def get_cache_tags(self, request, response):
+        return self.cache_tags
+
+    def cache_hit(self, request, entry):
+        # Work that must happen even when the view does not run.
+        pass
+
+    def is_cacheable(self, request):
+        return (
+            request.method == "GET"
+            and not request.user.is_authenticated
+            and not any(request.query_params.get(param) for param in self.uncached_params)
+        )
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        view_name = type(self).__name__
+        key = entry_key(request, view_name)
+        try:
+            entry = read_entry(key, view_name)
+        except RedisError as e:
+            logger.warning(f"{view_name} response was not read from the cache: {e}")
+            return super().get(request, *args, **kwargs)
+
+        if entry is not None:
+            self.cache_hit(request, entry)
+            headers = entry["headers"]
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            )
+            if response is None:
+                response = Response(entry["data"])
+            for header in CACHED_HEADERS:
+                if header in headers:
+                    response[header] = headers[header]
+            response["X-Response-Cache"] = "hit"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            entry = {
+                "data": response.data,
+                "headers": {
+                    header: response[header] for header in CACHED_HEADERS if header in response
+                },
+                "object_id": getattr(getattr(self, "validated_object", None), "pk", None),
+            }
+            try:
+                write_entry(key, entry, self.get_cache_tags(request, response), self.cache_timeout)
+            except RedisError as e:
+                logger.warning(f"{view_name} response was not cached: {e}")
+            response["X-Response-Cache"] = "miss"
+        return response
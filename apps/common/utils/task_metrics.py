@@ -0,0 +1,109 @@
+import logging
+import time
+
+from celery import current_app
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+)
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from kombu.exceptions import ChannelError
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "common:tasks:stats"
+
+# task id -> (started, seconds spent queued), for the tasks running in this process.
+_running = {}
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    # Read back as task.request.published_at by the worker. Eager tasks are never published.
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@task_prerun.connect
+def start_timer(task_id=None, task=None, **kwargs):
+    published_at = getattr(task.request, "published_at", None)
+    waited = max(time.time() - published_at, 0) if published_at else 0
+    _running[task_id] = (time.perf_counter(), waited)
+
+
+def increment(task_name, *metrics):
+    """Adds ``(metric, amount)`` pairs to the counters of ``task_name``; never raises."""
+    key = cache.make_key(STATS_KEY)
+    try:
+        pipe = get_redis_connection().pipeline(transaction=False)
+        for metric, amount in metrics:
+            pipe.hincrbyfloat(key, f"{task_name}:{metric}", amount)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Run of {task_name} was not recorded: {e}")
+
+
+@task_postrun.connect
+def record_run(task_id=None, task=None, **kwargs):
+    started, waited = _running.pop(task_id, (None, 0))
+    if started is not None:
+        ran = time.perf_counter() - started
+        increment(task.name, ("runs", 1), ("wait_seconds", waited), ("run_seconds", ran))
+
+
+@task_retry.connect
+def record_retry(sender=None, **kwargs):
+    increment(sender.name, ("retry", 1))
+
+
+@task_failure.connect
+def record_failure(sender=None, **kwargs):
+    increment(sender.name, ("failure", 1))
+
+
+def task_stats():
+    """``{task name: {"runs", "failure", "retry", "wait", "run"}}`` since the last reset."""
+    counts = get_redis_connection().hgetall(cache.make_key(STATS_KEY))
+    stats = {}
+    for field, value in counts.items():
+        name, metric = field.decode().rsplit(":", 1)
+        row = stats.setdefault(
+            name, {"runs": 0, "failure": 0, "retry": 0, "wait_seconds": 0, "run_seconds": 0}
+        )
+        row[metric] = float(value) if metric.endswith("_seconds") else int(float(value))
+    for row in stats.values():
+        # Average seconds per run.
+        row["wait"] = row.pop("wait_seconds") / (row["runs"] or 1)
+        row["run"] = row.pop("run_seconds") / (row["runs"] or 1)
+    return stats
+
+
+def reset_task_stats():
+    get_redis_connection().delete(cache.make_key(STATS_KEY))
+
+
+def queue_names(app=None):
+    conf = (app or current_app).conf
+    return sorted(
+        {conf.task_default_queue, *(route["queue"] for route in (conf.task_routes or {}).values())}
+    )
+
+
+def queue_depths(app=None):
+    """``{queue: messages waiting}`` for the default queue and every routed one."""
+    app = app or current_app
+    depths = {}
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in queue_names(app):
+            try:
+                depths[queue] = channel.queue_declare(queue, passive=True).message_count
+            except ChannelError:
+                # Redis drops a queue's list once it is empty.
+                depths[queue] = 0
+    return depths
@@ -15,14 +15,18 @@ from .serializers import (
     RegionSerializer,
     SettingSerializer,
 )
+from .utils.conditional import ConditionalGetMixin, collection_validators
 from .utils.custom_response_decorator import custom_response
+from .utils.response_cache import ResponseCacheMixin
 
 
 @custom_response
-class PageListAPIView(generics.ListAPIView):
+class PageListAPIView(ResponseCacheMixin, generics.ListAPIView):
     queryset = Page.objects.all().order_by("id")
     serializer_class = PageListSerializer
     pagination_class = PageListPagination
+    cache_timeout = 60 * 60
+    cache_tags = ("pages",)
 
     @swagger_auto_schema(
         operation_summary="List pages",
@@ -34,10 +38,21 @@ class PageListAPIView(generics.ListAPIView):
 
 
 @custom_response
-class PageDetailAPIView(generics.RetrieveAPIView):
+class PageDetailAPIView(ResponseCacheMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Page.objects.all()
     serializer_class = PageDetailSerializer
     lookup_field = "slug"
+    cache_timeout = 60 * 60
+
+    def get_cache_tags(self, request, response):
+        return [f"page:{self.validated_object.pk}"]
+
+    def get_validators(self, request):
+        page = self.get_queryset().filter(slug=self.kwargs["slug"]).first()
+        if page is None:
+            return None
+        self.validated_object = page
+        return ("page", page.pk, page.updated_time.isoformat()), page.updated_time
 
     @swagger_auto_schema(
         operation_summary="Retrieve page details",
@@ -49,9 +64,14 @@ class PageDetailAPIView(generics.RetrieveAPIView):
 
 
 @custom_response
-class RegionWithDistrictsView(generics.ListAPIView):
+class RegionWithDistrictsView(ResponseCacheMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = Region.objects.prefetch_related("districts").all()
     serializer_class = RegionSerializer
+    cache_timeout = 60 * 60
+    cache_tags = ("regions",)
+
+    def get_validators(self, request):
+        return collection_validators("regions")
 
     @swagger_auto_schema(
         operation_summary="List regions with districts",
@@ -63,8 +83,13 @@ class RegionWithDistrictsView(generics.ListAPIView):
 
 
 @custom_response
-class SettingView(generics.RetrieveAPIView):
+class SettingView(ResponseCacheMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = SettingSerializer
+    cache_timeout = 60 * 60
+    cache_tags = ("settings",)
+
+    def get_validators(self, request):
+        return collection_validators("settings")
 
     @swagger_auto_schema(
         operation_summary="Get site settings",
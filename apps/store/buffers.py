@@ -0,0 +1,85 @@
+import uuid
+from contextlib import contextmanager, suppress
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import LockNotOwnedError
+
+FLUSH_LOCK_SECONDS = 60
+FLUSH_ID_FIELD = "flush_id"
+
+# Moves the pending hash aside unless a drain that failed left one, and gives the batch an id
+# that stays with it until it is deleted. Returns the batch's fields, or nil.
+START_DRAIN_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return nil
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+
+def pending_key(name):
+    return cache.make_key(f"{name}:pending")
+
+
+class Drain:
+    """
+    One batch of a buffer: ``counts`` as ``{id: count}`` and ``flush_id``, which is the same
+    every time a batch left over by a failed drain is yielded again.
+    """
+
+    def __init__(self, counts, flush_id=None, lock=None):
+        self.counts = counts
+        self.flush_id = flush_id
+        self.lock = lock
+
+    def check_lock(self):
+        """
+        Renews the flush lock before the batch is committed; raises LockNotOwnedError when it
+        expired, since another worker may be flushing the same batch by now.
+        """
+        if self.lock is not None:
+            self.lock.reacquire()
+
+
+@contextmanager
+def drain_counts(name):
+    """
+    Yields a Drain of the counts accumulated in the Redis hash ``<name>:pending`` and deletes
+    them once the block has finished without errors. New increments go to a fresh hash
+    meanwhile. Only one worker drains a buffer at a time; the others get an empty Drain. A
+    batch left over by a drain that failed is yielded again first, with the same ``flush_id``,
+    so consumers must either be idempotent or skip ids they have already applied.
+    """
+    redis = get_redis_connection()
+    flushing = cache.make_key(f"{name}:flushing")
+    lock = redis.lock(cache.make_key(f"{name}:flush-lock"), timeout=FLUSH_LOCK_SECONDS)
+    if not lock.acquire(blocking=False):
+        yield Drain({})
+        return
+
+    try:
+        reply = redis.eval(
+            START_DRAIN_SCRIPT,
+            2,
+            pending_key(name),
+            flushing,
+            FLUSH_ID_FIELD,
+            uuid.uuid4().hex,
+        )
+        if not reply:
+            yield Drain({}, lock=lock)
+        else:
+            fields = dict(zip(reply[::2], reply[1::2]))
+            flush_id = fields.pop(FLUSH_ID_FIELD.encode()).decode()
+            counts = {int(key): int(count) for key, count in fields.items()}
+            yield Drain(counts, flush_id, lock)
+            redis.delete(flushing)
+    finally:
+        # Lost only when the drain outran FLUSH_LOCK_SECONDS, which check_lock reports.
+        with suppress(LockNotOwnedError):
+            lock.release()
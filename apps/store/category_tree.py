@@ -0,0 +1,119 @@
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis.exceptions import ConnectionInterrupted
+from modeltranslation.utils import build_localized_fieldname
+from redis.exceptions import RedisError
+
+from .models import Category
+
+logger = logging.getLogger(__name__)
+
+# Replaced with a new random token by every category change. A token rather than a counter, so
+# a Redis that lost its data can never hand out a version some worker already holds in memory.
+VERSION_CACHE_KEY = "store:categories:version"
+TREE_CACHE_KEY = "store:categories:tree:{language}:{version}"
+TREE_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+_lock = threading.Lock()
+# (language, version) -> tree, for the current version only.
+_trees = {}
+
+
+def tree_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def bump_tree_version():
+    def bump():
+        try:
+            cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        except (ConnectionInterrupted, RedisError) as e:
+            logger.warning(f"Category tree version was not bumped: {e}")
+
+    transaction.on_commit(bump)
+
+
+def build_tree(language):
+    """
+    Top-level categories and their children as plain dicts, from a single query. Icons are kept
+    as storage names and names fall back to the default language, as modeltranslation does.
+    """
+    name_field = build_localized_fieldname("name", language)
+    default_field = build_localized_fieldname("name", settings.MODELTRANSLATION_DEFAULT_LANGUAGE)
+    rows = Category.objects.order_by("id").values(
+        "id", "parent_id", "icon", name_field, default_field
+    )
+
+    roots, children = [], {}
+    for row in rows:
+        node = {"id": row["id"], "name": row[name_field] or row[default_field], "icon": row["icon"]}
+        if row["parent_id"] is None:
+            node["children"] = children.setdefault(row["id"], [])
+            roots.append(node)
+        else:
+            children.setdefault(row["parent_id"], []).append(node)
+    return roots
+
+
+def get_category_tree(language):
+    """
+    The tree for ``language`` at the current version: from this process, else from Redis,
+    else built from the database and shared through Redis. While Redis is unavailable every
+    call builds it, since no version tells whether a tree kept in this process is current.
+    """
+    global _trees
+    try:
+        version = tree_version()
+    except (ConnectionInterrupted, RedisError) as e:
+        logger.warning(f"Category tree version was not read: {e}")
+        return build_tree(language)
+    tree = _trees.get((language, version))
+    if tree is not None:
+        return tree
+
+    key = TREE_CACHE_KEY.format(language=language, version=version)
+    try:
+        tree = cache.get(key)
+        if tree is None:
+            tree = build_tree(language)
+            cache.set(key, tree, timeout=TREE_CACHE_TIMEOUT)
+    except (ConnectionInterrupted, RedisError) as e:
+        logger.warning(f"Category tree of version {version} was not shared: {e}")
+        return tree if tree is not None else build_tree(language)
+    with _lock:
+        # Trees of older versions are dropped as soon as a newer one is loaded.
+        _trees = {cached: value for cached, value in _trees.items() if cached[1] == version}
+        _trees[(language, version)] = tree
+    return tree
+
+
+def icon_url(name, request):
+    # The same output as the serializers' ImageField, without keeping the host in the cache.
+    if not name:
+        return None
+    url = Category._meta.get_field("icon").storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def render_tree(tree, request):
+    return [
+        {
+            "id": root["id"],
+            "name": root["name"],
+            "icon": icon_url(root["icon"], request),
+            "children": [
+                {"id": child["id"], "name": child["name"], "icon": icon_url(child["icon"], request)}
+                for child in root["children"]
+            ],
+        }
+        for root in tree
+    ]
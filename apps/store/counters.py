@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Ad, Category, CategoryAdCounter
+
+
+def category_ancestor_ids(category_id):
+    ids = []
+    while category_id is not None and category_id not in ids:
+        ids.append(category_id)
+        category_id = (
+            Category.objects.filter(pk=category_id).values_list("parent_id", flat=True).first()
+        )
+    return ids
+
+
+def apply_ad_delta(category_id, status, delta):
+    active_delta = delta if status == "active" else 0
+    CategoryAdCounter.objects.filter(category_id=category_id).update(
+        ad_count=F("ad_count") + delta, active_ad_count=F("active_ad_count") + active_delta
+    )
+    apply_total_delta(category_ancestor_ids(category_id), delta, active_delta)
+
+
+def apply_total_delta(category_ids, delta, active_delta):
+    CategoryAdCounter.objects.filter(category_id__in=category_ids).update(
+        total_ad_count=F("total_ad_count") + delta,
+        total_active_ad_count=F("total_active_ad_count") + active_delta,
+    )
+
+
+def move_ad(old_category_id, old_status, new_category_id, new_status):
+    if (old_category_id, old_status) == (new_category_id, new_status):
+        return
+    with transaction.atomic():
+        apply_ad_delta(old_category_id, old_status, -1)
+        apply_ad_delta(new_category_id, new_status, 1)
+
+
+def move_category(category_id, old_parent_id, new_parent_id):
+    if old_parent_id == new_parent_id:
+        return
+    counter = CategoryAdCounter.objects.filter(category_id=category_id).first()
+    if counter is None:
+        return
+    delta, active_delta = counter.total_ad_count, counter.total_active_ad_count
+    with transaction.atomic():
+        apply_total_delta(category_ancestor_ids(old_parent_id), -delta, -active_delta)
+        apply_total_delta(category_ancestor_ids(new_parent_id), delta, active_delta)
+
+
+@transaction.atomic
+def rebuild_category_counters():
+    direct = {
+        row["category_id"]: row
+        for row in Ad.objects.values("category_id").annotate(
+            ad_count=Count("id"), active_ad_count=Count("id", filter=Q(status="active"))
+        )
+    }
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    totals = defaultdict(lambda: [0, 0])
+    for category_id, row in direct.items():
+        seen = set()
+        while category_id in parents and category_id not in seen:
+            seen.add(category_id)
+            totals[category_id][0] += row["ad_count"]
+            totals[category_id][1] += row["active_ad_count"]
+            category_id = parents[category_id]
+
+    counters = [
+        CategoryAdCounter(
+            category_id=category_id,
+            ad_count=direct.get(category_id, {}).get("ad_count", 0),
+            active_ad_count=direct.get(category_id, {}).get("active_ad_count", 0),
+            total_ad_count=totals[category_id][0],
+            total_active_ad_count=totals[category_id][1],
+        )
+        for category_id in parents
+    ]
+    CategoryAdCounter.objects.bulk_create(
+        counters,
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=["ad_count", "active_ad_count", "total_ad_count", "total_active_ad_count"],
+    )
+    return len(counters)
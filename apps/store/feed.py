@@ -0,0 +1,202 @@
+from accounts.models import CustomUser
+from django.conf import settings
+from django.utils import timezone
+from modeltranslation.utils import build_localized_fieldname, get_language
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .mixins import liked_product_ids
+from .models import AdPhoto, rendition_urls
+
+# Plain-dict versions of AdListSerializer, MyAdsListSerializer and FavouriteProductListSerializer
+# for the list endpoints, rendered from values() rows in a single pass with the same JSON as the
+# serializers (see test_feed_matches_serializers). Ad list and favourites cards are built without
+# the viewer and cached per ad by store.fragments; personalize_* adds the viewer's fields.
+
+AD_CARD_COLUMNS = [
+    "id",
+    "slug",
+    "price",
+    "published_at",
+    "updated_time",
+    # The keyset cursor reads its position from the row for every AdListView ordering.
+    "view_count",
+    "cover_photo__image",
+    "cover_photo__renditions",
+]
+SELLER_COLUMNS = [
+    "seller_id",
+    "seller__full_name",
+    "seller__phone_number",
+    "seller__profile_photo",
+    "seller__address__name",
+]
+MY_AD_COLUMNS = [*AD_CARD_COLUMNS, "status"]
+
+
+def localized_columns(field):
+    # The active language and the default one it falls back to, as modeltranslation does.
+    return [
+        build_localized_fieldname(field, language)
+        for language in dict.fromkeys([get_language(), settings.MODELTRANSLATION_DEFAULT_LANGUAGE])
+    ]
+
+
+def localized(row, columns):
+    # Like modeltranslation's descriptor: the first value that is neither null nor the field's
+    # default, else that default (blank for these text fields).
+    for column in columns:
+        if row[column] not in (None, ""):
+            return row[column]
+    return ""
+
+
+def datetime_formatter():
+    """DRF's DateTimeField output, with the current timezone looked up once per page."""
+    field = serializers.DateTimeField()
+    zone = field.default_timezone()
+    if api_settings.DATETIME_FORMAT is None or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return field.to_representation
+
+    def format_datetime(value):
+        if not value or zone is None or timezone.is_naive(value):
+            return field.to_representation(value)
+        text = value.astimezone(zone).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+    return format_datetime
+
+
+def media_url(name, storage):
+    return storage.url(name) if name else None
+
+
+def cover_rendition_urls(row, storage):
+    # As PhotoMixin.get_photo_renditions: null without a cover photo.
+    name = row["cover_photo__image"]
+    return rendition_urls(name, row["cover_photo__renditions"], storage) if name else None
+
+
+def ad_card_values(queryset):
+    """``queryset`` of ads projected to the columns of an AdListView card."""
+    return queryset.values(*AD_CARD_COLUMNS, *SELLER_COLUMNS, *localized_columns("name"))
+
+
+def build_ad_cards(rows):
+    """
+    AdListView cards without the viewer: ``is_liked`` is false and the seller's photo URL is
+    relative, so the same cards can be shared by every request (see store.fragments).
+    """
+    name = localized_columns("name")
+    format_datetime = datetime_formatter()
+    photos = AdPhoto._meta.get_field("image").storage
+    profile_photos = CustomUser._meta.get_field("profile_photo").storage
+    return [
+        {
+            "id": row["id"],
+            "name": localized(row, name),
+            "slug": row["slug"],
+            "price": row["price"],
+            "photo": media_url(row["cover_photo__image"], photos),
+            "photo_renditions": cover_rendition_urls(row, photos),
+            "published_at": format_datetime(row["published_at"]),
+            "address": row["seller__address__name"],
+            "seller": {
+                "id": row["seller_id"],
+                "full_name": row["seller__full_name"],
+                "phone_number": row["seller__phone_number"],
+                "profile_photo": media_url(row["seller__profile_photo"], profile_photos),
+            },
+            "is_liked": False,
+            "updated_time": format_datetime(row["updated_time"]),
+        }
+        for row in rows
+    ]
+
+
+def personalize_ad_cards(cards, request):
+    # New dicts, since the cards may be shared; the keys keep their order.
+    cards = list(cards)
+    liked = liked_product_ids(request, {card["id"] for card in cards})
+    personalized = []
+    for card in cards:
+        seller = card["seller"]
+        if seller["profile_photo"] and request is not None:
+            seller = {
+                **seller,
+                "profile_photo": request.build_absolute_uri(seller["profile_photo"]),
+            }
+        personalized.append({**card, "seller": seller, "is_liked": card["id"] in liked})
+    return personalized
+
+
+def render_ad_cards(rows, request):
+    return personalize_ad_cards(build_ad_cards(rows), request)
+
+
+def my_ad_values(queryset):
+    return queryset.values(*MY_AD_COLUMNS, *localized_columns("name"))
+
+
+def render_my_ads(rows, request):
+    # MyAdsListSerializer declares ``address`` from a relation ads do not have, so DRF leaves
+    # it out of every row.
+    rows = list(rows)
+    name = localized_columns("name")
+    format_datetime = datetime_formatter()
+    photos = AdPhoto._meta.get_field("image").storage
+    liked = liked_product_ids(request, {row["id"] for row in rows})
+    return [
+        {
+            "id": row["id"],
+            "name": localized(row, name),
+            "slug": row["slug"],
+            "price": row["price"],
+            "photo": media_url(row["cover_photo__image"], photos),
+            "photo_renditions": cover_rendition_urls(row, photos),
+            "published_at": format_datetime(row["published_at"]),
+            "status": row["status"],
+            "view_count": row["view_count"],
+            "is_liked": row["id"] in liked,
+            "updated_time": format_datetime(row["updated_time"]),
+        }
+        for row in rows
+    ]
+
+
+def favourite_card_values(queryset):
+    """``queryset`` of ads projected to the columns of a favourites card."""
+    return queryset.values(
+        *AD_CARD_COLUMNS, *localized_columns("name"), *localized_columns("description")
+    )
+
+
+def build_favourite_cards(rows):
+    # As FavouriteProductListSerializer: ``address`` is always null and ``seller`` is left out,
+    # since neither source exists on the ad. ``is_liked`` is set by personalize_favourites.
+    name = localized_columns("name")
+    description = localized_columns("description")
+    format_datetime = datetime_formatter()
+    photos = AdPhoto._meta.get_field("image").storage
+    return [
+        {
+            "id": row["id"],
+            "name": localized(row, name),
+            "slug": row["slug"],
+            "description": localized(row, description),
+            "price": row["price"],
+            "published_at": format_datetime(row["published_at"]),
+            "updated_time": format_datetime(row["updated_time"]),
+            "address": None,
+            "photo": media_url(row["cover_photo__image"], photos),
+            "photo_renditions": cover_rendition_urls(row, photos),
+            "is_liked": False,
+        }
+        for row in rows
+    ]
+
+
+def personalize_favourites(cards, request):
+    cards = list(cards)
+    liked = liked_product_ids(request, {card["id"] for card in cards})
+    return [{**card, "is_liked": card["id"] in liked} for card in cards]
@@ -1,14 +1,17 @@
 import django_filters
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
 
 from .models import Ad
+from .search import SEARCH_ORDERING, search_ads
 
 
 class AdFilter(django_filters.FilterSet):
     price__gte = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
     price__lte = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
 
-    region_id = django_filters.NumberFilter(field_name="seller__region_id")
-    district_id = django_filters.NumberFilter(field_name="seller__district_id")
+    region_id = django_filters.NumberFilter(field_name="region_id")
+    district_id = django_filters.NumberFilter(field_name="district_id")
 
     seller_id = django_filters.NumberFilter(field_name="seller_id")
 
@@ -28,5 +31,20 @@ class AdFilter(django_filters.FilterSet):
         ]
 
     def filter_categories(self, queryset, name, value):
+        # Any of the categories or their descendants: one overlap on the GIN-indexed path.
         ids = [int(pk) for pk in value.split(",") if pk.isdigit()]
-        return queryset.filter(category_id__in=ids)
+        return queryset.filter(category__path__overlap=ids)
+
+
+class AdSearchFilter(SearchFilter):
+    """
+    Full-text ``search`` over the ad search vectors. Results are ranked unless the client
+    asked for an explicit ``ordering``, so it must come after ``OrderingFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        searched = search_ads(queryset, text)
+        if searched is queryset or request.query_params.get(api_settings.ORDERING_PARAM):
+            return searched
+        return searched.order_by(*SEARCH_ORDERING)
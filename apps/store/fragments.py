@@ -0,0 +1,182 @@
+import logging
+
+from common.utils.response_cache import INVALIDATE_SCRIPT
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis import get_redis_connection
+from modeltranslation.utils import get_language
+from redis.exceptions import RedisError
+
+from .feed import ad_card_values, build_ad_cards, build_favourite_cards, favourite_card_values
+from .models import Ad
+
+logger = logging.getLogger(__name__)
+
+# One rendered card per ad, kind and language, shared by every viewer. Cards are deleted when
+# the ad or its photos change (forget_ad_fragments) and, through the set of cards that show a
+# seller, when the seller or the seller's address change (forget_seller_fragments). Both also
+# mark the ad or seller as changed at the Redis time, and a card is only stored if nothing it
+# shows was marked since its rows were read, so a render racing a change cannot outlive it.
+# Entries still expire, for changes whose invalidation was lost to a Redis error.
+FRAGMENT_KEY = "store:fragment:{kind}:{language}:{pk}"
+SELLER_KEY = "store:fragment:seller:{pk}"
+CHANGED_KEY = "store:fragment:changed:{kind}:{pk}"
+FRAGMENT_TIMEOUT = 60 * 60
+# Longer than any render takes.
+CHANGED_TIMEOUT = 5 * 60
+
+# Sets KEYS to the Redis time in microseconds.
+MARK_CHANGED_SCRIPT = """
+local now = redis.call('TIME')
+local stamp = now[1] .. string.format('%06d', tonumber(now[2]))
+for _, key in ipairs(KEYS) do
+    redis.call('SET', key, stamp, 'EX', ARGV[1])
+end
+"""
+
+# KEYS: per card its key, its ad's change mark, its seller's change mark and card set ('' for
+# cards without a seller). ARGV: when the rows were read, the timeout, then the cards.
+STORE_SCRIPT = """
+local function changed(mark)
+    return mark ~= '' and tonumber(redis.call('GET', mark) or '0') >= tonumber(ARGV[1])
+end
+for i = 1, #ARGV - 2 do
+    local card, ad_mark, seller_mark, seller_set = KEYS[4*i-3], KEYS[4*i-2], KEYS[4*i-1], KEYS[4*i]
+    if not changed(ad_mark) and not changed(seller_mark) then
+        redis.call('SET', card, ARGV[i + 2], 'EX', ARGV[2])
+        if seller_set ~= '' then
+            -- Refreshed with every card, so the set outlives all of them.
+            redis.call('SADD', seller_set, card)
+            redis.call('EXPIRE', seller_set, ARGV[2])
+        end
+    end
+end
+"""
+
+# kind -> (values() projection of an Ad queryset, builder of the cards from its rows)
+KINDS = {
+    "card": (ad_card_values, build_ad_cards),
+    "favourite": (favourite_card_values, build_favourite_cards),
+}
+
+
+def fragment_key(kind, language, pk):
+    return FRAGMENT_KEY.format(kind=kind, language=language, pk=pk)
+
+
+def all_fragment_keys(*ad_ids):
+    """Every key of ``ad_ids``, in all kinds and languages."""
+    return [
+        fragment_key(kind, language, pk)
+        for pk in ad_ids
+        for kind in KINDS
+        for language, _ in settings.LANGUAGES
+    ]
+
+
+def changed_key(kind, pk):
+    return cache.make_key(CHANGED_KEY.format(kind=kind, pk=pk))
+
+
+def store_fragments(fragments, read_at):
+    """
+    Stores ``{key: card}``, adding the keys of cards that show a seller to the seller's set.
+    Cards of ads or sellers marked as changed since ``read_at`` (Redis microseconds) are not.
+    """
+    keys, cards = [], []
+    for key, card in fragments.items():
+        seller = card.get("seller")
+        has_seller = seller and seller["id"] is not None
+        keys += [
+            cache.make_key(key),
+            changed_key("ad", card["id"]),
+            changed_key("seller", seller["id"]) if has_seller else "",
+            cache.make_key(SELLER_KEY.format(pk=seller["id"])) if has_seller else "",
+        ]
+        cards.append(cache.client.encode(card))
+    if cards:
+        get_redis_connection().eval(
+            STORE_SCRIPT, len(keys), *keys, read_at, FRAGMENT_TIMEOUT, *cards
+        )
+
+
+def ad_fragments(kind, ad_ids):
+    """
+    The ``kind`` cards of ``ad_ids`` in the active language and in the same order, from one
+    multi-get. Misses are rendered from a single query and stored; deleted ads are left out.
+    """
+    ad_ids = list(ad_ids)
+    language = get_language()
+    keys = {pk: fragment_key(kind, language, pk) for pk in ad_ids}
+    if not keys:
+        return []
+    # The Redis time comes with the cards, so it precedes reading any missing rows.
+    try:
+        pipe = get_redis_connection().pipeline(transaction=False)
+        pipe.time()
+        pipe.mget([cache.make_key(key) for key in keys.values()])
+        (seconds, microseconds), cached = pipe.execute()
+    except RedisError as e:
+        # Every card is rendered, and none is stored without a read time to check it against.
+        logger.warning(f"{kind} cards were not read: {e}")
+        seconds, cached = None, [None] * len(keys)
+    fragments = {
+        pk: cache.client.decode(value) for pk, value in zip(keys, cached) if value is not None
+    }
+
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        values, build = KINDS[kind]
+        rendered = {card["id"]: card for card in build(values(Ad.objects.filter(pk__in=missing)))}
+        if seconds is None:
+            return [rendered[pk] for pk in ad_ids if pk in rendered]
+        try:
+            store_fragments(
+                {keys[pk]: card for pk, card in rendered.items()},
+                seconds * 1_000_000 + microseconds,
+            )
+        except RedisError as e:
+            logger.warning(f"{kind} cards were not cached: {e}")
+        fragments.update(rendered)
+    return [fragments[pk] for pk in ad_ids if pk in fragments]
+
+
+def forget_ad_fragments(*ad_ids):
+    """Marks ``ad_ids`` as changed and deletes all their cards once the transaction commits."""
+    if not ad_ids:
+        return
+
+    def forget():
+        try:
+            marks = [changed_key("ad", pk) for pk in ad_ids]
+            pipe = get_redis_connection().pipeline(transaction=False)
+            pipe.eval(MARK_CHANGED_SCRIPT, len(marks), *marks, CHANGED_TIMEOUT)
+            pipe.delete(*(cache.make_key(key) for key in all_fragment_keys(*ad_ids)))
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Cards of ads {ad_ids} were not deleted: {e}")
+
+    transaction.on_commit(forget)
+
+
+def forget_seller_fragments(*seller_ids):
+    """
+    Marks ``seller_ids`` as changed and deletes every card that shows one of them once the
+    transaction commits.
+    """
+    if not seller_ids:
+        return
+
+    def forget():
+        try:
+            marks = [changed_key("seller", pk) for pk in seller_ids]
+            keys = [cache.make_key(SELLER_KEY.format(pk=pk)) for pk in seller_ids]
+            pipe = get_redis_connection().pipeline(transaction=False)
+            pipe.eval(MARK_CHANGED_SCRIPT, len(marks), *marks, CHANGED_TIMEOUT)
+            pipe.eval(INVALIDATE_SCRIPT, len(keys), *keys)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Cards of sellers {seller_ids} were not deleted: {e}")
+
+    transaction.on_commit(forget)
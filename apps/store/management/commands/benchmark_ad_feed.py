@@ -0,0 +1,157 @@
+import time
+import uuid
+
+from accounts.models import Address, CustomUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from store.feed import my_ad_values, personalize_ad_cards, personalize_favourites, render_my_ads
+from store.fragments import ad_fragments, all_fragment_keys
+from store.models import Ad, AdPhoto, Category, FavouriteProduct
+from store.serializers import (
+    AdListSerializer,
+    FavouriteProductListSerializer,
+    MyAdsListSerializer,
+)
+from store.views import AdListView, MyAdsListAPIView, MyFavouriteProductView
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the values()-based ad feed against the serializers it replaces for the ad list, "
+        "my ads and favourites, on pages of the given sizes, and check both give the same JSON. "
+        "Ad list and favourites cards are timed with an empty fragment store (cold) and a "
+        "filled one (warm)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="20,100,1000",
+            help="Comma-separated page sizes (default 20,100,1000).",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per measurement; the best one is kept."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers.")
+
+        with transaction.atomic():
+            seller = self.seed(max(sizes))
+            request = Request(RequestFactory().get("/"))
+            request.user = seller
+            request.LANGUAGE_CODE = "uz"
+            context = {"request": request}
+            shapes = [
+                (
+                    "ad list",
+                    AdListView.queryset.filter(seller=seller).order_by("-published_at"),
+                    lambda rows: AdListSerializer(rows, many=True, context=context).data,
+                    lambda rows: personalize_ad_cards(
+                        ad_fragments("card", rows.values_list("id", flat=True)), request
+                    ),
+                ),
+                (
+                    "my ads",
+                    MyAdsListAPIView(request=request).get_queryset(),
+                    lambda rows: MyAdsListSerializer(rows, many=True, context=context).data,
+                    lambda rows: render_my_ads(my_ad_values(rows), request),
+                ),
+                (
+                    "favourites",
+                    MyFavouriteProductView(request=request).get_queryset(),
+                    lambda rows: FavouriteProductListSerializer(
+                        rows, many=True, context=context
+                    ).data,
+                    lambda rows: personalize_favourites(
+                        ad_fragments("favourite", rows.values_list("product_id", flat=True)),
+                        request,
+                    ),
+                ),
+            ]
+            results = [
+                (label, size, *self.compare(queryset[:size], serialize, render, options["repeat"]))
+                for label, queryset, serialize, render in shapes
+                for size in sizes
+            ]
+            transaction.set_rollback(True)
+        # The seeded ads are gone; so must be their cards.
+        self.forget_fragments()
+
+        self.stdout.write(
+            f"{'list':<12}{'rows':>6}{'serializer ms':>15}{'cold ms':>10}{'warm ms':>10}  speedup"
+        )
+        for label, size, slow, cold, warm, same in results:
+            line = (
+                f"{label:<12}{size:>6}{slow:>15.2f}{cold:>10.2f}{warm:>10.2f}"
+                f"  {slow / cold:6.1f}x {slow / warm:6.1f}x"
+            )
+            self.stdout.write(line + ("" if same else "  OUTPUT DIFFERS"))
+        if not all(same for *_, same in results):
+            raise CommandError("The feed output differs from the serializers.")
+
+    def compare(self, queryset, serialize, render, repeat):
+        # Cold runs render every card again, warm runs read them from the fragment store; my ads
+        # has no fragments, so both measure the same thing there.
+        runs = [("serializer", serialize, None), ("cold", render, True), ("warm", render, False)]
+        timings, outputs = {}, []
+        for name, build, cold in runs:
+            best = None
+            for _ in range(repeat):
+                if cold:
+                    self.forget_fragments()
+                started = time.perf_counter()
+                # A fresh queryset each run, so the query is timed too.
+                data = build(queryset.all())
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+            outputs.append(JSONRenderer().render(data))
+        same = all(output == outputs[0] for output in outputs)
+        return timings["serializer"], timings["cold"], timings["warm"], same
+
+    def forget_fragments(self):
+        # Now, not on commit: the cold runs happen inside the seeding transaction.
+        cache.delete_many(all_fragment_keys(*self.ad_ids))
+
+    def seed(self, size):
+        run = uuid.uuid4().hex[:8]
+        seller = CustomUser.objects.create(
+            phone_number=f"feed-{run}",
+            full_name="Feed seller",
+            profile_photo="profiles/feed.jpg",
+            address=Address.objects.create(name="Feed street"),
+        )
+        category = Category.objects.create(name=f"Feed {run}")
+        ads = Ad.objects.bulk_create(
+            Ad(
+                name_uz=f"Feed ad {i}",
+                name_ru=f"Лента {i}" if i % 2 else "",
+                description_uz="Feed description",
+                slug=f"feed-{run}-{i}",
+                price=1000 + i,
+                category=category,
+                seller=seller,
+                status="active",
+            )
+            for i in range(size)
+        )
+        photos = AdPhoto.objects.bulk_create(
+            AdPhoto(ad=ad, image=f"products/feed-{i}.jpg") for i, ad in enumerate(ads) if i % 3
+        )
+        for photo in photos:
+            photo.ad.cover_photo = photo
+        Ad.objects.bulk_update([photo.ad for photo in photos], ["cover_photo"])
+        FavouriteProduct.objects.bulk_create(
+            FavouriteProduct(user=seller, product=ad) for ad in ads
+        )
+        self.ad_ids = [ad.pk for ad in ads]
+        self.stdout.write(f"Seeded {size} ads.")
+        return seller
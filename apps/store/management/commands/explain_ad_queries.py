@@ -0,0 +1,176 @@
+import json
+import random
+import uuid
+
+from accounts.models import CustomUser
+from common.models import Region
+from common.pagination import AdListPagination
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.test import RequestFactory
+from rest_framework.request import Request
+from store.models import Ad, Category
+from store.views import AdListView
+
+ORDERINGS = ["-published_at", "price", "-price", "-view_count"]
+STATUS_WEIGHTS = {"active": 70, "inactive": 10, "pending": 15, "rejected": 5}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN (ANALYZE, BUFFERS) on the first AdListView page for a matrix of AdFilter "
+        "filters and orderings, and flag sequential scans and sorts that spill to disk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Create this many ads (with sellers and categories) first; rolled back after.",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Only flag sequential scans that read at least this many rows.",
+        )
+        parser.add_argument(
+            "--strict", action="store_true", help="Exit with an error if anything was flagged."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            rows = [
+                (label, *self.explain(params, options["min_rows"]))
+                for label, params in self.matrix()
+            ]
+            # EXPLAIN ANALYZE runs the queries; nothing of the run is kept.
+            transaction.set_rollback(True)
+
+        width = max(len(label) for label, *_ in rows)
+        self.stdout.write(f"{'query'.ljust(width)}  {'ms':>8}  {'hit':>7}  {'read':>7}  flags")
+        for label, milliseconds, hit, read, flags in rows:
+            line = f"{label.ljust(width)}  {milliseconds:8.2f}  {hit:7}  {read:7}  "
+            self.stdout.write(line + ("; ".join(flags) or "ok"))
+
+        flagged = sum(1 for *_, flags in rows if flags)
+        summary = f"{flagged} of {len(rows)} queries flagged."
+        if flagged and options["strict"]:
+            raise CommandError(summary)
+        self.stdout.write(self.style.WARNING(summary) if flagged else self.style.SUCCESS(summary))
+
+    def matrix(self):
+        """``(label, query params)`` for every filter shape crossed with every ordering."""
+        if not Ad.objects.exists():
+            raise CommandError("There are no ads to explain; pass --seed to create some.")
+
+        def most_common(field):
+            rows = Ad.objects.exclude(**{f"{field}__isnull": True}).values_list(field)
+            top = rows.annotate(n=Count("id")).order_by("-n").first()
+            return top[0] if top else None
+
+        category_id = most_common("category_id")
+        root_id = Category.objects.values_list("path", flat=True).get(pk=category_id)[:1]
+        prices = Ad.objects.aggregate(low=Min("price"), high=Max("price"))
+        step = (prices["high"] - prices["low"]) // 4
+        price = {"price__gte": prices["low"] + step, "price__lte": prices["low"] + 2 * step}
+
+        filters = [
+            ("all", {}),
+            ("category", {"category_ids": category_id}),
+            ("category tree", {"category_ids": root_id[0] if root_id else category_id}),
+            ("price", price),
+            ("category+price", {"category_ids": category_id, **price}),
+            ("seller", {"seller_id": most_common("seller_id")}),
+            ("top", {"is_top": "true"}),
+        ]
+        region_id = most_common("region_id")
+        if region_id:
+            filters.append(("region", {"region_id": region_id}))
+
+        for name, params in filters:
+            for ordering in ORDERINGS:
+                yield f"{name} {ordering}", {**params, "ordering": ordering}
+
+    def queryset(self, params):
+        # The queryset AdListView would paginate for these query params.
+        view = AdListView()
+        view.request = Request(RequestFactory().get("/", params))
+        view.args, view.kwargs, view.format_kwarg = (), {}, None
+        return view.filter_queryset(view.get_queryset())[: AdListPagination.page_size]
+
+    def explain(self, params, min_rows):
+        [result] = json.loads(
+            self.queryset(params).explain(format="json", analyze=True, buffers=True)
+        )
+        plan = result["Plan"]
+        flags, stack = [], [plan]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.get("Plans", []))
+            if node["Node Type"] == "Seq Scan":
+                scanned = node["Actual Rows"] + node.get("Rows Removed by Filter", 0)
+                if scanned * node["Actual Loops"] >= min_rows:
+                    flags.append(f"seq scan on {node['Relation Name']} ({scanned} rows)")
+            if node.get("Sort Space Type") == "Disk":
+                flags.append(f"sort spilled to disk ({node['Sort Space Used']} kB)")
+        return (
+            result["Execution Time"],
+            plan.get("Shared Hit Blocks", 0),
+            plan.get("Shared Read Blocks", 0),
+            flags,
+        )
+
+    def seed(self, size):
+        run = uuid.uuid4().hex[:8]
+        region = Region.objects.create(name=f"Explain {run}")
+        sellers = CustomUser.objects.bulk_create(
+            CustomUser(
+                phone_number=f"explain-{run}-{i}",
+                full_name=f"Explain seller {i}",
+                region=region if i % 2 else None,
+            )
+            for i in range(max(size // 100, 1))
+        )
+        roots = Category.objects.bulk_create(Category(name=f"Explain {i}") for i in range(5))
+        children = Category.objects.bulk_create(
+            Category(name=f"Explain {root.pk}.{i}", parent=root) for root in roots for i in range(5)
+        )
+        for category in roots:
+            category.path = [category.pk]
+        for category in children:
+            category.path = [category.parent_id, category.pk]
+        Category.objects.bulk_update([*roots, *children], ["path"])
+
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        ads = []
+        for i in range(size):
+            seller = random.choice(sellers)
+            ads.append(
+                Ad(
+                    name=f"Explain ad {i}",
+                    slug=f"explain-{run}-{i}",
+                    description="Explain description",
+                    price=random.randint(1, 100) * 10_000,
+                    category=random.choice(children),
+                    seller=seller,
+                    region_id=seller.region_id,
+                    view_count=random.randint(0, 5000),
+                    is_top=random.random() < 0.05,
+                    status=random.choices(statuses, weights)[0],
+                )
+            )
+        Ad.objects.bulk_create(ads, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Ad._meta.db_table} "
+                "SET published_at = now() - random() * interval '365 days' WHERE id = ANY(%s)",
+                [[ad.pk for ad in ads]],
+            )
+            for model in (Ad, Category, CustomUser):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+        self.stdout.write(f"Seeded {size} ads.")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from store.search_counts import flush_search_counts
+
+
+class Command(BaseCommand):
+    help = "Upsert the product search counts kept in Redis into SearchCount. Run it periodically."
+
+    def handle(self, *args, **options):
+        count = flush_search_counts()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {count} product searches."))
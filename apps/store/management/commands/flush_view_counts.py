@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from store.view_counts import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = "Write the ad views recorded in Redis to Ad.view_count. Run it periodically."
+
+    def handle(self, *args, **options):
+        count = flush_view_counts()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {count} ad views."))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from store.models import AdPhoto
+from store.renditions import BATCH_SIZE, pending_renditions, process_renditions, schedule_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the thumbnails and WebP variants of uploaded ad photos in this process, without "
+        "a Celery worker. Runs until interrupted, or drains the queue once with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="First queue every photo that has no renditions yet.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="Seconds to wait on an empty queue."
+        )
+
+    def handle(self, *args, **options):
+        if options["missing"]:
+            photo_ids = list(AdPhoto.objects.filter(renditions={}).values_list("pk", flat=True))
+            schedule_renditions(*photo_ids)
+            self.stdout.write(f"Queued {len(photo_ids)} photos.")
+
+        total = 0
+        try:
+            while True:
+                rendered = process_renditions(options["batch_size"])
+                total += rendered
+                if rendered:
+                    self.stdout.write(f"Rendered {rendered} photos, {pending_renditions()} left.")
+                elif not pending_renditions():
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Rendered {total} photos."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from store.counters import rebuild_category_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute every category's ad counters from the Ad table."
+
+    def handle(self, *args, **options):
+        count = rebuild_category_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ad counters for {count} categories."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from store.popularity import is_restored, restore_popularity, snapshot_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the decayed popularity scores kept in Redis into SearchCount, or reload them "
+        "from SearchCount after Redis lost them. Run it periodically."
+    )
+
+    def handle(self, *args, **options):
+        if not is_restored():
+            count = restore_popularity()
+            self.stdout.write(self.style.SUCCESS(f"Restored popularity of {count} products."))
+        count = snapshot_popularity()
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted popularity of {count} products."))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from store.suggestions import SuggestionIndex
+
+
+class Command(BaseCommand):
+    help = "Build the search suggestion index once and report its size, memory and timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            default=[],
+            help="Prefix to time a lookup for (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        index = SuggestionIndex().build()
+        self.stdout.write(f"Entries: {len(index)}")
+        for language in index.languages:
+            self.stdout.write(f"  {language}: {index.count(language)}")
+        self.stdout.write(f"Memory: {index.memory_usage() / 1024 / 1024:.2f} MiB")
+        self.stdout.write(f"Rebuild time: {index.build_seconds * 1000:.1f} ms")
+
+        for prefix in options["prefix"]:
+            for language in index.languages:
+                started = time.perf_counter()
+                found = index.lookup(prefix, language)
+                elapsed = (time.perf_counter() - started) * 1_000_000
+                self.stdout.write(
+                    f"Lookup {prefix!r} ({language}): {len(found)} results in {elapsed:.0f} µs"
+                )
@@ -0,0 +1,9 @@
+from django.db import models
+
+
+class AdManager(models.Manager):
+    # The search vectors are only read inside SQL (filters and ranks), never from Python.
+    deferred_fields = ("search_vector_uz", "search_vector_ru")
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.deferred_fields)
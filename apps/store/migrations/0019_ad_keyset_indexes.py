@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0018_remove_ad_address"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["published_at", "id"], name="ad_published_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["price", "id"], name="ad_price_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["view_count", "id"], name="ad_view_count_id_idx"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 11:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_cover_photo(apps, schema_editor):
+    Ad = apps.get_model("store", "Ad")
+    AdPhoto = apps.get_model("store", "AdPhoto")
+    cover = AdPhoto.objects.filter(ad_id=OuterRef("pk")).order_by("-is_main", "id")
+    Ad.objects.update(cover_photo=Subquery(cover.values("id")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0019_ad_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="cover_photo",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="store.adphoto",
+            ),
+        ),
+        migrations.RunPython(fill_cover_photo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counters(apps, schema_editor):
+    Ad = apps.get_model("store", "Ad")
+    Category = apps.get_model("store", "Category")
+    CategoryAdCounter = apps.get_model("store", "CategoryAdCounter")
+
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    counters = {category_id: CategoryAdCounter(category_id=category_id) for category_id in parents}
+    rows = Ad.objects.values("category_id").annotate(
+        total=Count("id"), active=Count("id", filter=Q(status="active"))
+    )
+    for row in rows:
+        counter = counters[row["category_id"]]
+        counter.ad_count, counter.active_ad_count = row["total"], row["active"]
+        category_id, seen = row["category_id"], set()
+        while category_id is not None and category_id not in seen:
+            seen.add(category_id)
+            counters[category_id].total_ad_count += row["total"]
+            counters[category_id].total_active_ad_count += row["active"]
+            category_id = parents[category_id]
+    CategoryAdCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0020_ad_cover_photo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryAdCounter",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ad_counter",
+                        serialize=False,
+                        to="store.category",
+                    ),
+                ),
+                ("ad_count", models.IntegerField(default=0)),
+                ("active_ad_count", models.IntegerField(default=0)),
+                ("total_ad_count", models.IntegerField(default=0)),
+                ("total_active_ad_count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
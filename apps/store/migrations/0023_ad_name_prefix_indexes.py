@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 11:50
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0022_ad_search_vectors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper("name_uz"), "C"
+                ),
+                condition=models.Q(("status", "active")),
+                name="ad_name_uz_prefix_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper("name_ru"), "C"
+                ),
+                condition=models.Q(("status", "active")),
+                name="ad_name_ru_prefix_idx",
+            ),
+        ),
+    ]
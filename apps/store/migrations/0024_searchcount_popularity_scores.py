@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0023_ad_name_prefix_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchcount",
+            name="day_score",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="searchcount",
+            name="scored_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="searchcount",
+            name="week_score",
+            field=models.FloatField(default=0),
+        ),
+    ]
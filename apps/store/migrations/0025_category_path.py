@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 12:13
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    Category = apps.get_model("store", "Category")
+
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    categories = []
+    for category_id in parents:
+        path, current = [], category_id
+        while current is not None and current not in path:
+            path.append(current)
+            current = parents[current]
+        categories.append(Category(id=category_id, path=path[::-1]))
+    Category.objects.bulk_update(categories, ["path"], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0024_searchcount_popularity_scores"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.PositiveIntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["path"], name="category_path_idx"
+            ),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-18 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0025_category_path"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The composite indexes exist before the single-column FK indexes are dropped.
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["category", "published_at", "id"], name="ad_category_published_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["category", "price", "id"], name="ad_category_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["seller", "published_at", "id"], name="ad_seller_published_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                condition=models.Q(("is_top", True)),
+                fields=["published_at", "id"],
+                name="ad_top_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                condition=models.Q(("status", "active")),
+                fields=["published_at", "id"],
+                name="ad_active_published_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ad",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False, on_delete=django.db.models.deletion.CASCADE, to="store.category"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ad",
+            name="seller",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
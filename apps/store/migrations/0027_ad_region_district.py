@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_seller_location(apps, schema_editor):
+    Ad = apps.get_model("store", "Ad")
+    CustomUser = apps.get_model("accounts", "CustomUser")
+
+    seller = CustomUser.objects.filter(pk=OuterRef("seller_id"))
+    Ad.objects.update(
+        region_id=Subquery(seller.values("region_id")[:1]),
+        district_id=Subquery(seller.values("district_id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0007_alter_district_guid_alter_page_guid_and_more"),
+        ("store", "0026_ad_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="district",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="common.district",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="region",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="common.region",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["region", "published_at", "id"], name="ad_region_published_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["district", "published_at", "id"], name="ad_district_published_idx"
+            ),
+        ),
+        migrations.RunPython(copy_seller_location, migrations.RunPython.noop),
+    ]
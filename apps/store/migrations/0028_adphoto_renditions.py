@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0027_ad_region_district"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adphoto",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0028_adphoto_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AppliedFlush",
+            fields=[
+                ("flush_id", models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ("buffer", models.CharField(max_length=100)),
+                ("applied_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
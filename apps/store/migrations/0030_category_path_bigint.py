@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 13:53
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0029_applied_flush"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="category",
+            name="path",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+    ]
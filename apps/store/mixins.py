@@ -1,32 +1,59 @@
+from rest_framework import serializers
+
+from .models import FavouriteProduct
+
+
+def viewer_favourites(request, device_id=None):
+    """The favourites of the request's user, or of its device for guests; ``None`` if neither."""
+    user = getattr(request, "user", None)
+    if user and user.is_authenticated:
+        return FavouriteProduct.objects.filter(user=user)
+    if request:
+        device_id = request.query_params.get("device_id") or device_id
+    if not device_id:
+        return None
+    return FavouriteProduct.objects.filter(device_id=device_id)
+
+
+def liked_product_ids(request, product_ids, device_id=None):
+    """The subset of ``product_ids`` the viewer of ``request`` has liked, in one query."""
+    favourites = viewer_favourites(request, device_id)
+    if favourites is None or not product_ids:
+        return set()
+    return set(favourites.filter(product_id__in=product_ids).values_list("product_id", flat=True))
+
+
 class LikedMixin:
     def get_is_liked(self, obj):
-        request = self.context.get("request")
-        user = getattr(request, "user", None)
-        device_id = None
+        return self.get_liked_product_id(obj) in self.get_liked_product_ids()
 
-        if request and (not user or not user.is_authenticated):
-            device_id = request.query_params.get("device_id") or self.context.get("device_id")
+    def get_liked_product_id(self, obj):
+        return obj.pk
 
-        favourites_qs = getattr(obj, "favourites", getattr(obj, "likes", None))
-        if not favourites_qs:
-            return False
+    def get_liked_product_ids(self):
+        # With many=True every row shares the parent ListSerializer, so the whole page is
+        # resolved with a single query and the result is cached there.
+        holder = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+        if not hasattr(holder, "_liked_product_ids"):
+            objects = holder.instance if holder is not self else [self.instance]
+            holder._liked_product_ids = self.load_liked_product_ids(objects)
+        return holder._liked_product_ids
 
-        favourites_qs = favourites_qs.all()
-
-        if user and user.is_authenticated:
-            return favourites_qs.filter(user=user).exists()
-        elif device_id:
-            return favourites_qs.filter(device_id=device_id).exists()
-        return False
+    def load_liked_product_ids(self, objects):
+        product_ids = {self.get_liked_product_id(obj) for obj in objects if obj is not None}
+        return liked_product_ids(
+            self.context.get("request"), product_ids, self.context.get("device_id")
+        )
 
 
 class PhotoMixin:
-    def get_photo(self, obj, main_only=False):
-        if main_only:
-            photo = obj.photos.filter(is_main=True).first()
-        else:
-            photo = obj.photos.first()
-        return photo.image.url if photo else None
+    def get_photo(self, obj):
+        cover = obj.cover_photo
+        return cover.image.url if cover else None
+
+    def get_photo_renditions(self, obj):
+        cover = obj.cover_photo
+        return cover.rendition_urls() if cover else None
 
 
 class LocalizedNameDescriptionMixin:
@@ -37,10 +64,9 @@ class LocalizedNameDescriptionMixin:
 
 class IconMixin:
     def get_icon(self, obj):
-        if hasattr(obj, "photos"):
-            main_photo = obj.photos.filter(is_main=True).first() or obj.photos.first()
-            if main_photo and main_photo.image:
-                return main_photo.image.url
+        cover = getattr(obj, "cover_photo", None)
+        if cover and cover.image:
+            return cover.image.url
 
         if hasattr(obj, "icon") and obj.icon:
             return obj.icon.url
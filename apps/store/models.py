@@ -1,9 +1,17 @@
-from common.models import BaseModel, Region
+from common.models import BaseModel, District, Region
 from common.validators import icon_extensions
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Collate, Upper
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .managers import AdManager
+
 
 class Category(BaseModel):
     parent = models.ForeignKey(
@@ -17,6 +25,8 @@ class Category(BaseModel):
     icon = models.FileField(
         upload_to="categories/", validators=[icon_extensions], null=True, blank=True
     )
+    # Ids from the root down to this category, maintained by refresh_path.
+    path = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
 
     def __str__(self):
         return getattr(self, "name", "Category")
@@ -24,6 +34,29 @@ class Category(BaseModel):
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categories"
+        indexes = [GinIndex(fields=["path"], name="category_path_idx")]
+
+    def refresh_path(self):
+        """
+        Stores the path below the parent's and, if the category moved, rewrites the paths of
+        its whole subtree.
+        """
+        paths = dict(
+            Category.objects.filter(pk__in=[self.pk, self.parent_id]).values_list("pk", "path")
+        )
+        old_path = paths[self.pk]
+        path = [*paths.get(self.parent_id, []), self.pk]
+        if old_path == path:
+            return
+
+        Category.objects.filter(pk=self.pk).update(path=path)
+        self.path = path
+        if old_path:
+            # A new category has no subtree yet; a moved one takes its descendants along.
+            subtree = list(Category.objects.filter(path__contains=[self.pk]).exclude(pk=self.pk))
+            for category in subtree:
+                category.path = path + category.path[len(old_path) :]
+            Category.objects.bulk_update(subtree, ["path"])
 
 
 class Ad(models.Model):
@@ -38,8 +71,17 @@ class Ad(models.Model):
     description = models.TextField()
     slug = models.SlugField(unique=True, blank=True)
     price = models.PositiveIntegerField()
-    category = models.ForeignKey("store.Category", on_delete=models.CASCADE)
-    seller = models.ForeignKey("accounts.CustomUser", on_delete=models.CASCADE)
+    # Both lead a composite index in Meta, which also serves the FK lookups.
+    category = models.ForeignKey("store.Category", on_delete=models.CASCADE, db_index=False)
+    seller = models.ForeignKey("accounts.CustomUser", on_delete=models.CASCADE, db_index=False)
+    # The seller's location, copied on creation and kept in sync by store.signals, so location
+    # filters need no join to the seller. Indexed through composites in Meta as well.
+    region = models.ForeignKey(
+        Region, on_delete=models.SET_NULL, null=True, blank=True, db_index=False
+    )
+    district = models.ForeignKey(
+        District, on_delete=models.SET_NULL, null=True, blank=True, db_index=False
+    )
     published_at = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=False)
@@ -47,6 +89,72 @@ class Ad(models.Model):
     likes = models.ManyToManyField("accounts.CustomUser", related_name="liked_ads", blank=True)
     is_top = models.BooleanField(default=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    cover_photo = models.ForeignKey(
+        "store.AdPhoto",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    # Full-text vectors per translation, computed by PostgreSQL on every write (see store.search).
+    search_vector_uz = models.GeneratedField(
+        expression=SearchVector("name_uz", weight="A", config="simple")
+        + SearchVector("description_uz", weight="B", config="simple"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    search_vector_ru = models.GeneratedField(
+        expression=SearchVector("name_ru", weight="A", config="russian")
+        + SearchVector("description_ru", weight="B", config="russian"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = AdManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seeks on (ordering field, id) for every AdListView ordering.
+            models.Index(fields=["published_at", "id"], name="ad_published_at_id_idx"),
+            models.Index(fields=["price", "id"], name="ad_price_id_idx"),
+            models.Index(fields=["view_count", "id"], name="ad_view_count_id_idx"),
+            # AdFilter shapes (see the explain_ad_queries command): a category listing newest
+            # first or by price, a seller's ads newest first, and the top and active feeds.
+            models.Index(
+                fields=["category", "published_at", "id"], name="ad_category_published_idx"
+            ),
+            models.Index(fields=["category", "price", "id"], name="ad_category_price_idx"),
+            models.Index(fields=["seller", "published_at", "id"], name="ad_seller_published_idx"),
+            models.Index(fields=["region", "published_at", "id"], name="ad_region_published_idx"),
+            models.Index(
+                fields=["district", "published_at", "id"], name="ad_district_published_idx"
+            ),
+            models.Index(
+                fields=["published_at", "id"],
+                name="ad_top_published_idx",
+                condition=models.Q(is_top=True),
+            ),
+            models.Index(
+                fields=["published_at", "id"],
+                name="ad_active_published_idx",
+                condition=models.Q(status="active"),
+            ),
+            GinIndex(fields=["search_vector_uz"], name="ad_search_vector_uz_idx"),
+            GinIndex(fields=["search_vector_ru"], name="ad_search_vector_ru_idx"),
+            # Autocomplete prefix ranges over active ads, in byte order so a range scan can
+            # also return rows already sorted (see store.search.autocomplete_ads).
+            models.Index(
+                Collate(Upper("name_uz"), "C"),
+                name="ad_name_uz_prefix_idx",
+                condition=models.Q(status="active"),
+            ),
+            models.Index(
+                Collate(Upper("name_ru"), "C"),
+                name="ad_name_ru_prefix_idx",
+                condition=models.Q(status="active"),
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -57,17 +165,49 @@ class Ad(models.Model):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug
+        if self._state.adding and self.region_id is None and self.district_id is None:
+            self.region_id = self.seller.region_id
+            self.district_id = self.seller.district_id
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_cover_photo(cls, ad_id):
+        # The cover is the first main photo, or the first uploaded one if none is marked main.
+        cover = AdPhoto.objects.filter(ad_id=OuterRef("pk")).order_by("-is_main", "id")
+        cls.objects.filter(pk=ad_id).update(
+            cover_photo=Subquery(cover.values("id")[:1]), updated_time=timezone.now()
+        )
+
 
 class AdPhoto(models.Model):
+    # name -> (box, whether the image is cropped to fill it, format), rendered by store.renditions.
+    RENDITIONS = {
+        "thumbnail": ((320, 320), True, "JPEG"),
+        "thumbnail_webp": ((320, 320), True, "WEBP"),
+        "large_webp": ((1280, 1280), False, "WEBP"),
+    }
+
     ad = models.ForeignKey(Ad, related_name="photos", on_delete=models.CASCADE)
     image = models.ImageField(upload_to="products/")
     is_main = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Rendition name -> storage name, filled in by the worker once the upload is processed.
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    def rendition_urls(self):
+        return rendition_urls(self.image.name, self.renditions, self.image.storage)
+
+
+def rendition_urls(image, renditions, storage):
+    """URL of every rendition of the stored ``image``; the original's until it is rendered."""
+    original = storage.url(image) if image else None
+    return {
+        name: storage.url(renditions[name]) if renditions and name in renditions else original
+        for name in AdPhoto.RENDITIONS
+    }
 
 
 class FavouriteProduct(models.Model):
@@ -128,7 +268,36 @@ class SearchCount(models.Model):
         "store.Ad", on_delete=models.CASCADE, related_name="search_count_obj"
     )
     search_count = models.PositiveIntegerField(default=0)
+    # Decayed popularity as of ``scored_at``, snapshotted from Redis by store.popularity.
+    day_score = models.FloatField(default=0)
+    week_score = models.FloatField(default=0)
+    scored_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.product.name} ({self.search_count})"
+
+
+class CategoryAdCounter(models.Model):
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, primary_key=True, related_name="ad_counter"
+    )
+    ad_count = models.IntegerField(default=0)
+    active_ad_count = models.IntegerField(default=0)
+    # Same counts including every descendant category.
+    total_ad_count = models.IntegerField(default=0)
+    total_active_ad_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.category} ({self.ad_count})"
+
+
+class AppliedFlush(models.Model):
+    """A batch of a Redis counter buffer already written to the database (see store.buffers)."""
+
+    flush_id = models.CharField(max_length=32, primary_key=True)
+    buffer = models.CharField(max_length=100)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.buffer} {self.flush_id}"
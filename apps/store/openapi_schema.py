@@ -115,6 +115,28 @@ seller_schema = openapi.Schema(
     },
 )
 
+photo_renditions_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    description="URL per rendition; the original's until the upload has been processed.",
+    properties={
+        "thumbnail": openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_URI,
+            example="/media/products/renditions/iphone15_main-thumbnail.jpg",
+        ),
+        "thumbnail_webp": openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_URI,
+            example="/media/products/renditions/iphone15_main-thumbnail_webp.webp",
+        ),
+        "large_webp": openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_URI,
+            example="/media/products/renditions/iphone15_main-large_webp.webp",
+        ),
+    },
+)
+
 ad_list_response = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     properties={
@@ -127,6 +149,7 @@ ad_list_response = openapi.Schema(
             format=openapi.FORMAT_URI,
             example="https://admin.77.uz/media/products/iphone15_main.jpg",
         ),
+        "photo_renditions": photo_renditions_schema,
         "published_at": openapi.Schema(
             type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, example="2024-01-15T10:30:00Z"
         ),
@@ -194,7 +217,7 @@ ad_list_parameters = [
     openapi.Parameter(
         "category_ids",
         openapi.IN_QUERY,
-        description="Kategoriya IDlari filtri",
+        description="Kategoriya IDlari filtri (ichki kategoriyalari bilan)",
         type=openapi.TYPE_STRING,
         example="15,16,17",
     ),
@@ -215,6 +238,20 @@ ad_list_parameters = [
         type=openapi.TYPE_INTEGER,
         example=20,
     ),
+    openapi.Parameter(
+        "pagination",
+        openapi.IN_QUERY,
+        description="Sahifalash rejimi: `cursor` bo'lsa, sahifa raqami o'rniga kursor ishlatiladi",
+        type=openapi.TYPE_STRING,
+        enum=["page", "cursor"],
+        example="cursor",
+    ),
+    openapi.Parameter(
+        "cursor",
+        openapi.IN_QUERY,
+        description="Keyingi/oldingi sahifa kursori (`next`/`previous` havolasidan olinadi)",
+        type=openapi.TYPE_STRING,
+    ),
 ]
 
 # ----------------------------
@@ -363,6 +400,7 @@ my_favourite_products_response = openapi.Response(
                 "photo": openapi.Schema(
                     type=openapi.TYPE_STRING, format="uri", example="/media/products/img1.jpg"
                 ),
+                "photo_renditions": photo_renditions_schema,
                 "is_liked": openapi.Schema(type=openapi.TYPE_BOOLEAN, example=False),
                 "updated_time": openapi.Schema(
                     type=openapi.TYPE_STRING, format="date-time", example="2025-08-07T13:00:00Z"
@@ -436,14 +474,37 @@ search_category_response = openapi.Schema(
     },
 )
 
+# One page of matching categories followed by matching products (CategoryProductSearchPagination).
 search_product_response = openapi.Schema(
     type=openapi.TYPE_OBJECT,
+    required=["results"],
     properties={
-        "id": openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
-        "name": openapi.Schema(type=openapi.TYPE_STRING, example="iPhone 14"),
-        "type": openapi.Schema(type=openapi.TYPE_STRING, example="product"),
-        "icon": openapi.Schema(
-            type=openapi.TYPE_STRING, format="uri", example="/media/products/img1.jpg"
+        "next": openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_URI,
+            nullable=True,
+            example="https://api.example.com/store/search/category-product/?cursor=cz0xJnA9...",
+        ),
+        "results": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "id": openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
+                    "name": openapi.Schema(type=openapi.TYPE_STRING, example="iPhone 14"),
+                    "type": openapi.Schema(
+                        type=openapi.TYPE_STRING,
+                        enum=["category", "product"],
+                        description="Categories come first, then products",
+                    ),
+                    "icon": openapi.Schema(
+                        type=openapi.TYPE_STRING,
+                        format="uri",
+                        nullable=True,
+                        example="/media/products/img1.jpg",
+                    ),
+                },
+            ),
         ),
     },
 )
@@ -459,6 +520,23 @@ search_complete_response = openapi.Schema(
     },
 )
 
+search_suggestion_response = openapi.Schema(
+    type=openapi.TYPE_ARRAY,
+    items=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "id": openapi.Schema(
+                type=openapi.TYPE_INTEGER, description="Saved search query or product ID"
+            ),
+            "name": openapi.Schema(type=openapi.TYPE_STRING, example="iPhone 15"),
+            "type": openapi.Schema(
+                type=openapi.TYPE_STRING, enum=["query", "ad"], description="Suggestion source"
+            ),
+            "category": openapi.Schema(type=openapi.TYPE_INTEGER, example=5, nullable=True),
+        },
+    ),
+)
+
 search_count_response = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     properties={
@@ -540,6 +618,7 @@ ad_photo_create_response = openapi.Schema(
             description="Image URL",
             example="https://example.com/photo.jpg",
         ),
+        "renditions": photo_renditions_schema,
         "is_main": openapi.Schema(
             type=openapi.TYPE_BOOLEAN, description="Is main photo", example=True
         ),
@@ -688,6 +767,7 @@ my_ads_list_response = openapi.Schema(
             format=openapi.FORMAT_URI,
             example="https://admin.77.uz/media/products/iphone15_main.jpg",
         ),
+        "photo_renditions": photo_renditions_schema,
         "published_at": openapi.Schema(
             type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, example="2024-01-15T10:30:00Z"
         ),
@@ -0,0 +1,325 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Q
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Ad, SearchCount
+
+logger = logging.getLogger(__name__)
+
+# Half-life of a search in each window, in seconds; the all-time window never decays.
+WINDOWS = {"day": 24 * 60 * 60, "week": 7 * 24 * 60 * 60, "all": None}
+DEFAULT_WINDOW = "all"
+# SearchCount column holding each window's snapshot.
+SNAPSHOT_FIELDS = {"day": "day_score", "week": "week_score", "all": "search_count"}
+
+POPULAR_LIMIT = 20
+POPULAR_MAX_LIMIT = 100
+SNAPSHOT_BATCH_SIZE = 500
+
+# Scores are stored relative to a shared epoch (forward decay): a search made at ``t`` adds
+# 2 ** ((t - epoch) / half_life), and reading multiplies by 2 ** (-(now - epoch) / half_life).
+# The epoch is moved forward before the weights grow too large.
+EPOCH_KEY = "store:popular:epoch"
+REBASE_SECONDS = 14 * 24 * 60 * 60
+# Sorted set -> half-life (0 for no decay), so a rebase can rescale them and a deleted ad can be
+# removed from all of them.
+REGISTRY_KEY = "store:popular:keys"
+# Set once the sorted sets hold the last snapshot; until then readers use SearchCount.
+RESTORED_KEY = "store:popular:restored"
+# Decayed scores below this are dropped on rebase; one search gets there in ~7 half-lives.
+MIN_SCORE = 0.01
+
+# KEYS: epoch, registry, then the sorted sets; ARGV: now, product, then one half-life per
+# sorted set (0 for no decay), aligned with KEYS from index 3.
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[1], now)
+end
+for i = 3, #KEYS do
+    local half_life = tonumber(ARGV[i])
+    local weight = 1
+    if half_life > 0 then
+        weight = math.pow(2, (now - epoch) / half_life)
+    end
+    redis.call('HSET', KEYS[2], KEYS[i], half_life)
+    redis.call('ZINCRBY', KEYS[i], weight, ARGV[2])
+end
+"""
+
+# KEYS: epoch, registry; ARGV: now, min score.
+REBASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    return 0
+end
+local entries = redis.call('HGETALL', KEYS[2])
+local rebased = 0
+for i = 1, #entries, 2 do
+    local key = entries[i]
+    local half_life = tonumber(entries[i + 1])
+    if half_life > 0 then
+        local factor = math.pow(2, -(now - epoch) / half_life)
+        redis.call('ZUNIONSTORE', key, 1, key, 'WEIGHTS', factor)
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', '(' .. ARGV[2])
+        if redis.call('EXISTS', key) == 0 then
+            redis.call('HDEL', KEYS[2], key)
+        end
+        rebased = rebased + 1
+    end
+end
+redis.call('SET', KEYS[1], now)
+return rebased
+"""
+
+
+def window_key(window, category_id=None, region_id=None):
+    key = f"store:popular:{window}"
+    if category_id:
+        key += f":category:{category_id}"
+    if region_id:
+        key += f":region:{region_id}"
+    return key
+
+
+def popular_window(value):
+    return value if value in WINDOWS else DEFAULT_WINDOW
+
+
+def popular_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return POPULAR_LIMIT
+    return min(max(limit, 1), POPULAR_MAX_LIMIT)
+
+
+def scope_id(value):
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def decay(window, seconds):
+    half_life = WINDOWS[window]
+    return 1.0 if half_life is None else 2 ** (-seconds / half_life)
+
+
+def scopes(category_id, region_id):
+    # Global, per category, per region and per category within a region.
+    scopes = [(None, None)]
+    if category_id:
+        scopes.append((category_id, None))
+    if region_id:
+        scopes.append((None, region_id))
+    if category_id and region_id:
+        scopes.append((category_id, region_id))
+    return scopes
+
+
+def window_keys(category_id, region_id):
+    return [
+        (window, cache.make_key(window_key(window, *scope)), half_life or 0)
+        for window, half_life in WINDOWS.items()
+        for scope in scopes(category_id, region_id)
+    ]
+
+
+def record_search(product_id, category_id, region_id=None, now=None):
+    """
+    Adds one search of ``product_id`` to the global, category and region sorted sets of
+    every window in a single round trip. Never raises on Redis errors.
+    """
+    _, keys, half_lives = zip(*window_keys(category_id, region_id))
+    try:
+        get_redis_connection().eval(
+            RECORD_SCRIPT,
+            len(keys) + 2,
+            cache.make_key(EPOCH_KEY),
+            cache.make_key(REGISTRY_KEY),
+            *keys,
+            now or time.time(),
+            product_id,
+            *half_lives,
+        )
+    except RedisError as e:
+        logger.warning(f"Popularity of {product_id} was not recorded: {e}")
+
+
+def is_restored():
+    return bool(get_redis_connection().exists(cache.make_key(RESTORED_KEY)))
+
+
+def top_products(window, limit, category_id=None, region_id=None, now=None):
+    """
+    The ``limit`` most searched products of ``window`` as ``[(product_id, score)]``, best
+    first, or ``None`` while the sorted sets have not been restored from the last snapshot.
+    """
+    pipe = get_redis_connection().pipeline(transaction=False)
+    pipe.exists(cache.make_key(RESTORED_KEY))
+    pipe.get(cache.make_key(EPOCH_KEY))
+    key = cache.make_key(window_key(window, category_id, region_id))
+    pipe.zrevrange(key, 0, limit - 1, withscores=True)
+    restored, epoch, members = pipe.execute()
+    if not restored or epoch is None:
+        return None
+    factor = decay(window, (now or time.time()) - float(epoch))
+    return [(int(member), score * factor) for member, score in members]
+
+
+def snapshot_products(window, limit, category_id=None, region_id=None):
+    # While Redis is cold: the last snapshot, ordered by the window's column.
+    field = SNAPSHOT_FIELDS[window]
+    queryset = SearchCount.objects.filter(**{f"{field}__gt": 0})
+    if category_id:
+        queryset = queryset.filter(product__category_id=category_id)
+    if region_id:
+        queryset = queryset.filter(product__region_id=region_id)
+    queryset = queryset.select_related("product__cover_photo").order_by(f"-{field}", "product_id")
+    return [(row.product, getattr(row, field)) for row in queryset[:limit]]
+
+
+def popular_products(window, limit, category_id=None, region_id=None):
+    """
+    Top ``limit`` products of ``window`` as ``[(ad, score)]``: the ranking from Redis and the
+    ads with their cover photos in one query, or the last snapshot while Redis is cold.
+    """
+    try:
+        ranking = top_products(window, limit, category_id, region_id)
+    except RedisError as e:
+        logger.warning(f"Popular products were read from the snapshot: {e}")
+        ranking = None
+    if ranking is None:
+        return snapshot_products(window, limit, category_id, region_id)
+
+    ads = Ad.objects.select_related("cover_photo").in_bulk([pk for pk, _ in ranking])
+    return [(ads[pk], score) for pk, score in ranking if pk in ads]
+
+
+def rebase(now=None):
+    """Rescales the decaying sorted sets to a new epoch and drops negligible scores."""
+    keys = [cache.make_key(EPOCH_KEY), cache.make_key(REGISTRY_KEY)]
+    return get_redis_connection().eval(
+        REBASE_SCRIPT, len(keys), *keys, now or time.time(), MIN_SCORE
+    )
+
+
+def snapshot_popularity(now=None):
+    """
+    Writes the global decayed scores into ``SearchCount.day_score``/``week_score`` as of
+    ``scored_at`` and returns the number of products written; all-time totals are written by
+    ``flush_search_counts``. Moves the epoch forward first when it is due.
+    """
+    now = now or time.time()
+    redis = get_redis_connection()
+    epoch = redis.get(cache.make_key(EPOCH_KEY))
+    if epoch is None or not is_restored():
+        return 0
+    if now - float(epoch) > REBASE_SECONDS:
+        rebase(now)
+        epoch = now
+
+    scores = {}
+    for window, half_life in WINDOWS.items():
+        if half_life:
+            factor = decay(window, now - float(epoch))
+            key = cache.make_key(window_key(window))
+            for member, score in redis.zrange(key, 0, -1, withscores=True):
+                scores.setdefault(int(member), {})[SNAPSHOT_FIELDS[window]] = score * factor
+
+    scored_at = datetime.fromtimestamp(now, tz=timezone.utc)
+    existing = set(Ad.objects.filter(pk__in=list(scores)).values_list("pk", flat=True))
+    SearchCount.objects.bulk_create(
+        [
+            SearchCount(
+                product_id=pk,
+                day_score=fields.get("day_score", 0),
+                week_score=fields.get("week_score", 0),
+                scored_at=scored_at,
+            )
+            for pk, fields in scores.items()
+            if pk in existing
+        ],
+        batch_size=SNAPSHOT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["day_score", "week_score", "scored_at"],
+    )
+    # Products that decayed out of Redis stop ranking from the snapshot too.
+    SearchCount.objects.filter(scored_at__lt=scored_at).update(day_score=0, week_score=0)
+    return len(existing)
+
+
+def restore_popularity(now=None):
+    """
+    Adds the last snapshot to the sorted sets after Redis lost them, decayed by the time since
+    it was taken, and lets readers use Redis again. Returns the number of products restored.
+    """
+    now = now or time.time()
+    redis = get_redis_connection()
+    redis.setnx(cache.make_key(EPOCH_KEY), now)
+    epoch = float(redis.get(cache.make_key(EPOCH_KEY)))
+    rows = (
+        SearchCount.objects.filter(Q(search_count__gt=0) | Q(week_score__gt=0))
+        .values_list(
+            "product_id",
+            "product__category_id",
+            "product__region_id",
+            "search_count",
+            "day_score",
+            "week_score",
+            "scored_at",
+        )
+        .iterator(chunk_size=SNAPSHOT_BATCH_SIZE)
+    )
+    pipe = redis.pipeline(transaction=False)
+    restored = 0
+    for pk, category_id, region_id, total, day_score, week_score, scored_at in rows:
+        age = now - scored_at.timestamp() if scored_at else 0
+        # Searches counted since Redis came back are already in the sets, so add the decayed
+        # snapshot to them. The all-time total may include them too once they were flushed, so
+        # it only raises a lower score.
+        values = {
+            "day": day_score * decay("day", age) / decay("day", now - epoch),
+            "week": week_score * decay("week", age) / decay("week", now - epoch),
+        }
+        for window, key, half_life in window_keys(category_id, region_id):
+            if half_life:
+                pipe.zincrby(key, values[window], pk)
+            else:
+                pipe.zadd(key, {pk: total}, gt=True)
+            pipe.hset(cache.make_key(REGISTRY_KEY), key, half_life)
+        restored += 1
+        if restored % SNAPSHOT_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.set(cache.make_key(RESTORED_KEY), 1)
+    pipe.execute()
+    return restored
+
+
+def forget_popularity(product_id, category_id=None):
+    """
+    Removes ``product_id`` from every sorted set, or only from those of ``category_id`` once
+    the ad has moved to another category.
+    """
+    try:
+        redis = get_redis_connection()
+        keys = [key.decode() for key in redis.hkeys(cache.make_key(REGISTRY_KEY))]
+        if category_id:
+            scope = f":category:{category_id}"
+            keys = [key for key in keys if key.endswith(scope) or f"{scope}:" in key]
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrem(key, product_id)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Popularity of {product_id} was not cleared: {e}")
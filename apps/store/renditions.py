@@ -0,0 +1,117 @@
+import logging
+import os
+from io import BytesIO
+
+from celery import shared_task
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django_redis import get_redis_connection
+from kombu.exceptions import OperationalError
+from PIL import Image, ImageOps, UnidentifiedImageError
+from redis.exceptions import RedisError
+
+from .models import AdPhoto
+
+logger = logging.getLogger(__name__)
+
+# Ids of photos waiting for their renditions; a set, so a photo queued twice is rendered once.
+PENDING_KEY = "store:renditions:pending"
+BATCH_SIZE = 50
+QUALITY = {"JPEG": 82, "WEBP": 78}
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+
+def schedule_renditions(*photo_ids):
+    """Queues ``photo_ids`` for the rendition worker once the transaction commits."""
+    if not photo_ids:
+        return
+
+    def schedule():
+        try:
+            get_redis_connection().sadd(cache.make_key(PENDING_KEY), *photo_ids)
+            render_pending_renditions.delay()
+        except (RedisError, OperationalError) as e:
+            # The originals are served meanwhile; ``process_renditions --missing`` catches up.
+            logger.warning(f"Renditions of photos {photo_ids} were not scheduled: {e}")
+
+    transaction.on_commit(schedule)
+
+
+def pending_renditions():
+    return get_redis_connection().scard(cache.make_key(PENDING_KEY))
+
+
+def render(image, box, crop, image_format):
+    if crop:
+        rendered = ImageOps.fit(image, box, Image.Resampling.LANCZOS)
+    else:
+        rendered = image.copy()
+        rendered.thumbnail(box, Image.Resampling.LANCZOS)
+    if image_format == "JPEG" and rendered.mode != "RGB":
+        rendered = rendered.convert("RGB")
+    elif rendered.mode not in ("RGB", "RGBA"):
+        rendered = rendered.convert("RGBA" if "A" in rendered.getbands() else "RGB")
+    buffer = BytesIO()
+    rendered.save(buffer, image_format, quality=QUALITY[image_format], optimize=True)
+    return buffer.getvalue()
+
+
+def render_photo(photo):
+    """
+    Renders and stores every rendition of ``photo`` and saves their names on it, which
+    invalidates the cached cards and responses showing it. Returns False for an image Pillow
+    cannot read; the original is served for it from then on.
+    """
+    storage = photo.image.storage
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    try:
+        with photo.image.open("rb") as file, Image.open(file) as image:
+            # Phones store the orientation in EXIF; the renditions carry none.
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Photo {photo.pk} could not be read for renditions: {e}")
+        return False
+
+    renditions = {}
+    for name, (box, crop, image_format) in AdPhoto.RENDITIONS.items():
+        path = f"products/renditions/{stem}-{name}.{EXTENSIONS[image_format]}"
+        renditions[name] = storage.save(path, ContentFile(render(image, box, crop, image_format)))
+    photo.renditions = renditions
+    photo.save(update_fields=["renditions"])
+    return True
+
+
+def process_renditions(batch_size=BATCH_SIZE):
+    """
+    Renders up to ``batch_size`` queued photos and returns how many were rendered. Photos
+    deleted since they were queued are skipped.
+    """
+    redis = get_redis_connection()
+    photo_ids = redis.spop(cache.make_key(PENDING_KEY), batch_size)
+    if not photo_ids:
+        return 0
+    try:
+        photos = list(AdPhoto.objects.filter(pk__in=[int(pk) for pk in photo_ids]).order_by("pk"))
+    except Exception:
+        # Back in the queue for the retry.
+        redis.sadd(cache.make_key(PENDING_KEY), *photo_ids)
+        raise
+    rendered = 0
+    for photo in photos:
+        try:
+            rendered += render_photo(photo)
+        except Exception:
+            # Not queued again: the original keeps being served for this photo.
+            logger.exception(f"Renditions of photo {photo.pk} failed")
+    return rendered
+
+
+@shared_task
+def render_pending_renditions():
+    """Renders one batch of the queue, then hands what is left to a new task."""
+    rendered = process_renditions()
+    if pending_renditions():
+        render_pending_renditions.delay()
+    return rendered
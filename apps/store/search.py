@@ -0,0 +1,114 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q, Subquery
+from django.db.models.functions import Coalesce, Collate, Greatest, Length, Upper
+from modeltranslation.utils import build_localized_fieldname, get_language
+
+# PostgreSQL has no Uzbek dictionary, so Uzbek text is indexed without stemming.
+SEARCH_CONFIGS = {"uz": "simple", "ru": "russian"}
+SEARCH_ORDERING = ["-search_rank", "-published_at", "-id"]
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+# Rows read per matching step before ranking, so a one-letter prefix never scans the catalogue.
+AUTOCOMPLETE_CANDIDATES = 200
+
+
+def search_terms(text):
+    return re.findall(r"\w+", text or "")
+
+
+def build_search_query(terms, config, weights=""):
+    # Every word must match, the last one as a prefix so results follow the user's typing.
+    # Terms are plain \w+ tokens, so they are safe to pass as a raw tsquery.
+    suffix = f":{weights}" if weights else ""
+    raw = " & ".join([*(f"{term}{suffix}" for term in terms[:-1]), f"{terms[-1]}:*{weights}"])
+    return SearchQuery(raw, search_type="raw", config=config)
+
+
+def search_ads(queryset, text):
+    """
+    Filters ads through the GIN-indexed ``search_vector_<lang>`` columns of every language
+    and annotates ``search_rank``. An empty query returns the queryset unchanged.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    condition = Q()
+    ranks = []
+    for language, config in SEARCH_CONFIGS.items():
+        query = build_search_query(terms, config)
+        condition |= Q(**{f"search_vector_{language}": query})
+        ranks.append(SearchRank(F(f"search_vector_{language}"), query))
+    return queryset.filter(condition).annotate(search_rank=Greatest(*ranks))
+
+
+def search_categories(queryset, text):
+    # The category table is small, so a substring match on the active translation stays cheap.
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term)
+    return queryset.filter(condition)
+
+
+def autocomplete_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return AUTOCOMPLETE_LIMIT
+    return min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT)
+
+
+def prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with ``prefix`` in byte order.
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def autocomplete_ads(queryset, text, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Up to ``limit`` ads for the typed ``text`` in the active language: names starting with the
+    text first (``ad_name_<lang>_prefix_idx``), then names containing its words as prefixes
+    (the search vector's name weight). Each step reads at most ``AUTOCOMPLETE_CANDIDATES`` rows
+    and ranks them by ``SearchCount`` popularity, then by how close the name is to the text.
+    """
+    text = " ".join((text or "").split())
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    language = get_language()
+    name_field = build_localized_fieldname("name", language)
+    prefix = text.upper()
+    prefix_candidates = (
+        queryset.alias(name_key=Collate(Upper(name_field), "C"))
+        .filter(name_key__gte=prefix, name_key__lt=prefix_upper_bound(prefix))
+        .order_by("name_key")
+        .values("pk")[:AUTOCOMPLETE_CANDIDATES]
+    )
+    ranked = queryset.annotate(popularity=Coalesce("search_count_obj__search_count", 0))
+    results = list(
+        ranked.filter(pk__in=Subquery(prefix_candidates))
+        .annotate(closeness=Length(name_field))
+        .order_by("-popularity", "closeness", "id")[:limit]
+    )
+    if len(results) >= limit:
+        return results
+
+    query = build_search_query(terms, SEARCH_CONFIGS[language], weights="A")
+    vector_field = f"search_vector_{language}"
+    word_candidates = (
+        queryset.filter(**{vector_field: query})
+        .exclude(pk__in=[ad.pk for ad in results])
+        .values("pk")[:AUTOCOMPLETE_CANDIDATES]
+    )
+    results += (
+        ranked.filter(pk__in=Subquery(word_candidates))
+        .annotate(closeness=SearchRank(F(vector_field), query))
+        .order_by("-popularity", "-closeness", "id")[: limit - len(results)]
+    )
+    return results
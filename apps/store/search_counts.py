@@ -0,0 +1,108 @@
+import logging
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .buffers import drain_counts, pending_key
+from .models import Ad, SearchCount
+
+logger = logging.getLogger(__name__)
+
+SEARCHES_BUFFER = "store:search_counts"
+# Running total per product, seeded from SearchCount the first time a product is searched.
+TOTALS_KEY = "store:search_counts:totals"
+# Product -> "category_id:region_id", so the request path needs neither the ad nor its seller.
+PRODUCTS_KEY = "store:search_counts:products"
+FLUSH_BATCH_SIZE = 500
+
+# Returns {total, "category_id:region_id"}, or nil when the product has not been seeded yet.
+INCREMENT_SCRIPT = """
+local product = redis.call('HGET', KEYS[1], ARGV[1])
+if not product then
+    return nil
+end
+redis.call('HINCRBY', KEYS[3], ARGV[1], 1)
+return {redis.call('HINCRBY', KEYS[2], ARGV[1], 1), product}
+"""
+
+
+def stored_product(product_id):
+    # (category_id, region_id, stored count); Ad.DoesNotExist for a deleted ad.
+    return (
+        Ad.objects.filter(pk=product_id)
+        .values_list("category_id", "region_id", "search_count_obj__search_count")
+        .get()
+    )
+
+
+def increment_search_count(product_id):
+    """
+    Counts one search of ``product_id`` in Redis and returns ``(total, category_id, region_id)``,
+    the region being the seller's (or ``None``). Only the
+    first search of a product since Redis lost its state reads PostgreSQL, to check that the ad
+    exists (``Ad.DoesNotExist`` otherwise) and to continue from the stored count. Never raises
+    on Redis errors: the search is left uncounted and the stored count is returned.
+    """
+    keys = [
+        cache.make_key(PRODUCTS_KEY),
+        cache.make_key(TOTALS_KEY),
+        pending_key(SEARCHES_BUFFER),
+    ]
+    try:
+        redis = get_redis_connection()
+        result = redis.eval(INCREMENT_SCRIPT, len(keys), *keys, product_id)
+        if result is None:
+            category_id, region_id, stored = stored_product(product_id)
+            # HSETNX: a concurrent first search must not reset a total that was already seeded.
+            redis.hsetnx(keys[1], product_id, stored or 0)
+            redis.hset(keys[0], product_id, f"{category_id}:{region_id or ''}")
+            result = redis.eval(INCREMENT_SCRIPT, len(keys), *keys, product_id)
+    except RedisError as e:
+        logger.warning(f"Search of {product_id} was not counted: {e}")
+        category_id, region_id, stored = stored_product(product_id)
+        return stored or 0, category_id, region_id
+
+    total, product = result
+    category_id, region_id = product.decode().split(":")
+    return int(total), int(category_id), int(region_id) if region_id else None
+
+
+def forget_product(product_id, keep_total=True):
+    """
+    Drops the cached category and region (and the total, for deleted ads) so the next search
+    re-reads them.
+    """
+    try:
+        redis = get_redis_connection()
+        redis.hdel(cache.make_key(PRODUCTS_KEY), product_id)
+        if not keep_total:
+            redis.hdel(cache.make_key(TOTALS_KEY), product_id)
+    except RedisError as e:
+        logger.warning(f"Search count cache for {product_id} was not cleared: {e}")
+
+
+def flush_search_counts():
+    """
+    Upserts the Redis totals of every product searched since the last flush into
+    ``SearchCount`` and returns the number of searches flushed. Totals are absolute, so
+    writing the same batch twice is harmless.
+    """
+    redis = get_redis_connection()
+    with drain_counts(SEARCHES_BUFFER) as drain:
+        hits = drain.counts
+        product_ids = list(hits)
+        totals = redis.hmget(cache.make_key(TOTALS_KEY), product_ids) if product_ids else []
+        existing = set(Ad.objects.filter(pk__in=product_ids).values_list("pk", flat=True))
+        SearchCount.objects.bulk_create(
+            [
+                SearchCount(product_id=product_id, search_count=int(total))
+                for product_id, total in zip(product_ids, totals)
+                if total is not None and product_id in existing
+            ],
+            batch_size=FLUSH_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["search_count", "updated_at"],
+        )
+    return sum(hits.values())
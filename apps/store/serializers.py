@@ -6,6 +6,7 @@ from store.models import Category
 
 from .mixins import IconMixin, LikedMixin, LocalizedNameDescriptionMixin, PhotoMixin
 from .models import Ad, AdPhoto, FavouriteProduct, MySearch
+from .renditions import schedule_renditions
 
 
 class ChildCategorySerializer(serializers.Serializer):
@@ -52,6 +53,7 @@ class AdCreateSerializer(
     description = serializers.SerializerMethodField()
     photos = serializers.ListField(child=serializers.ImageField(), write_only=True)
     photo = serializers.SerializerMethodField()
+    photo_renditions = serializers.SerializerMethodField()
     address = serializers.SerializerMethodField()
     seller = SellerShortSerializer(read_only=True)
     is_liked = serializers.SerializerMethodField()
@@ -69,6 +71,7 @@ class AdCreateSerializer(
             "price",
             "photos",
             "photo",
+            "photo_renditions",
             "published_at",
             "address",
             "seller",
@@ -88,6 +91,7 @@ class AdCreateSerializer(
             "name",
             "slug",
             "photo",
+            "photo_renditions",
             "published_at",
             "address",
             "seller",
@@ -105,11 +109,16 @@ class AdCreateSerializer(
         for idx, img in enumerate(photos_data):
             ad_photos.append(AdPhoto(ad=ad, image=img, is_main=(idx == 0)))
         AdPhoto.objects.bulk_create(ad_photos)
+        # bulk_create skips post_save, so the cover photo is synced and the renditions are
+        # scheduled explicitly.
+        Ad.refresh_cover_photo(ad.pk)
+        schedule_renditions(*(photo.pk for photo in ad_photos))
+        ad.refresh_from_db(fields=["cover_photo", "updated_time"])
 
         return ad
 
     def get_photo(self, obj):
-        return super().get_photo(obj, main_only=True)
+        return super().get_photo(obj)
 
     def get_is_liked(self, obj):
         return super().get_is_liked(obj)
@@ -154,6 +163,7 @@ class AdPhotoSerializer(serializers.ModelSerializer):
         return {
             "id": instance.id,
             "image": instance.image.url if instance.image else None,
+            "renditions": instance.rendition_urls() if instance.image else None,
             "is_main": instance.is_main,
             "product_id": instance.ad.id,
             "created_at": instance.created_at,
@@ -255,6 +265,7 @@ class AdListSerializer(
     LikedMixin, PhotoMixin, LocalizedNameDescriptionMixin, serializers.ModelSerializer
 ):
     photo = serializers.SerializerMethodField()
+    photo_renditions = serializers.SerializerMethodField()
     address = serializers.SerializerMethodField()
     seller = SellerShortSerializer(read_only=True)
     is_liked = serializers.SerializerMethodField()
@@ -267,6 +278,7 @@ class AdListSerializer(
             "slug",
             "price",
             "photo",
+            "photo_renditions",
             "published_at",
             "address",
             "seller",
@@ -286,8 +298,9 @@ class AdListSerializer(
         return None
 
 
-class MyAdsListSerializer(serializers.ModelSerializer):
+class MyAdsListSerializer(LikedMixin, PhotoMixin, serializers.ModelSerializer):
     photo = serializers.SerializerMethodField()
+    photo_renditions = serializers.SerializerMethodField()
     address = serializers.CharField(source="address.name", read_only=True)
     is_liked = serializers.SerializerMethodField()
 
@@ -299,6 +312,7 @@ class MyAdsListSerializer(serializers.ModelSerializer):
             "slug",
             "price",
             "photo",
+            "photo_renditions",
             "published_at",
             "address",
             "status",
@@ -307,17 +321,6 @@ class MyAdsListSerializer(serializers.ModelSerializer):
             "updated_time",
         ]
 
-    def get_photo(self, obj):
-        first_photo = obj.photos.first()
-        return first_photo.image.url if first_photo else None
-
-    def get_is_liked(self, obj):
-        request = self.context.get("request")
-        user = getattr(request, "user", None)
-        if user and user.is_authenticated:
-            return obj.likes.filter(id=user.id).exists()
-        return False
-
 
 class MyAdsDetailSerializer(serializers.ModelSerializer):
     new_photos = serializers.ListField(child=serializers.ImageField(), required=False)
@@ -361,11 +364,12 @@ class MyAdsDetailSerializer(serializers.ModelSerializer):
             instance.photos.all().delete()
             for url in new_photos:
                 AdPhoto.objects.create(ad=instance, image=url)
+            instance.refresh_from_db(fields=["cover_photo"])
 
         return super().update(instance, validated_data)
 
 
-class FavouriteProductListSerializer(serializers.Serializer):
+class FavouriteProductListSerializer(LikedMixin, PhotoMixin, serializers.Serializer):
     id = serializers.IntegerField(source="product.id", read_only=True)
     name = serializers.CharField(source="product.name", read_only=True)
     slug = serializers.SlugField(source="product.slug", read_only=True)
@@ -378,15 +382,17 @@ class FavouriteProductListSerializer(serializers.Serializer):
     seller = serializers.CharField(source="product.seller.get_full_name", read_only=True)
 
     photo = serializers.SerializerMethodField()
+    photo_renditions = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
 
     def get_photo(self, obj):
-        photo = obj.product.photos.first()
-        return photo.image.url if photo else None
+        return super().get_photo(obj.product)
 
-    def get_is_liked(self, obj):
-        user = self.context["request"].user
-        return obj.product.likes.filter(id=user.id).exists() if user.is_authenticated else False
+    def get_photo_renditions(self, obj):
+        return super().get_photo_renditions(obj.product)
+
+    def get_liked_product_id(self, obj):
+        return obj.product_id
 
     def get_address(self, obj):
         if obj.product and getattr(obj.product, "address", None):
@@ -463,9 +469,16 @@ class SearchCompleteSerializer(IconMixin, serializers.Serializer):
     icon = serializers.SerializerMethodField()
 
 
+class SearchSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    type = serializers.CharField(source="kind")
+    category = serializers.IntegerField(source="category_id", allow_null=True)
+
+
 class SearchCountSerializer(serializers.Serializer):
     id = serializers.IntegerField(source="product.id")
-    category = serializers.IntegerField(source="product.category.id")
+    category = serializers.IntegerField(source="product.category_id")
     search_count = serializers.IntegerField()
     updated_at = serializers.DateTimeField()
 
@@ -486,4 +499,4 @@ class SubCategorySerializer(IconMixin, serializers.ModelSerializer):
         fields = ["id", "name", "icon", "product_count"]
 
     def get_product_count(self, obj):
-        return "{:,}".format(obj.ad_set.count())
+        return "{:,}".format(obj.product_count)
@@ -0,0 +1,224 @@
+from accounts.models import Address, CustomUser
+from common.utils.conditional import bump_table_version
+from common.utils.response_cache import invalidate_tags
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from modeltranslation.utils import build_localized_fieldname
+
+from . import category_tree, fragments, popularity, renditions, search_counts, suggestions
+from .counters import apply_ad_delta, move_ad, move_category
+from .models import Ad, AdPhoto, Category, CategoryAdCounter, SearchQuery
+
+
+@receiver(post_save, sender=AdPhoto)
+@receiver(post_delete, sender=AdPhoto)
+def sync_ad_cover_photo(sender, instance, **kwargs):
+    Ad.refresh_cover_photo(instance.ad_id)
+
+
+@receiver(post_save, sender=AdPhoto)
+def schedule_ad_photo_renditions(sender, instance, created, **kwargs):
+    if created:
+        renditions.schedule_renditions(instance.pk)
+
+
+@receiver(pre_save, sender=Ad)
+def remember_counted_ad(sender, instance, **kwargs):
+    instance._counted_as = None
+    if instance.pk:
+        instance._counted_as = (
+            Ad.objects.filter(pk=instance.pk).values_list("category_id", "status").first()
+        )
+
+
+@receiver(post_save, sender=Ad)
+def count_saved_ad(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_counted_as", None)
+    if created or previous is None:
+        apply_ad_delta(instance.category_id, instance.status, 1)
+    else:
+        move_ad(*previous, instance.category_id, instance.status)
+
+
+@receiver(post_delete, sender=Ad)
+def uncount_deleted_ad(sender, instance, **kwargs):
+    apply_ad_delta(instance.category_id, instance.status, -1)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_parent(sender, instance, **kwargs):
+    instance._previous_parent_id = None
+    if instance.pk:
+        instance._previous_parent_id = (
+            Category.objects.filter(pk=instance.pk).values_list("parent_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Category)
+def sync_category_path(sender, instance, **kwargs):
+    instance.refresh_path()
+
+
+@receiver(post_save, sender=Category)
+def sync_category_counter(sender, instance, created, **kwargs):
+    if created:
+        CategoryAdCounter.objects.get_or_create(category=instance)
+    else:
+        move_category(instance.pk, instance._previous_parent_id, instance.parent_id)
+
+
+@receiver(post_init, sender=Ad)
+def remember_indexed_ad(sender, instance, **kwargs):
+    # As loaded, so saves that leave the suggestions alone are not sent to other workers.
+    instance._indexed_as = suggestions.indexed_ad(instance.__dict__)
+
+
+@receiver(post_save, sender=Ad)
+def index_ad_suggestion(sender, instance, created, **kwargs):
+    suggestions.sync_ad(instance, created)
+
+
+@receiver(post_delete, sender=Ad)
+def unindex_ad_suggestion(sender, instance, **kwargs):
+    suggestions.drop("ad", instance.pk)
+
+
+@receiver(post_save, sender=SearchQuery)
+def index_search_query_suggestion(sender, instance, **kwargs):
+    suggestions.sync_search_query(instance)
+
+
+@receiver(post_delete, sender=SearchQuery)
+def unindex_search_query_suggestion(sender, instance, **kwargs):
+    suggestions.drop("query", instance.pk)
+
+
+@receiver(post_save, sender=Ad)
+def refresh_search_count_category(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_counted_as", None)
+    if previous and previous[0] != instance.category_id:
+        pk, category_id = instance.pk, previous[0]
+        transaction.on_commit(lambda: search_counts.forget_product(pk))
+        transaction.on_commit(lambda: popularity.forget_popularity(pk, category_id))
+
+
+@receiver(post_delete, sender=Ad)
+def forget_search_count(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: search_counts.forget_product(pk, keep_total=False))
+    transaction.on_commit(lambda: popularity.forget_popularity(pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_tree_version(sender, instance, **kwargs):
+    category_tree.bump_tree_version()
+    bump_table_version("categories")
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def bump_ads_version(sender, instance, **kwargs):
+    # Category product counts move with every saved or deleted ad.
+    bump_table_version("ads")
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_seller_location(sender, instance, **kwargs):
+    # As loaded, so a save can tell whether the seller moved without reading the row again.
+    # Unknown (None) when the fields were deferred; reading them here would cost a query.
+    loaded = instance.__dict__
+    instance._loaded_location = None
+    if "region_id" in loaded and "district_id" in loaded:
+        instance._loaded_location = (loaded["region_id"], loaded["district_id"])
+
+
+def forget_search_metadata(ad_ids):
+    # The cached search metadata of these ads still names the seller's old region.
+    for pk in ad_ids:
+        search_counts.forget_product(pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def sync_seller_ad_location(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {"region", "district"} & set(update_fields):
+        return
+    location = (instance.region_id, instance.district_id)
+    if not created and instance._loaded_location != location:
+        ads = Ad.objects.filter(seller=instance)
+        ad_ids = list(ads.values_list("pk", flat=True))
+        ads.update(region_id=location[0], district_id=location[1])
+        transaction.on_commit(lambda: forget_search_metadata(ad_ids))
+        # The region and district filters now match other ads.
+        invalidate_tags("ads")
+    instance._loaded_location = location
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def invalidate_ad_responses(sender, instance, **kwargs):
+    invalidate_tags("ads", f"ad:{instance.pk}")
+
+
+@receiver(post_save, sender=AdPhoto)
+@receiver(post_delete, sender=AdPhoto)
+def invalidate_ad_photo_responses(sender, instance, **kwargs):
+    # The cover photo is updated without saving the ad.
+    invalidate_tags("ads", f"ad:{instance.ad_id}")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    invalidate_tags("categories", f"category:{instance.pk}")
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_seller_responses(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no response shows.
+    if update_fields is None or set(update_fields) - {"last_login"}:
+        invalidate_tags(f"seller:{instance.pk}")
+        bump_table_version(f"seller:{instance.pk}")
+
+
+@receiver(post_save, sender=Address)
+@receiver(pre_delete, sender=Address)
+def invalidate_address_responses(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    sellers = list(CustomUser.objects.filter(address_id=instance.pk).values_list("pk", flat=True))
+    invalidate_tags(*(f"seller:{pk}" for pk in sellers))
+    bump_table_version(*(f"seller:{pk}" for pk in sellers))
+    # The address is shown on their ad cards too.
+    fragments.forget_seller_fragments(*sellers)
+
+
+# CustomUser fields shown on the ad cards of store.fragments.
+SELLER_CARD_FIELDS = {
+    "full_name",
+    *(build_localized_fieldname("full_name", language) for language, _ in settings.LANGUAGES),
+    "phone_number",
+    "profile_photo",
+    "address",
+}
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def forget_ad_cards(sender, instance, **kwargs):
+    fragments.forget_ad_fragments(instance.pk)
+
+
+@receiver(post_save, sender=AdPhoto)
+@receiver(post_delete, sender=AdPhoto)
+def forget_ad_photo_cards(sender, instance, **kwargs):
+    fragments.forget_ad_fragments(instance.ad_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_seller_cards(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not SELLER_CARD_FIELDS & set(update_fields)):
+        return
+    fragments.forget_seller_fragments(instance.pk)
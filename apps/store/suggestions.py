@@ -0,0 +1,297 @@
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Ad, SearchQuery
+from .search import AUTOCOMPLETE_CANDIDATES, AUTOCOMPLETE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+Suggestion = namedtuple("Suggestion", ["name", "category_id", "kind", "id"])
+
+SUGGESTION_KINDS = ("query", "ad")
+# Every change of a row is appended to CHANGES_KEY and bumps VERSION_CACHE_KEY, so other
+# workers replay what they missed since their copy's version. Only the last CHANGES_KEPT
+# are kept; a worker further behind rebuilds its copy.
+VERSION_CACHE_KEY = "store:suggestions:version"
+CHANGES_KEY = "store:suggestions:changes"
+CHANGES_KEPT = 10000
+VERSION_CHECK_INTERVAL = 30
+
+LOG_CHANGE_SCRIPT = """
+local version = redis.call("INCR", KEYS[1])
+redis.call("RPUSH", KEYS[2], ARGV[1])
+redis.call("LTRIM", KEYS[2], -tonumber(ARGV[2]), -1)
+return version
+"""
+
+# Returns {version} alone when the log no longer reaches back to ARGV[1].
+CHANGES_SINCE_SCRIPT = """
+local version = tonumber(redis.call("GET", KEYS[1]) or "0")
+local behind = version - tonumber(ARGV[1])
+if behind < 0 or behind > redis.call("LLEN", KEYS[2]) then
+    return {version}
+end
+if behind == 0 then
+    return {version, {}}
+end
+return {version, redis.call("LRANGE", KEYS[2], -behind, -1)}
+"""
+
+
+def normalize(text):
+    return " ".join((text or "").casefold().split())
+
+
+class SuggestionIndex:
+    """
+    Per-language sorted arrays of ``(key, name, kind, id, category_id)`` tuples built from
+    ``SearchQuery`` rows and active ad names. A prefix lookup is a bisect plus a short scan;
+    single rows are inserted or removed in place when they change.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the one thread catching this copy up.
+        self.refresh_lock = threading.Lock()
+        self.languages = tuple(settings.MODELTRANSLATION_LANGUAGES)
+        self._items = {language: [] for language in self.languages}
+        self._sources = {}
+        self.is_built = False
+        self.version = None
+        self.checked_at = 0
+        self.build_seconds = None
+
+    def build(self):
+        started = time.perf_counter()
+        # Read before loading rows, so a change committed meanwhile is replayed afterwards.
+        try:
+            version = int(get_redis_connection().get(cache.make_key(VERSION_CACHE_KEY)) or 0)
+        except RedisError as e:
+            # Unknown, so the next check rebuilds again.
+            logger.warning(f"Suggestion index version was not read: {e}")
+            version = None
+        items = {language: [] for language in self.languages}
+        sources = {}
+
+        for pk, name, category_id in SearchQuery.objects.values_list("id", "name", "category_id"):
+            names = dict.fromkeys(self.languages, name)
+            self._collect(items, sources, "query", pk, names, category_id)
+
+        fields = [f"name_{language}" for language in self.languages]
+        ads = Ad.objects.filter(status="active").values_list("id", "category_id", *fields)
+        for pk, category_id, *localized in ads.iterator(chunk_size=2000):
+            self._collect(items, sources, "ad", pk, self.ad_names(localized), category_id)
+
+        for language_items in items.values():
+            language_items.sort()
+        with self._lock:
+            self._items, self._sources = items, sources
+            self.is_built = True
+            self.version = version
+            self.checked_at = time.monotonic()
+        self.build_seconds = time.perf_counter() - started
+        return self
+
+    def catch_up(self):
+        """
+        Replays the changes logged since this copy's version, or rebuilds the copy when the
+        log no longer reaches back that far.
+        """
+        if self.version is None:
+            return self.build()
+        keys = [cache.make_key(VERSION_CACHE_KEY), cache.make_key(CHANGES_KEY)]
+        reply = get_redis_connection().eval(CHANGES_SINCE_SCRIPT, len(keys), *keys, self.version)
+        if len(reply) == 1:
+            return self.build()
+        version, changes = reply
+        with self._lock:
+            for change in changes:
+                method, *args = cache.client.decode(change)
+                getattr(self, method)(*args)
+            self.version = version
+        return self
+
+    def ad_names(self, localized):
+        # Untranslated ads fall back to the default language, as modeltranslation does.
+        names = dict(zip(self.languages, localized))
+        default = names.get(settings.MODELTRANSLATION_DEFAULT_LANGUAGE)
+        return {language: name or default for language, name in names.items()}
+
+    def _collect(self, items, sources, kind, pk, names, category_id):
+        entries = []
+        for language, name in names.items():
+            key = normalize(name)
+            if key:
+                item = (key, name, kind, pk, category_id)
+                items[language].append(item)
+                entries.append((language, item))
+        sources[(kind, pk)] = entries
+
+    def add(self, kind, pk, names, category_id):
+        with self._lock:
+            self.remove(kind, pk)
+            entries = []
+            for language, name in names.items():
+                key = normalize(name)
+                if key and language in self._items:
+                    item = (key, name, kind, pk, category_id)
+                    insort(self._items[language], item)
+                    entries.append((language, item))
+            self._sources[(kind, pk)] = entries
+
+    def remove(self, kind, pk):
+        with self._lock:
+            for language, item in self._sources.pop((kind, pk), []):
+                items = self._items[language]
+                position = bisect_left(items, item)
+                if position < len(items) and items[position] == item:
+                    del items[position]
+
+    def lookup(self, prefix, language, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Suggestions whose name starts with ``prefix``: saved search queries first, then ads,
+        shorter names first. Names are returned once even if several rows share them.
+        """
+        prefix = normalize(prefix)
+        items = self._items.get(language)
+        if not prefix or items is None:
+            return []
+
+        candidates = []
+        position = bisect_left(items, (prefix,))
+        for item in items[position : position + AUTOCOMPLETE_CANDIDATES]:
+            if not item[0].startswith(prefix):
+                break
+            candidates.append(item)
+        candidates.sort(key=lambda item: (SUGGESTION_KINDS.index(item[2]), len(item[0]), item))
+
+        suggestions, seen = [], set()
+        for key, name, kind, pk, category_id in candidates:
+            if key not in seen:
+                seen.add(key)
+                suggestions.append(Suggestion(name, category_id, kind, pk))
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def __len__(self):
+        return sum(len(items) for items in self._items.values())
+
+    def count(self, language):
+        return len(self._items[language])
+
+    def memory_usage(self):
+        """Approximate deep size in bytes of the arrays, their tuples and strings."""
+        seen, total = set(), 0
+        stack = [self._items, self._sources]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple)):
+                stack.extend(obj)
+        return total
+
+
+suggestion_index = SuggestionIndex()
+
+
+def get_suggestion_index():
+    """
+    The process-wide index, built on first use and caught up with the changes other workers
+    made since (checked at most every ``VERSION_CHECK_INTERVAL`` seconds). One thread refreshes
+    at a time; the others keep answering from the current copy, and wait only while there is none.
+    """
+    index = suggestion_index
+    if index.is_built and time.monotonic() - index.checked_at < VERSION_CHECK_INTERVAL:
+        return index
+    if not index.refresh_lock.acquire(blocking=not index.is_built):
+        return index
+    try:
+        if not index.is_built:
+            index.build()
+        elif time.monotonic() - index.checked_at >= VERSION_CHECK_INTERVAL:
+            index.checked_at = time.monotonic()
+            try:
+                index.catch_up()
+            except RedisError as e:
+                logger.warning(f"Suggestion index was not caught up: {e}")
+    finally:
+        index.refresh_lock.release()
+    return index
+
+
+def apply_change(method, *args):
+    # Runs after commit: update this worker in place and log the change for the others.
+    index = suggestion_index
+    getattr(index, method)(*args)
+    keys = [cache.make_key(VERSION_CACHE_KEY), cache.make_key(CHANGES_KEY)]
+    change = cache.client.encode((method, *args))
+    try:
+        version = get_redis_connection().eval(
+            LOG_CHANGE_SCRIPT, len(keys), *keys, change, CHANGES_KEPT
+        )
+    except RedisError as e:
+        logger.warning(f"Suggestion change {method}{args[:2]} was not logged: {e}")
+        return
+    if index.version is not None and index.version == version - 1:
+        index.version = version
+
+
+def indexed_ad(values):
+    """
+    ``(category_id, names)`` the index holds for an ad with the field ``values``, ``None``
+    for an inactive one, or ``False`` when one of the fields was not loaded.
+    """
+    fields = [f"name_{language}" for language in suggestion_index.languages]
+    if not {"status", "category_id", *fields} <= values.keys():
+        return False
+    if values["status"] != "active":
+        return None
+    names = suggestion_index.ad_names(values[field] for field in fields)
+    return values["category_id"], names
+
+
+def sync_ad(ad, created=False):
+    indexed = indexed_ad(ad.__dict__)
+    if not created and indexed is not False and indexed == getattr(ad, "_indexed_as", False):
+        return
+    ad._indexed_as = indexed
+    if indexed:
+        category_id, names = indexed
+        args = ("add", "ad", ad.pk, names, category_id)
+    else:
+        args = ("remove", "ad", ad.pk)
+    transaction.on_commit(lambda: apply_change(*args))
+
+
+def sync_search_query(search_query):
+    names = dict.fromkeys(suggestion_index.languages, search_query.name)
+    args = ("add", "query", search_query.pk, names, search_query.category_id)
+    transaction.on_commit(lambda: apply_change(*args))
+
+
+def drop(kind, pk):
+    transaction.on_commit(lambda: apply_change("remove", kind, pk))
+
+
+def warm_up_suggestion_index():
+    try:
+        get_suggestion_index()
+    except (DatabaseError, RedisError) as e:
+        logger.warning(f"Suggestion index was not built at startup: {e}")
@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from . import popularity, search_counts, view_counts
+
+# Periodic flushes of the Redis buffers, scheduled by CELERY_BEAT_SCHEDULE. Each one is also a
+# management command for running by hand.
+
+
+@shared_task
+def flush_view_counts():
+    return view_counts.flush_view_counts()
+
+
+@shared_task
+def flush_search_counts():
+    return search_counts.flush_search_counts()
+
+
+@shared_task
+def snapshot_popular_searches():
+    if not popularity.is_restored():
+        popularity.restore_popularity()
+    return popularity.snapshot_popularity()
@@ -1,16 +1,62 @@
+import time
 import uuid
 from decimal import Decimal
-from io import BytesIO
-
-from accounts.models import CustomUser
-from common.models import Region
+from io import BytesIO, StringIO
+from unittest import mock
+
+from accounts.models import Address, CustomUser
+from common.models import District, Region
+from common.pagination import EstimatedCountPaginator
+from common.utils.query_budget import EndpointBudget, QueryBudgetMixin
+from common.utils.response_cache import clear_response_cache
+from common.utils.task_metrics import reset_task_stats, task_stats
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import translation
+from django_redis import get_redis_connection
 from PIL import Image
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError,
+    LockNotOwnedError,
+    RedisError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.test import APITestCase
 
-from .models import Ad, Category, FavouriteProduct, MySearch, SearchCount
+from config.celery import app as celery_app
+
+from . import fragments, suggestions, tasks
+from .buffers import Drain
+from .models import (
+    Ad,
+    AdPhoto,
+    Category,
+    CategoryAdCounter,
+    FavouriteProduct,
+    MySearch,
+    SearchCount,
+    SearchQuery,
+)
+from .popularity import record_search, restore_popularity, snapshot_popularity
+from .renditions import pending_renditions, render_pending_renditions
+from .search import autocomplete_ads
+from .search_counts import flush_search_counts
+from .serializers import AdListSerializer, FavouriteProductListSerializer, MyAdsListSerializer
+from .suggestions import (
+    SuggestionIndex,
+    get_suggestion_index,
+    suggestion_index,
+    warm_up_suggestion_index,
+)
+from .view_counts import flush_view_counts, pending_views
+from .views import AdListView
 
 
 def generate_test_image():
@@ -21,9 +67,18 @@ def generate_test_image():
     return SimpleUploadedFile("test.jpg", file.read(), content_type="image/jpeg")
 
 
+# Keep Redis state written by the tests away from the development data.
+TEST_CACHES = {"default": {**settings.CACHES["default"], "KEY_PREFIX": "test"}}
+# Nothing listens on port 1: every cache call fails as in a Redis outage.
+DOWN_CACHES = {"default": {**TEST_CACHES["default"], "LOCATION": "redis://127.0.0.1:1/1"}}
+
+
+@override_settings(CACHES=TEST_CACHES)
 class StoreAPITests(APITestCase):
     def setUp(self):
         super().setUp()
+        cache.delete_pattern("store:*")
+        clear_response_cache()
         Ad.objects.all().delete()
         MySearch.objects.all().delete()
         FavouriteProduct.objects.all().delete()
@@ -73,6 +128,46 @@ class StoreAPITests(APITestCase):
         expected_name = self.parent_category.name_ru
         self.assertEqual(response.data["data"][0]["name"], expected_name)
 
+    def test_category_ad_counters(self):
+        def counts(category):
+            counter = CategoryAdCounter.objects.get(category=category)
+            return (counter.ad_count, counter.active_ad_count, counter.total_ad_count)
+
+        self.assertEqual(counts(self.child_category), (2, 0, 2))
+        self.assertEqual(counts(self.parent_category), (0, 0, 2))
+
+        ad = Ad.objects.create(
+            name="counted",
+            category=self.parent_category,
+            description="desc",
+            price=100,
+            seller=self.user,
+            status="active",
+        )
+        self.assertEqual(counts(self.parent_category), (1, 1, 3))
+
+        ad.category = self.child_category
+        ad.save()
+        self.assertEqual(counts(self.child_category), (3, 1, 3))
+        self.assertEqual(counts(self.parent_category), (0, 0, 3))
+
+        ad.status = "inactive"
+        ad.save()
+        self.assertEqual(counts(self.child_category), (3, 0, 3))
+
+        ad.delete()
+        self.assertEqual(counts(self.child_category), (2, 0, 2))
+        self.assertEqual(counts(self.parent_category), (0, 0, 2))
+
+        CategoryAdCounter.objects.update(ad_count=0, total_ad_count=0)
+        call_command("rebuild_category_counters", stdout=StringIO())
+        self.assertEqual(counts(self.child_category), (2, 0, 2))
+        self.assertEqual(counts(self.parent_category), (0, 0, 2))
+
+        response = self.client.get(reverse("store:category-list"))
+        product_counts = {item["id"]: item["product_count"] for item in response.data["data"]}
+        self.assertEqual(product_counts[self.child_category.id], "2")
+
     def test_categories_with_children(self):
         url = reverse("store:categories-with-children")
         response = self.client.get(url)
@@ -84,6 +179,219 @@ class StoreAPITests(APITestCase):
             expected_child_name = self.child_category.name_ru
             self.assertEqual(response.data["data"][0]["children"][0]["name"], expected_child_name)
 
+    def test_ad_detail_not_modified(self):
+        ad = Ad.objects.get(name="telefon")
+        url = reverse("store:detail-ad", kwargs={"slug": ad.slug})
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(pending_views(), {ad.id: 1})
+
+        # Liking the ad changes this viewer's body, so the validator too.
+        FavouriteProduct.objects.create(user=self.user, product=ad)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["data"]["is_liked"])
+
+        etag = response["ETag"]
+        ad.price = 1
+        ad.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # So are the seller and their address, which the ad's row does not change with.
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.full_name = "Renamed Seller"
+            self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["seller"]["full_name"], "Renamed Seller")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.address = Address.objects.create(name="Samarqand")
+            self.user.save()
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.address.name = "Buxoro"
+            self.user.address.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_reads_and_writes_without_redis(self):
+        ad = Ad.objects.get(name="telefon")
+        FavouriteProduct.objects.create(user=self.user, product=ad)
+        urls = [
+            reverse("store:detail-ad", kwargs={"slug": ad.slug}),
+            reverse("store:category-list"),
+            f"{reverse('store:sub-category-list')}?parent_id={self.parent_category.id}",
+            reverse("store:categories-with-children"),
+            reverse("store:list-ads"),
+            reverse("store:my-ads"),
+            reverse("store:my-favourite-product"),
+        ]
+        with override_settings(CACHES=DOWN_CACHES), self.assertLogs(level="WARNING"):
+            for url in urls:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                self.assertNotIn("ETag", response)
+            # Cards are rendered from the database.
+            response = self.client.get(reverse("store:list-ads"))
+            self.assertEqual(len(response.data["data"]["results"]), 2)
+            response = self.client.get(reverse("store:my-favourite-product"))
+            self.assertEqual(response.data["data"]["results"][0]["id"], ad.id)
+
+            self.user.full_name = "Offline Seller"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+            self.child_category.name_uz = "Smartfonlar"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.child_category.save()
+            response = self.client.get(reverse("store:categories-with-children"))
+            self.assertEqual(response.data["data"][0]["children"][0]["name"], "Smartfonlar")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, "Offline Seller")
+
+    def test_ad_response_cache(self):
+        ad = Ad.objects.get(name="telefon")
+        url = reverse("store:detail-ad", kwargs={"slug": ad.slug})
+        list_url = reverse("store:list-ads")
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(url)["X-Response-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Response-Cache"], "hit")
+        # A cached view is still counted.
+        self.assertEqual(pending_views(), {ad.id: 1})
+
+        # Query parameter order and blanks do not split entries.
+        self.client.get(list_url, {"ordering": "price", "page_size": 10})
+        response = self.client.get(f"{list_url}?page_size=10&search=&ordering=price")
+        self.assertEqual(response["X-Response-Cache"], "hit")
+        self.assertEqual(response.data["data"]["results"][0]["price"], 3000000)
+
+        # Per-viewer requests are never cached.
+        response = self.client.get(url, {"device_id": "device-1"})
+        self.assertNotIn("X-Response-Cache", response)
+        self.client.force_authenticate(user=self.user)
+        self.assertNotIn("X-Response-Cache", self.client.get(url))
+        self.client.force_authenticate(user=None)
+
+        ad.price = 1000
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Response-Cache"], "miss")
+        self.assertEqual(response.data["data"]["price"], "1000.00")
+        response = self.client.get(list_url, {"ordering": "price", "page_size": 10})
+        self.assertEqual(response["X-Response-Cache"], "miss")
+
+        # Sellers are shown on cards: renaming one drops the pages showing them.
+        self.user.full_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.client.get(list_url, {"ordering": "price", "page_size": 10})
+        self.assertEqual(response.data["data"]["results"][0]["seller"]["full_name"], "Renamed")
+
+    def test_ad_card_fragments(self):
+        self.user.profile_photo = "profiles/seller.jpg"
+        self.user.save()
+        ad = Ad.objects.get(name="telefon")
+        FavouriteProduct.objects.create(user=self.user, product=ad)
+        url = reverse("store:list-ads")
+        favourites_url = reverse("store:my-favourite-product")
+
+        def cards(language="uz"):
+            response = self.client.get(url, HTTP_ACCEPT_LANGUAGE=language)
+            return {card["id"]: card for card in response.data["data"]["results"]}
+
+        self.client.get(url)
+        self.client.get(favourites_url)
+        # Warm: no card columns are read, only the count, the page's ids and the viewer's likes.
+        with self.assertNumQueries(4):
+            card = cards()[ad.id]
+        self.assertTrue(card["is_liked"])
+        self.assertEqual(
+            card["seller"]["profile_photo"], "http://testserver/media/profiles/seller.jpg"
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get(favourites_url)
+        self.assertTrue(response.data["data"]["results"][0]["is_liked"])
+
+        # Cards are shared: is_liked belongs to the viewer, not to the cached card.
+        other = CustomUser.objects.create_user(phone_number="998907778899", password="pass12345")
+        self.client.force_authenticate(user=other)
+        self.assertFalse(cards()[ad.id]["is_liked"])
+
+        ad.name_ru = "Телефон"
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.save()
+        self.assertEqual(cards("ru")[ad.id]["name"], "Телефон")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = AdPhoto.objects.create(ad=ad, image=generate_test_image())
+        self.assertEqual(cards()[ad.id]["photo"], photo.image.url)
+
+        self.user.full_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual({card["seller"]["full_name"] for card in cards().values()}, {"Renamed"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.address = Address.objects.create(name="Chilonzor 7")
+            self.user.save()
+        address = self.user.address
+        address.name = "Yunusobod 4"
+        with self.captureOnCommitCallbacks(execute=True):
+            address.save()
+        self.assertEqual({card["address"] for card in cards().values()}, {"Yunusobod 4"})
+
+        # A card rendered from rows read before a change is not stored after it.
+        values, build = fragments.KINDS["card"]
+
+        def build_during_change(rows):
+            rows = list(rows)
+            changed = Ad.objects.get(pk=ad.pk)
+            changed.price = 7
+            with self.captureOnCommitCallbacks(execute=True):
+                changed.save()
+            return build(rows)
+
+        cache.delete_pattern("store:fragment:*")
+        with mock.patch.dict(fragments.KINDS, {"card": (values, build_during_change)}):
+            self.assertNotEqual(cards()[ad.id]["price"], 7)
+        # Only the cards are under test here, not the cached response of that request.
+        clear_response_cache()
+        self.assertEqual(cards()[ad.id]["price"], 7)
+        clear_response_cache()
+        with self.assertNumQueries(4):
+            self.assertEqual(cards()[ad.id]["price"], 7)
+
+    def test_categories_with_children_cache(self):
+        url = reverse("store:categories-with-children")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            data = self.client.get(url).data["data"]
+        self.assertEqual(
+            [(node["id"], node["name"]) for node in data],
+            [(self.parent_category.id, "Elektronika")],
+        )
+        self.assertEqual(data[0]["children"][0]["name"], "Telefonlar")
+
+        data = self.client.get(url, HTTP_ACCEPT_LANGUAGE="ru").data["data"]
+        self.assertEqual(data[0]["children"][0]["name"], "Телефоны")
+
+        # A saved category replaces the tree of every language.
+        self.child_category.name_ru = "Смартфоны"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child_category.save()
+        data = self.client.get(url, HTTP_ACCEPT_LANGUAGE="ru").data["data"]
+        self.assertEqual(data[0]["children"][0]["name"], "Смартфоны")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child_category.delete()
+        self.assertEqual(self.client.get(url).data["data"][0]["children"], [])
+
     def test_sub_category(self):
         url = reverse("store:sub-category-list")
         response = self.client.get(url, {"parent_id": self.parent_category.id})
@@ -145,6 +453,89 @@ class StoreAPITests(APITestCase):
         self.assertEqual(response.data["data"]["category"]["name"], self.child_category.name)
         self.assertEqual(response.data["data"]["seller"]["id"], self.user.id)
 
+    def test_ad_detail_counts_views(self):
+        ad = Ad.objects.get(name="telefon")
+        url = reverse("store:detail-ad", kwargs={"slug": ad.slug})
+
+        self.client.get(url)
+        self.client.get(url)
+        self.client.force_authenticate(user=None)
+        self.client.get(url, {"device_id": "device-1"})
+        self.client.get(url, {"device_id": "device-1"})
+        self.assertEqual(pending_views(), {ad.id: 2})
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 0)
+
+        output = StringIO()
+        call_command("flush_view_counts", stdout=output)
+        self.assertIn("Flushed 2 ad views", output.getvalue())
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 2)
+        self.assertEqual(pending_views(), {})
+        self.assertEqual(flush_view_counts(), 0)
+
+        # Committed, but left in Redis: the rerun must not add it again.
+        self.client.get(url, {"device_id": "device-2"})
+        redis = get_redis_connection()
+        with mock.patch.object(type(redis), "delete", side_effect=RedisConnectionError("down")):
+            with self.assertRaises(RedisConnectionError):
+                flush_view_counts()
+        self.assertEqual(flush_view_counts(), 0)
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 3)
+
+        # A flush that outlived its lock is rolled back and left to the new holder.
+        self.client.get(url, {"device_id": "device-3"})
+        check_lock = Drain.check_lock
+
+        def lose_lock(drain):
+            redis.delete(drain.lock.name)
+            check_lock(drain)
+
+        with mock.patch.object(Drain, "check_lock", autospec=True, side_effect=lose_lock):
+            with self.assertRaises(LockNotOwnedError):
+                flush_view_counts()
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 3)
+        self.assertEqual(flush_view_counts(), 1)
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 4)
+
+    def test_periodic_tasks(self):
+        reset_task_stats()
+        # Every scheduled task exists, and runs in this process during tests.
+        for entry in settings.CELERY_BEAT_SCHEDULE.values():
+            self.assertIn(entry["task"], celery_app.tasks)
+        self.assertTrue(celery_app.conf.task_always_eager)
+        router = celery_app.amqp.router
+        self.assertEqual(router.route({}, tasks.flush_view_counts.name)["queue"].name, "counters")
+        self.assertEqual(router.route({}, render_pending_renditions.name)["queue"].name, "media")
+
+        ad = Ad.objects.get(name="telefon")
+        self.client.get(reverse("store:detail-ad", kwargs={"slug": ad.slug}))
+        self.assertEqual(tasks.flush_view_counts.delay().get(), 1)
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, 1)
+        self.assertEqual(tasks.flush_search_counts.delay().get(), 0)
+        self.assertEqual(tasks.snapshot_popular_searches.delay().get(), 0)
+
+        # A lost Redis connection is retried (eagerly, at once).
+        failing_once = mock.patch(
+            "store.view_counts.flush_view_counts", side_effect=[RedisConnectionError("down"), 0]
+        )
+        with failing_once as flush:
+            result = tasks.flush_view_counts.apply(throw=False)
+        self.assertEqual((result.state, flush.call_count), ("SUCCESS", 2))
+
+        stats = task_stats()[tasks.flush_view_counts.name]
+        self.assertEqual((stats["runs"], stats["retry"], stats["failure"]), (3, 1, 0))
+        self.assertGreater(stats["run"], 0)
+        output = StringIO()
+        call_command("task_stats", "--reset", stdout=output)
+        self.assertIn("queue counters: 0 waiting", output.getvalue())
+        self.assertIn(tasks.flush_search_counts.name, output.getvalue())
+        self.assertEqual(task_stats(), {})
+
     def test_ads_list(self):
         url = reverse("store:list-ads")
         response = self.client.get(url)
@@ -154,6 +545,227 @@ class StoreAPITests(APITestCase):
         self.assertIn("results", response.data["data"])
         self.assertIsInstance(response.data["data"]["results"], list)
 
+    def test_ads_list_estimated_count(self):
+        url = reverse("store:list-ads")
+        response = self.client.get(url)
+        self.assertTrue(response.data["data"]["count_exact"])
+        self.assertEqual(response.data["data"]["count"], 2)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Ad._meta.db_table}")
+        with mock.patch.object(EstimatedCountPaginator, "exact_count_threshold", 2):
+            response = self.client.get(url)
+            self.assertFalse(response.data["data"]["count_exact"])
+
+            response = self.client.get(url, {"seller_id": self.user.id + 1})
+            self.assertTrue(response.data["data"]["count_exact"])
+            self.assertEqual(response.data["data"]["count"], 0)
+
+    def test_ads_list_pages_past_wrong_estimate(self):
+        Ad.objects.bulk_create(
+            Ad(
+                name=f"deep {i}",
+                slug=f"deep-{i}",
+                category=self.child_category,
+                description="deep",
+                price=1000 + i,
+                seller=self.user,
+            )
+            for i in range(28)
+        )
+        url = reverse("store:list-ads")
+
+        # 30 ads in pages of 10, estimated too low and too high.
+        for estimate in (20, 100):
+            clear_response_cache()
+            ids, pages = [], 0
+            with (
+                mock.patch.object(EstimatedCountPaginator, "exact_count_threshold", 2),
+                mock.patch("common.pagination.estimate_count", return_value=estimate),
+            ):
+                link = f"{url}?page_size=10"
+                while link:
+                    response = self.client.get(link)
+                    self.assertEqual(response.status_code, 200)
+                    data = response.data["data"]
+                    self.assertEqual((data["count"], data["count_exact"]), (estimate, False))
+                    ids += [ad["id"] for ad in data["results"]]
+                    pages += 1
+                    link = data["next"]
+                response = self.client.get(url, {"page_size": 10, "page": 4})
+
+            self.assertEqual(pages, 3)
+            self.assertEqual(sorted(ids), sorted(Ad.objects.values_list("id", flat=True)))
+            self.assertEqual(response.status_code, 404)
+
+    def test_ads_list_category_descendants(self):
+        grandchild = Category.objects.create(name="Smartfonlar", parent=self.child_category)
+        self.assertEqual(
+            grandchild.path, [self.parent_category.id, self.child_category.id, grandchild.id]
+        )
+        deep_ad = Ad.objects.create(
+            name="deep", category=grandchild, description="d", price=10, seller=self.user
+        )
+        url = reverse("store:list-ads")
+
+        def ids(category_ids):
+            results = self.client.get(url, {"category_ids": category_ids}).data["data"]["results"]
+            return {item["id"] for item in results}
+
+        child_ads = set(
+            Ad.objects.filter(category=self.child_category).values_list("id", flat=True)
+        )
+        self.assertEqual(ids(str(self.parent_category.id)), child_ads | {deep_ad.id})
+        self.assertEqual(ids(f"{grandchild.id},0"), {deep_ad.id})
+
+        # Moving a category carries its subtree along.
+        other = Category.objects.create(name="Boshqa")
+        self.child_category.parent = other
+        self.child_category.save()
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, [other.id, self.child_category.id, grandchild.id])
+        self.assertEqual(ids(str(self.parent_category.id)), set())
+        self.assertEqual(ids(str(other.id)), child_ads | {deep_ad.id})
+
+    def test_ads_list_location(self):
+        district = District.objects.create(region=self.region, name="Yunusobod")
+        self.user.region, self.user.district = self.region, district
+        self.user.save()
+        ad = Ad.objects.create(
+            name="located",
+            category=self.child_category,
+            description="d",
+            price=10,
+            seller=self.user,
+        )
+        self.assertEqual((ad.region_id, ad.district_id), (self.region.id, district.id))
+        url = reverse("store:list-ads")
+
+        def ids(**params):
+            return {item["id"] for item in self.client.get(url, params).data["data"]["results"]}
+
+        seller_ads = set(Ad.objects.filter(seller=self.user).values_list("id", flat=True))
+        self.assertEqual(ids(region_id=self.region.id), seller_ads)
+        self.assertEqual(ids(district_id=district.id), seller_ads)
+
+        # A seller who moves takes all their ads along.
+        other = Region.objects.create(name="Samarqand")
+        self.user.region, self.user.district = other, None
+        self.user.save()
+        self.assertEqual(ids(region_id=self.region.id), set())
+        self.assertEqual(ids(region_id=other.id), seller_ads)
+        self.assertEqual(ids(district_id=district.id), set())
+
+    def test_explain_ad_queries(self):
+        output = StringIO()
+        call_command("explain_ad_queries", seed=300, stdout=output)
+        report = output.getvalue()
+        self.assertIn("Seeded 300 ads", report)
+        self.assertIn("category tree -published_at", report)
+        self.assertIn("of 32 queries flagged", report)
+        self.assertEqual(Ad.objects.filter(slug__startswith="explain-").count(), 0)
+
+        # Every table is small here, so with no row threshold the category lookup seq scans.
+        with self.assertRaisesMessage(CommandError, "queries flagged"):
+            call_command("explain_ad_queries", min_rows=0, strict=True, stdout=StringIO())
+
+    def test_ads_list_full_text_search(self):
+        Ad.objects.create(
+            name_uz="Telefon g'ilofi",
+            name_ru="Чехол для телефона",
+            description_uz="Silikon",
+            description_ru="Силиконовый чехол",
+            category=self.child_category,
+            price=50000,
+            seller=self.user,
+        )
+        Ad.objects.create(
+            name_uz="Quvvatlagich",
+            name_ru="Зарядка",
+            description_uz="Telefon uchun",
+            description_ru="Для телефона",
+            category=self.child_category,
+            price=70000,
+            seller=self.user,
+        )
+        url = reverse("store:list-ads")
+
+        def names(**params):
+            response = self.client.get(url, params)
+            return [ad["name"] for ad in response.data["data"]["results"]]
+
+        # The last word matches as a prefix; name hits rank above description hits.
+        self.assertEqual(names(search="telef")[-1], "Quvvatlagich")
+        self.assertCountEqual(names(search="telef"), ["telefon", "Telefon g'ilofi", "Quvvatlagich"])
+        self.assertEqual(names(search="test desc"), ["iPhone 11", "telefon"])
+        # Russian text is stemmed and searchable whatever the request language is.
+        self.assertEqual(names(search="силиконовые"), ["Telefon g'ilofi"])
+        self.assertEqual(
+            names(search="telef", ordering="price"),
+            ["Telefon g'ilofi", "Quvvatlagich", "telefon"],
+        )
+        self.assertEqual(len(names(search="!!!")), 4)
+
+    def test_ads_list_cursor_pagination(self):
+        for price in (100, 200, 200, 300):
+            Ad.objects.create(
+                name="cursor ad",
+                category=self.child_category,
+                description="desc",
+                price=price,
+                seller=self.user,
+            )
+        expected = list(Ad.objects.order_by("-price", "-id").values_list("id", flat=True))
+
+        url = reverse("store:list-ads")
+        response = self.client.get(
+            url, {"pagination": "cursor", "ordering": "-price", "page_size": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["success"])
+        self.assertNotIn("count", response.data["data"])
+        self.assertIsNone(response.data["data"]["previous"])
+
+        seen = [ad["id"] for ad in response.data["data"]["results"]]
+        next_url = response.data["data"]["next"]
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, 200)
+            seen += [ad["id"] for ad in response.data["data"]["results"]]
+            next_url = response.data["data"]["next"]
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(response.data["data"]["previous"])
+        self.assertEqual([ad["id"] for ad in response.data["data"]["results"]], expected[-4:-2])
+
+    def test_ads_list_is_liked_for_device(self):
+        liked, not_liked = Ad.objects.order_by("id")
+        FavouriteProduct.objects.create(device_id="liked-device", product=liked)
+        self.client.force_authenticate(user=None)
+
+        url = reverse("store:list-ads")
+        response = self.client.get(url, {"device_id": "liked-device"})
+
+        self.assertEqual(response.status_code, 200)
+        is_liked = {ad["id"]: ad["is_liked"] for ad in response.data["data"]["results"]}
+        self.assertEqual(is_liked, {liked.id: True, not_liked.id: False})
+
+    def test_ad_cover_photo_follows_photos(self):
+        ad = Ad.objects.order_by("id").first()
+        first = AdPhoto.objects.create(ad=ad, image=generate_test_image())
+        main = AdPhoto.objects.create(ad=ad, image=generate_test_image(), is_main=True)
+        ad.refresh_from_db()
+        self.assertEqual(ad.cover_photo, main)
+
+        url = reverse("store:list-ads")
+        response = self.client.get(url)
+        photos = {item["id"]: item["photo"] for item in response.data["data"]["results"]}
+        self.assertEqual(photos[ad.id], main.image.url)
+
+        main.delete()
+        ad.refresh_from_db()
+        self.assertEqual(ad.cover_photo, first)
+
     def test_create_favourite_product(self):
         create_url = reverse("store:create-ads")
         image = generate_test_image()
@@ -274,6 +886,51 @@ class StoreAPITests(APITestCase):
         self.assertEqual(response.data["data"]["product"], product_id)
         self.assertNotIn("device_id", response.data["data"])
 
+    def test_feed_matches_serializers(self):
+        self.user.profile_photo = "profiles/seller.jpg"
+        self.user.address = Address.objects.create(name="Chilonzor 7")
+        self.user.save()
+        ad = Ad.objects.get(name="telefon")
+        ad.name_ru = "Телефон"
+        ad.save()
+        AdPhoto.objects.create(ad=ad, image="products/telefon.jpg")
+        FavouriteProduct.objects.create(user=self.user, product=ad)
+        FavouriteProduct.objects.create(user=self.user, product=Ad.objects.get(name="iPhone 11"))
+
+        renderer = JSONRenderer()
+        lists = [
+            ("store:list-ads", AdListView.queryset.order_by("-published_at"), AdListSerializer),
+            (
+                "store:my-ads",
+                Ad.objects.filter(seller=self.user).order_by("-published_at"),
+                MyAdsListSerializer,
+            ),
+            (
+                "store:my-favourite-product",
+                FavouriteProduct.objects.filter(user=self.user).order_by("-id"),
+                FavouriteProductListSerializer,
+            ),
+        ]
+        for language in ("uz", "ru"):
+            for url_name, queryset, serializer_class in lists:
+                with self.subTest(url_name=url_name, language=language):
+                    response = self.client.get(reverse(url_name), HTTP_ACCEPT_LANGUAGE=language)
+                    request = Request(response.wsgi_request)
+                    request.user, request.LANGUAGE_CODE = self.user, language
+                    with translation.override(language):
+                        expected = serializer_class(
+                            queryset, many=True, context={"request": request}
+                        ).data
+                    self.assertEqual(
+                        renderer.render(response.data["data"]["results"]),
+                        renderer.render(expected),
+                    )
+
+        output = StringIO()
+        call_command("benchmark_ad_feed", "--sizes", "5,10", "--repeat", "1", stdout=output)
+        self.assertIn("favourites", output.getvalue())
+        self.assertNotIn("DIFFERS", output.getvalue())
+
     def test_get_my_favourite_products_authenticated_user(self):
         Ad.objects.all().delete()
         FavouriteProduct.objects.all().delete()
@@ -559,6 +1216,54 @@ class StoreAPITests(APITestCase):
         self.assertIn("id", data_resp)
         self.assertIn("created_at", data_resp)
 
+    def test_ad_photo_renditions(self):
+        ad = Ad.objects.get(name="telefon")
+        file = BytesIO()
+        Image.new("RGB", (1600, 900), "green").save(file, "JPEG")
+        upload = SimpleUploadedFile("wide.jpg", file.getvalue(), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("store:product-image-create"),
+                {"image": upload, "product_id": ad.id},
+                format="multipart",
+            )
+            photo = AdPhoto.objects.get(pk=response.data["data"]["id"])
+
+            # The original is served until the task has run, after the commit.
+            original = photo.image.url
+            self.assertEqual(set(response.data["data"]["renditions"].values()), {original})
+            cards = self.client.get(reverse("store:list-ads")).data["data"]["results"]
+            card = next(card for card in cards if card["id"] == ad.id)
+            self.assertEqual(card["photo"], original)
+            self.assertEqual(set(card["photo_renditions"]), set(AdPhoto.RENDITIONS))
+            self.assertEqual(set(card["photo_renditions"].values()), {original})
+
+        # Tasks run eagerly in tests.
+        self.assertEqual(pending_renditions(), 0)
+        photo.refresh_from_db()
+        with photo.image.storage.open(photo.renditions["thumbnail"]) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (320, 320))
+        with photo.image.storage.open(photo.renditions["large_webp"]) as large:
+            image = Image.open(large)
+            self.assertEqual((image.format, image.size), ("WEBP", (1280, 720)))
+
+        cards = self.client.get(reverse("store:list-ads")).data["data"]["results"]
+        renditions = next(card for card in cards if card["id"] == ad.id)["photo_renditions"]
+        self.assertEqual(renditions, photo.rendition_urls())
+        self.assertTrue(renditions["thumbnail_webp"].endswith("-thumbnail_webp.webp"))
+
+        # Photos never queued are caught up by --missing; unreadable ones keep the original.
+        [broken] = AdPhoto.objects.bulk_create(
+            [AdPhoto(ad=ad, image=SimpleUploadedFile("broken.jpg", b"not an image"))]
+        )
+        output = StringIO()
+        with self.assertLogs("store.renditions"), self.captureOnCommitCallbacks(execute=True):
+            call_command("process_renditions", "--missing", "--once", stdout=output)
+        self.assertIn("Queued 1 photos.", output.getvalue())
+        broken.refresh_from_db()
+        self.assertEqual(broken.renditions, {})
+        self.assertEqual(set(broken.rendition_urls().values()), {broken.image.url})
+
     def test_category_product_search_by_query(self):
         Category.objects.create(name="Техника")
         Category.objects.create(name="Смартфоны")
@@ -568,8 +1273,43 @@ class StoreAPITests(APITestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.data["success"])
-        self.assertIsInstance(response.data["data"], list)
-        self.assertEqual(response.data["data"][0]["name"], "Техника")
+        self.assertIsInstance(response.data["data"]["results"], list)
+        self.assertEqual(response.data["data"]["results"][0]["name"], "Техника")
+
+    def test_category_product_search_pages(self):
+        Category.objects.create(name="Telefon qopqoqlari")
+        for i in range(4):
+            Ad.objects.create(
+                name=f"telefon {i}",
+                category=self.child_category,
+                description="desc",
+                price=1000,
+                seller=self.user,
+                status="active",
+            )
+        url = reverse("store:category-product-search")
+
+        pages = []
+        response = self.client.get(url, {"q": "telefon", "page_size": 2})
+        while True:
+            data = response.data["data"]
+            pages.append([(item["type"], item["name"]) for item in data["results"]])
+            if not data["next"]:
+                break
+            # Later pages only read the product section, one bounded query each.
+            with self.assertNumQueries(1):
+                response = self.client.get(data["next"])
+
+        self.assertEqual(
+            pages,
+            [
+                [("category", "Telefonlar"), ("category", "Telefon qopqoqlari")],
+                [("product", "telefon 3"), ("product", "telefon 2")],
+                [("product", "telefon 1"), ("product", "telefon 0")],
+            ],
+        )
+        response = self.client.get(url, {"cursor": "bad"})
+        self.assertEqual(response.status_code, 404)
 
     def test_complete_search_by_query(self):
         Ad.objects.create(
@@ -603,6 +1343,136 @@ class StoreAPITests(APITestCase):
         self.assertEqual(len(response.data["data"]), 1)
         self.assertEqual(response.data["data"][0]["name"], "vivo 53s")
 
+    def test_complete_search_ranking_and_limit(self):
+        names = ["Samsung A15", "Samsung Galaxy S24 Ultra", "Samsung S2", "Chexol Samsung"]
+        ads = [
+            Ad.objects.create(
+                name_uz=name,
+                name_ru=name,
+                description="desc",
+                category=self.child_category,
+                price=1000,
+                seller=self.user,
+                status="active",
+            )
+            for name in names
+        ]
+        SearchCount.objects.create(product=ads[1], search_count=5)
+        url = reverse("store:search-complete")
+
+        def suggestions(**params):
+            response = self.client.get(url, params)
+            return [item["name"] for item in response.data["data"]]
+
+        # Prefix matches by popularity then length, then names with a matching word.
+        self.assertEqual(
+            suggestions(q="sam"),
+            ["Samsung Galaxy S24 Ultra", "Samsung S2", "Samsung A15", "Chexol Samsung"],
+        )
+        self.assertEqual(suggestions(q="samsung s2"), ["Samsung S2", "Samsung Galaxy S24 Ultra"])
+        self.assertEqual(len(suggestions(q="sam", limit=2)), 2)
+        self.assertEqual(len(suggestions(q="sam", limit=500)), 4)
+        self.assertEqual(suggestions(q="desc"), [])
+        self.assertEqual(suggestions(q=" "), [])
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        with translation.override("uz"):
+            with CaptureQueriesContext(connection) as context:
+                autocomplete_ads(Ad.objects.filter(status="active"), "sam", limit=1)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {context.captured_queries[0]['sql']}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("ad_name_uz_prefix_idx", plan)
+
+    def test_search_suggestions(self):
+        suggestion_index.build()
+        url = reverse("store:search-suggestions")
+        with self.captureOnCommitCallbacks(execute=True):
+            query = SearchQuery.objects.create(name="Samsung telefon", category=self.child_category)
+            ad = Ad.objects.create(
+                name_uz="Samsung S2",
+                name_ru="Самсунг S2",
+                description="desc",
+                category=self.child_category,
+                price=1000,
+                seller=self.user,
+                status="active",
+            )
+
+        def suggestions(q, language="uz"):
+            response = self.client.get(url, {"q": q}, HTTP_ACCEPT_LANGUAGE=language)
+            return [(item["type"], item["name"]) for item in response.data["data"]]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                suggestions("SAM"), [("query", "Samsung telefon"), ("ad", "Samsung S2")]
+            )
+        self.assertEqual(suggestions("сам", "ru"), [("ad", "Самсунг S2")])
+        # Only active ads are indexed.
+        self.assertEqual(suggestions("telefon"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.status = "inactive"
+            ad.save()
+            query.delete()
+        self.assertEqual(suggestions("sam"), [])
+
+        output = StringIO()
+        call_command("suggestion_index_stats", prefix=["sam"], stdout=output)
+        self.assertIn("Rebuild time", output.getvalue())
+
+    def test_suggestion_changes_reach_other_workers(self):
+        ad = Ad.objects.create(
+            name="Nokia 3310",
+            description="desc",
+            category=self.child_category,
+            price=1000,
+            seller=self.user,
+            status="active",
+        )
+        other = SuggestionIndex().build()
+        version = other.version
+
+        # Fields the index does not hold are not sent to the other workers.
+        with self.captureOnCommitCallbacks(execute=True):
+            Ad.objects.get(pk=ad.pk).save(update_fields=["price"])
+        with mock.patch.object(other, "build") as build:
+            other.catch_up()
+        build.assert_not_called()
+        self.assertEqual(other.version, version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = Ad.objects.get(pk=ad.pk)
+            ad.name_uz = "Nokia 3310 Classic"
+            ad.save()
+        with mock.patch.object(other, "build") as build:
+            other.catch_up()
+        build.assert_not_called()
+        self.assertEqual(other.version, version + 1)
+        self.assertEqual([s.name for s in other.lookup("nokia", "uz")], ["Nokia 3310 Classic"])
+
+        # A worker behind the changes still kept rebuilds instead.
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.status = "inactive"
+            ad.save()
+        with mock.patch.object(suggestions, "CHANGES_KEPT", 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                SearchQuery.objects.create(name="nokia qidiruv")
+        other.version = version
+        with mock.patch.object(other, "build", wraps=other.build) as build:
+            other.catch_up()
+        build.assert_called_once()
+        self.assertEqual([s.name for s in other.lookup("nokia", "uz")], ["nokia qidiruv"])
+
+        with (
+            self.assertLogs("store.suggestions", "WARNING"),
+            mock.patch.object(suggestions, "get_redis_connection", side_effect=RedisError),
+        ):
+            suggestion_index.is_built = False
+            warm_up_suggestion_index()
+        self.assertTrue(suggestion_index.is_built)
+
     def test_search_count_increase(self):
         ad = Ad.objects.create(
             name="vivo 53s",
@@ -627,9 +1497,46 @@ class StoreAPITests(APITestCase):
         self.assertEqual(data["search_count"], 1)
         self.assertIn("updated_at", data)
 
+        # Counts live in Redis until they are flushed.
+        flush_search_counts()
         search_count_obj.refresh_from_db()
         self.assertEqual(search_count_obj.search_count, 1)
 
+    def test_search_count_increase_without_database(self):
+        ad = Ad.objects.get(name="telefon")
+        SearchCount.objects.create(product=ad, search_count=5)
+        url = reverse("store:search-count", kwargs={"category_id": ad.id})
+
+        self.assertEqual(self.client.get(url).data["data"]["search_count"], 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data["data"]["search_count"], 7)
+        self.assertFalse(SearchCount.objects.filter(product=ad, search_count=7).exists())
+
+        output = StringIO()
+        call_command("flush_search_counts", stdout=output)
+        self.assertIn("Flushed 2 product searches", output.getvalue())
+        self.assertEqual(SearchCount.objects.get(product=ad).search_count, 7)
+        self.assertEqual(flush_search_counts(), 0)
+
+        ad.category = self.parent_category
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.save()
+        data = self.client.get(url).data["data"]
+        self.assertEqual((data["search_count"], data["category"]), (8, self.parent_category.id))
+
+        # Without Redis the search goes uncounted, not failed.
+        with (
+            self.assertLogs("store", "WARNING"),
+            mock.patch("store.search_counts.get_redis_connection", side_effect=RedisError),
+            mock.patch("store.popularity.get_redis_connection", side_effect=RedisError),
+        ):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["search_count"], 7)
+
+        response = self.client.get(reverse("store:search-count", kwargs={"category_id": 0}))
+        self.assertEqual(response.status_code, 404)
+
     def test_search_populars(self):
         ad1 = Ad.objects.create(
             name="vivo 53s",
@@ -669,6 +1576,71 @@ class StoreAPITests(APITestCase):
         self.assertEqual(results[0]["search_count"], 4)
         self.assertEqual(results[1]["search_count"], 1)
 
+    def test_search_populars_by_window(self):
+        self.user.region = self.region
+        self.user.save()
+        old = Ad.objects.create(
+            name="old favourite", category=self.child_category, price=100, seller=self.user
+        )
+        other_seller = CustomUser.objects.create_user(
+            phone_number="998901112244", full_name="Other", password="testpass123"
+        )
+        new = Ad.objects.create(
+            name="new hit", category=self.parent_category, price=100, seller=other_seller
+        )
+        restore_popularity()
+        now = time.time()
+        for _ in range(3):
+            record_search(old.id, self.child_category.id, self.region.id, now=now - 10 * 86400)
+        record_search(new.id, self.parent_category.id, now=now)
+        # As flush_search_counts would have stored them.
+        SearchCount.objects.create(product=old, search_count=3)
+        SearchCount.objects.create(product=new, search_count=1)
+
+        url = reverse("store:popular-searches")
+
+        def ranking(**params):
+            return [
+                (item["id"], item["search_count"])
+                for item in self.client.get(url, params).data["data"]
+            ]
+
+        self.assertEqual(ranking(), [(old.id, 3), (new.id, 1)])
+        # Ten days: a third of a week-old search remains, a day-old one is gone.
+        self.assertEqual(ranking(window="week"), [(old.id, 1), (new.id, 1)])
+        self.assertEqual(ranking(window="day"), [(new.id, 1), (old.id, 0)])
+        self.assertEqual(ranking(window="day", limit=1), [(new.id, 1)])
+        self.assertEqual(ranking(category_id=self.child_category.id), [(old.id, 3)])
+        self.assertEqual(ranking(region_id=self.region.id), [(old.id, 3)])
+
+        # Searching through the API feeds the ranking too.
+        for _ in range(3):
+            self.client.get(reverse("store:search-count", kwargs={"category_id": new.id}))
+        self.assertEqual(ranking(), [(new.id, 4), (old.id, 3)])
+
+        flush_search_counts()
+        self.assertEqual(snapshot_popularity(), 2)
+        snapshot = SearchCount.objects.get(product=new)
+        self.assertAlmostEqual(snapshot.day_score, 4, places=2)
+        self.assertIsNotNone(snapshot.scored_at)
+
+        # Without Redis the last snapshot ranks, until the periodic job reloads it.
+        cache.delete_pattern("store:*")
+        self.assertEqual(ranking(window="day"), [(new.id, 4), (old.id, 0)])
+        # A search counted and flushed before the reload is in both the sets and the total.
+        self.client.get(reverse("store:search-count", kwargs={"category_id": new.id}))
+        flush_search_counts()
+        output = StringIO()
+        call_command("snapshot_popular_searches", stdout=output)
+        self.assertIn("Restored popularity of 2 products", output.getvalue())
+        self.assertEqual(ranking(), [(new.id, 5), (old.id, 3)])
+        self.assertEqual(ranking(region_id=self.region.id), [(old.id, 3)])
+        self.assertEqual(ranking(window="week"), [(new.id, 5), (old.id, 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new.delete()
+        self.assertEqual(ranking(), [(old.id, 3)])
+
     def test_create_my_search(self):
         category = Category.objects.create(name="Texnika")
 
@@ -757,3 +1729,233 @@ class StoreAPITests(APITestCase):
         self.assertIsNone(response.data["data"])
 
         self.assertFalse(MySearch.objects.filter(id=my_search.id).exists())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class StoreQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    urls_module = "store.urls"
+    namespace = "store"
+    budgets = [
+        EndpointBudget("create-ads", 12, seed="seed_create_ad", method="post", user="user"),
+        EndpointBudget("detail-ad", 4, seed="seed_ad_detail"),
+        EndpointBudget("categories-with-children", 1, seed="seed_categories"),
+        EndpointBudget("category-list", 1, seed="seed_categories"),
+        EndpointBudget("favourite-product-create-by-id", 8, seed="seed_device_like", method="post"),
+        EndpointBudget(
+            "favourite-product-delete-by-id", 2, seed="seed_device_unlike", method="delete"
+        ),
+        EndpointBudget(
+            "favourite-product-create", 5, seed="seed_user_like", method="post", user="user"
+        ),
+        EndpointBudget(
+            "favourite-delete", 2, seed="seed_user_unlike", method="delete", user="user"
+        ),
+        # Cold card fragments: the page's ids, then the cards (see test_ad_card_fragments).
+        EndpointBudget("list-ads", 5, seed="seed_user_favourites", user="user"),
+        EndpointBudget("my-ads", 3, seed="seed_ads", user="user"),
+        EndpointBudget("my-ad", 2, seed="seed_my_ad", user="user"),
+        EndpointBudget("my-ad", 4, seed="seed_my_ad_update", method="patch", user="user"),
+        EndpointBudget("my-favourite-product-by-id", 4, seed="seed_device_favourites"),
+        EndpointBudget("my-favourite-product", 4, seed="seed_user_favourites", user="user"),
+        EndpointBudget(
+            "my-search-create", 3, seed="seed_my_search_create", method="post", user="user"
+        ),
+        EndpointBudget("my-search-list", 2, seed="seed_my_searches", user="user"),
+        EndpointBudget(
+            "my-search-delete", 2, seed="seed_my_search_delete", method="delete", user="user"
+        ),
+        EndpointBudget("product-download", 4, seed="seed_ad_detail"),
+        EndpointBudget(
+            "product-image-create",
+            3,
+            seed="seed_product_image",
+            method="post",
+            user="user",
+        ),
+        EndpointBudget("category-product-search", 2, seed="seed_search"),
+        EndpointBudget("search-complete", 2, seed="seed_search_complete"),
+        EndpointBudget("search-suggestions", 0, seed="seed_search_suggestions"),
+        EndpointBudget("search-count", 1, seed="seed_search_count"),
+        EndpointBudget("popular-searches", 1, seed="seed_popular_searches"),
+        EndpointBudget("sub-category-list", 1, seed="seed_categories"),
+    ]
+
+    def setUp(self):
+        self.parent_category = Category.objects.create(name_uz="Elektronika", name_ru="Техника")
+        self.category = Category.objects.create(
+            name_uz="Telefonlar", name_ru="Телефоны", parent=self.parent_category
+        )
+        self.region = Region.objects.create(name="Tashkent")
+        self.user = CustomUser.objects.create_user(
+            phone_number="998901112233", full_name="Budget Seller", password="testpass123"
+        )
+
+    def reset_state(self):
+        # Redis outlives the rolled-back rows, and ids are reused between seed sizes.
+        super().reset_state()
+        cache.delete_pattern("store:*")
+
+    def create_ads(self, size):
+        ads = Ad.objects.bulk_create(
+            Ad(
+                name=f"budget ad {i}",
+                slug=f"budget-ad-{i}",
+                description="budget description",
+                price=1000 + i,
+                category=self.category,
+                seller=self.user,
+                status="active",
+            )
+            for i in range(size)
+        )
+        photos = AdPhoto.objects.bulk_create(
+            AdPhoto(ad=ad, image=f"products/budget-{ad.pk}.jpg", is_main=True) for ad in ads
+        )
+        for ad, photo in zip(ads, photos):
+            ad.cover_photo = photo
+        Ad.objects.bulk_update(ads, ["cover_photo"])
+        return ads
+
+    def seed_ads(self, size):
+        self.create_ads(size)
+
+    def seed_create_ad(self, size):
+        self.create_ads(size)
+        return {
+            "data": {
+                "name_uz": "yangi telefon",
+                "name_ru": "новый телефон",
+                "description_uz": "tavsif",
+                "description_ru": "описание",
+                "category": self.category.id,
+                "price": 1000,
+                "photos": [generate_test_image()],
+            },
+            "format": "multipart",
+        }
+
+    def create_ad_with_photos(self, size):
+        ad = self.create_ads(size)[-1]
+        AdPhoto.objects.bulk_create(
+            AdPhoto(ad=ad, image=f"products/budget-extra-{i}.jpg") for i in range(size)
+        )
+        return ad
+
+    def seed_ad_detail(self, size):
+        return {"kwargs": {"slug": self.create_ad_with_photos(size).slug}}
+
+    def seed_my_ad(self, size):
+        return {"kwargs": {"pk": self.create_ad_with_photos(size).pk}}
+
+    def seed_my_ad_update(self, size):
+        return {**self.seed_my_ad(size), "data": {"price": 2000}}
+
+    def seed_categories(self, size):
+        parents = Category.objects.bulk_create(
+            Category(name_uz=f"Kategoriya {i}", name_ru=f"Категория {i}") for i in range(size)
+        )
+        Category.objects.bulk_create(
+            Category(name_uz=f"Bola {i}", name_ru=f"Дочерняя {i}", parent=parent)
+            for i, parent in enumerate(parents)
+        )
+        self.create_ads(size)
+
+    def seed_device_like(self, size):
+        ads = self.create_ads(size)
+        FavouriteProduct.objects.bulk_create(
+            FavouriteProduct(device_id="budget-device", product=ad) for ad in ads[:-1]
+        )
+        return {"data": {"device_id": "budget-device", "product": ads[-1].id}}
+
+    def create_device_favourites(self, size):
+        ads = self.create_ads(size)
+        FavouriteProduct.objects.bulk_create(
+            FavouriteProduct(device_id="budget-device", product=ad) for ad in ads
+        )
+        return ads
+
+    def seed_device_favourites(self, size):
+        self.create_device_favourites(size)
+        return {"query": {"device_id": "budget-device"}}
+
+    def seed_device_unlike(self, size):
+        ads = self.create_device_favourites(size)
+        return {"kwargs": {"pk": ads[-1].id}, "query": {"device_id": "budget-device"}}
+
+    def seed_user_like(self, size):
+        ads = self.create_ads(size)
+        FavouriteProduct.objects.bulk_create(
+            FavouriteProduct(user=self.user, product=ad) for ad in ads[:-1]
+        )
+        return {"data": {"product": ads[-1].id}}
+
+    def create_user_favourites(self, size):
+        ads = self.create_ads(size)
+        FavouriteProduct.objects.bulk_create(
+            FavouriteProduct(user=self.user, product=ad) for ad in ads
+        )
+        return ads
+
+    def seed_user_favourites(self, size):
+        self.create_user_favourites(size)
+
+    def seed_user_unlike(self, size):
+        return {"kwargs": {"pk": self.create_user_favourites(size)[-1].id}}
+
+    def create_my_searches(self, size):
+        categories = Category.objects.bulk_create(
+            Category(name=f"Qidiruv {i}") for i in range(size)
+        )
+        return MySearch.objects.bulk_create(
+            MySearch(user=self.user, category=category, search_query="iPhone", region=self.region)
+            for category in categories
+        )
+
+    def seed_my_searches(self, size):
+        self.create_my_searches(size)
+
+    def seed_my_search_create(self, size):
+        self.create_my_searches(size)
+        return {
+            "data": {
+                "category": self.category.id,
+                "search_query": "iPhone",
+                "region_id": self.region.id,
+            }
+        }
+
+    def seed_my_search_delete(self, size):
+        return {"kwargs": {"pk": self.create_my_searches(size)[-1].id}}
+
+    def seed_product_image(self, size):
+        ad = self.create_ads(size)[-1]
+        return {
+            "data": {"image": generate_test_image(), "is_main": True, "product_id": ad.id},
+            "format": "multipart",
+        }
+
+    def seed_search(self, size):
+        Category.objects.bulk_create(Category(name=f"budget category {i}") for i in range(size))
+        self.create_ads(size)
+        # The largest page reaches the product section at every size, so each run reads both
+        # sections: one bounded query per section however many categories and ads match.
+        return {"query": {"q": "budget", "page_size": 100}}
+
+    def seed_search_complete(self, size):
+        self.create_ads(size)
+        # No name starts with "ad", so both the prefix and the word steps run.
+        return {"query": {"q": "ad"}}
+
+    def seed_search_suggestions(self, size):
+        self.create_ads(size)
+        suggestion_index.is_built = False
+        get_suggestion_index()
+        return {"query": {"q": "budget"}}
+
+    def seed_search_count(self, size):
+        return {"kwargs": {"category_id": self.create_ads(size)[-1].id}}
+
+    def seed_popular_searches(self, size):
+        SearchCount.objects.bulk_create(
+            SearchCount(product=ad, search_count=ad.price) for ad in self.create_ads(size)
+        )
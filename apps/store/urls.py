@@ -64,6 +64,7 @@ urlpatterns = [
         views.SearchCountIncreaseView.as_view(),
         name="search-count",
     ),
+    path("search/suggestions/", views.SearchSuggestionView.as_view(), name="search-suggestions"),
     path("search/populars/", views.PopularsView.as_view(), name="popular-searches"),
     path("search/sub-category/", views.SubCategoryListView.as_view(), name="sub-category-list"),
 ]
@@ -0,0 +1,91 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .buffers import drain_counts, pending_key
+from .models import Ad, AppliedFlush
+
+logger = logging.getLogger(__name__)
+
+# A viewer is counted once per ad within this window.
+VIEW_DEDUP_SECONDS = 30 * 60
+FLUSH_BATCH_SIZE = 500
+# A failed batch is retried within minutes; its id only has to be remembered until then.
+APPLIED_FLUSH_RETENTION = timedelta(days=1)
+
+VIEWS_BUFFER = "store:ad_views"
+
+# Marks the viewer as seen and, only if they were not, bumps the ad's pending hits: one round trip.
+RECORD_VIEW_SCRIPT = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    return redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+return 0
+"""
+
+
+def viewer_key(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    device_id = request.query_params.get("device_id")
+    if device_id:
+        return f"device:{device_id}"
+    client = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return f"client:{hashlib.sha1(client.encode()).hexdigest()}"
+
+
+def record_view(ad_id, viewer):
+    """
+    Counts one view of ``ad_id`` in Redis unless ``viewer`` was already counted within
+    ``VIEW_DEDUP_SECONDS``. Never touches the database and never raises on Redis errors.
+    """
+    seen_key = cache.make_key(f"store:ad_views:seen:{ad_id}:{viewer}")
+    try:
+        get_redis_connection().eval(
+            RECORD_VIEW_SCRIPT,
+            2,
+            seen_key,
+            pending_key(VIEWS_BUFFER),
+            VIEW_DEDUP_SECONDS,
+            ad_id,
+        )
+    except RedisError as e:
+        logger.warning(f"Ad view for {ad_id} was not recorded: {e}")
+
+
+def pending_views():
+    hits = get_redis_connection().hgetall(pending_key(VIEWS_BUFFER))
+    return {int(ad_id): int(count) for ad_id, count in hits.items()}
+
+
+def flush_view_counts():
+    """
+    Moves the pending hits into ``Ad.view_count`` with one ``UPDATE`` per batch of ads and
+    returns the number of views written. Hits recorded during the flush wait for the next one.
+    The batch's id is recorded in the same transaction, so a batch that was committed but not
+    deleted from Redis is not added a second time.
+    """
+    with drain_counts(VIEWS_BUFFER) as drain, transaction.atomic():
+        hits = drain.counts
+        if not hits or AppliedFlush.objects.filter(pk=drain.flush_id).exists():
+            return 0
+        items = list(hits.items())
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start : start + FLUSH_BATCH_SIZE]
+            Ad.objects.filter(pk__in=[ad_id for ad_id, _ in batch]).update(
+                view_count=F("view_count")
+                + Case(*(When(pk=ad_id, then=Value(count)) for ad_id, count in batch), default=0)
+            )
+        AppliedFlush.objects.create(flush_id=drain.flush_id, buffer=VIEWS_BUFFER)
+        AppliedFlush.objects.filter(
+            applied_at__lt=timezone.now() - APPLIED_FLUSH_RETENTION
+        ).delete()
+        drain.check_lock()
+    return sum(hits.values())
@@ -1,21 +1,32 @@
 from common.pagination import (
+    AdListCursorPagination,
     AdListPagination,
+    CategoryProductSearchPagination,
     MyAdsListPagination,
     MyFavouriteProductPagination,
     MySearchPagination,
 )
+from common.utils.conditional import ConditionalGetMixin, collection_validators
 from common.utils.custom_response_decorator import custom_response
-from django.db.models import Count, Q
-from django.shortcuts import get_object_or_404
+from common.utils.response_cache import ResponseCacheMixin
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from modeltranslation.utils import get_language
 from rest_framework import generics, serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 
-from .filters import AdFilter
+from .category_tree import get_category_tree, render_tree
+from .feed import my_ad_values, personalize_ad_cards, personalize_favourites, render_my_ads
+from .filters import AdFilter, AdSearchFilter
+from .fragments import ad_fragments
+from .mixins import viewer_favourites
 from .models import Ad, AdPhoto, Category, FavouriteProduct, MySearch, SearchCount
 from .openapi_schema import (
     ad_create_response,
@@ -43,9 +54,28 @@ from .openapi_schema import (
     search_complete_response,
     search_count_response,
     search_product_response,
+    search_suggestion_response,
     sub_category_list_response,
 )
 from .permissions import IsSeller
+from .popularity import (
+    DEFAULT_WINDOW,
+    WINDOWS,
+    popular_limit,
+    popular_products,
+    popular_window,
+    record_search,
+    scope_id,
+)
+from .search import (
+    AUTOCOMPLETE_LIMIT,
+    AUTOCOMPLETE_MAX_LIMIT,
+    autocomplete_ads,
+    autocomplete_limit,
+    search_ads,
+    search_categories,
+)
+from .search_counts import increment_search_count
 from .serializers import (
     AdCreateSerializer,
     AdDetailSerializer,
@@ -64,8 +94,11 @@ from .serializers import (
     SearchCompleteSerializer,
     SearchCountSerializer,
     SearchProductSerializer,
+    SearchSuggestionSerializer,
     SubCategorySerializer,
 )
+from .suggestions import get_suggestion_index
+from .view_counts import record_view, viewer_key
 
 
 @custom_response
@@ -85,25 +118,73 @@ class AdCreateView(generics.CreateAPIView):
 
 
 @custom_response
-class AdDetailView(generics.RetrieveAPIView):
+class AdDetailView(ResponseCacheMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Ad.objects.all()
     serializer_class = AdDetailSerializer
     lookup_field = "slug"
+    uncached_params = ("device_id",)
+
+    def get_cache_tags(self, request, response):
+        ad = self.validated_object
+        return [f"ad:{ad.pk}", f"category:{ad.category_id}", f"seller:{ad.seller_id}"]
+
+    def cache_hit(self, request, entry):
+        record_view(entry["object_id"], viewer_key(request))
+
+    def get_validators(self, request):
+        favourites = viewer_favourites(request)
+        liked = Value(False)
+        if favourites is not None:
+            liked = Exists(favourites.filter(product=OuterRef("pk")))
+        ad = self.get_queryset().filter(slug=self.kwargs["slug"]).annotate(liked=liked).first()
+        if ad is None:
+            return None
+        self.validated_object = ad
+        # The category name and the seller with their address are part of the body too; the
+        # seller's stamp is bumped by the same signals that invalidate "seller:<pk>".
+        validators = collection_validators(
+            "categories",
+            f"seller:{ad.seller_id}",
+            parts=("ad", ad.pk, ad.updated_time.isoformat(), ad.view_count, ad.liked),
+        )
+        if validators is None:
+            return None
+        parts, related_modified = validators
+        return parts, max(ad.updated_time, related_modified)
+
+    def not_modified(self, request):
+        record_view(self.validated_object.pk, viewer_key(request))
 
     @swagger_auto_schema(
         operation_summary="Get ad details",
-        operation_description="Returns full detail of an ad by slug.",
+        operation_description=(
+            "Returns full detail of an ad by slug and counts a view. Each viewer is counted once "
+            "per 30 minutes; `view_count` catches up when the recorded views are flushed."
+        ),
         responses={200: ad_detail_response},
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        record_view(instance.pk, viewer_key(request))
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
 
 @custom_response
-class CategoriesWithChildrenView(generics.ListAPIView):
-    queryset = Category.objects.filter(parent__isnull=True)
+class CategoriesWithChildrenView(ConditionalGetMixin, generics.ListAPIView):
+    queryset = Category.objects.filter(parent__isnull=True).prefetch_related("child")
     serializer_class = CategoryWithChildrenSerializer
 
+    def get_validators(self, request):
+        return collection_validators("categories")
+
+    def list(self, request, *args, **kwargs):
+        # Same shape as CategoryWithChildrenSerializer, from the versioned tree cache.
+        return Response(render_tree(get_category_tree(get_language()), request))
+
     @swagger_auto_schema(
         operation_summary="Get parent categories with children",
         operation_description="Returns a list of top-level categories including their child categories.",
@@ -114,8 +195,14 @@ class CategoriesWithChildrenView(generics.ListAPIView):
 
 
 @custom_response
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ResponseCacheMixin, ConditionalGetMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
+    cache_timeout = 10 * 60
+    cache_tags = ("categories", "ads")
+
+    def get_validators(self, request):
+        # Product counts change with every ad.
+        return collection_validators("categories", "ads")
 
     @swagger_auto_schema(
         operation_summary="List all categories",
@@ -126,7 +213,9 @@ class CategoryListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Category.objects.annotate(product_count=Count("ad"))
+        return Category.objects.annotate(
+            product_count=Coalesce("ad_counter__ad_count", 0)
+        ).order_by("id")
 
 
 @custom_response
@@ -222,19 +311,48 @@ class FavouriteProductDeleteByIDView(generics.DestroyAPIView):
 
 
 @custom_response
-class AdListView(generics.ListAPIView):
-    queryset = Ad.objects.all()
+class AdListView(ResponseCacheMixin, generics.ListAPIView):
+    queryset = Ad.objects.select_related("seller__address", "cover_photo")
     serializer_class = AdListSerializer
     pagination_class = AdListPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, AdSearchFilter]
     filterset_class = AdFilter
-    search_fields = ["name"]
     ordering_fields = ["published_at", "price", "view_count"]
     ordering = ["-published_at"]
+    uncached_params = ("device_id",)
+
+    def get_cache_tags(self, request, response):
+        # Any saved ad can move into a page; sellers are shown on every card.
+        sellers = {ad["seller"]["id"] for ad in response.data["results"] if ad["seller"]}
+        return ["ads", *(f"seller:{pk}" for pk in sellers)]
+
+    def list(self, request, *args, **kwargs):
+        # AdListSerializer's output. The page reads only the ids and the columns it is ordered
+        # and paginated by; the cards come from store.fragments.
+        queryset = self.filter_queryset(self.get_queryset()).values("id", *self.ordering_fields)
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        cards = personalize_ad_cards(ad_fragments("card", [row["id"] for row in rows]), request)
+        if page is not None:
+            return self.get_paginated_response(cards)
+        return Response(cards)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if params.get("pagination") == "cursor" or "cursor" in params:
+                self._paginator = AdListCursorPagination()
+            else:
+                self._paginator = AdListPagination()
+        return self._paginator
 
     @swagger_auto_schema(
         operation_summary="List of ads",
-        operation_description="Returns a paginated list of ads. Supports filtering, search, and ordering.",
+        operation_description=(
+            "Returns a paginated list of ads. Supports filtering, search, and ordering. "
+            "Pass `pagination=cursor` to get `next`/`previous` cursor links instead of page numbers."
+        ),
         manual_parameters=ad_list_parameters,
         responses={200: openapi.Response("List of Ads", ad_list_response)},
     )
@@ -251,7 +369,16 @@ class MyAdsListAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Ad.objects.filter(seller=user).order_by("-published_at")
+        return (
+            Ad.objects.filter(seller=user).select_related("cover_photo").order_by("-published_at")
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = my_ad_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(render_my_ads(page, request))
+        return Response(render_my_ads(queryset, request))
 
     @swagger_auto_schema(
         operation_summary="List My Ads",
@@ -306,8 +433,21 @@ class MyAdDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+class FavouriteCardListMixin:
+    def list(self, request, *args, **kwargs):
+        # FavouriteProductListSerializer's output, with the cards from store.fragments.
+        queryset = self.filter_queryset(self.get_queryset()).values("id", "product_id")
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        cards = ad_fragments("favourite", [row["product_id"] for row in rows])
+        cards = personalize_favourites(cards, request)
+        if page is not None:
+            return self.get_paginated_response(cards)
+        return Response(cards)
+
+
 @custom_response
-class MyFavouriteProductView(generics.ListAPIView):
+class MyFavouriteProductView(FavouriteCardListMixin, generics.ListAPIView):
     serializer_class = FavouriteProductListSerializer
     pagination_class = MyFavouriteProductPagination
     permission_classes = [IsSeller]
@@ -317,11 +457,7 @@ class MyFavouriteProductView(generics.ListAPIView):
         queryset = FavouriteProduct.objects.filter(user=self.request.user)
         if category_id:
             queryset = queryset.filter(product__category_id=category_id)
-        return (
-            queryset.select_related("product", "product__seller")
-            .prefetch_related("product__photos")
-            .order_by("-id")
-        )
+        return queryset.select_related("product__seller", "product__cover_photo").order_by("-id")
 
     @swagger_auto_schema(
         operation_summary="List My Favourite Products",
@@ -341,7 +477,7 @@ class MyFavouriteProductView(generics.ListAPIView):
 
 
 @custom_response
-class MyFavouriteProductByIdView(generics.ListAPIView):
+class MyFavouriteProductByIdView(FavouriteCardListMixin, generics.ListAPIView):
     serializer_class = FavouriteProductListSerializer
     pagination_class = MyFavouriteProductPagination
 
@@ -349,8 +485,7 @@ class MyFavouriteProductByIdView(generics.ListAPIView):
         device_id = self.request.query_params.get("device_id")
         return (
             FavouriteProduct.objects.filter(device_id=device_id)
-            .select_related("product", "product__seller")
-            .prefetch_related("product__photos")
+            .select_related("product__seller", "product__cover_photo")
             .order_by("-id")
         )
 
@@ -412,7 +547,11 @@ class MySearchListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return MySearch.objects.filter(user=self.request.user).order_by("-created_at")
+        return (
+            MySearch.objects.filter(user=self.request.user)
+            .select_related("category")
+            .order_by("-created_at")
+        )
 
 
 @custom_response
@@ -466,33 +605,32 @@ class ProductImageCreateView(generics.CreateAPIView):
 @custom_response
 class CategoryProductSearchView(generics.ListAPIView):
     serializer_class = SearchProductSerializer  # swagger uchun default
+    pagination_class = CategoryProductSearchPagination
 
-    def get_queryset(self):
+    def get_sections(self):
         q = self.request.query_params.get("q", "")
-        categories = list(Category.objects.filter(name__icontains=q))
-        products = list(
-            Ad.objects.filter(Q(name__icontains=q) | Q(description__icontains=q), status="active")
-        )
-        return categories + products
+        categories = search_categories(Category.objects.all(), q)
+        products = search_ads(Ad.objects.filter(status="active"), q).select_related("cover_photo")
+        return [(categories, "id"), (products, "-published_at")]
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        results = []
-
-        for obj in queryset:
-            if isinstance(obj, Category):
-                results.append(
-                    SearchCategorySerializer(obj, context=self.get_serializer_context()).data
-                )
-            else:
-                results.append(
-                    SearchProductSerializer(obj, context=self.get_serializer_context()).data
-                )
-        return Response(results)
+        page = self.paginator.paginate_sections(self.get_sections(), request)
+        context = self.get_serializer_context()
+        categories = [obj for obj in page if isinstance(obj, Category)]
+        products = [obj for obj in page if not isinstance(obj, Category)]
+        results = [
+            *SearchCategorySerializer(categories, many=True, context=context).data,
+            *SearchProductSerializer(products, many=True, context=context).data,
+        ]
+        return self.get_paginated_response(results)
 
     @swagger_auto_schema(
         operation_summary="Search Products and Categories",
-        operation_description="Search for products and categories by a query string `q`. Returns a combined list of matching categories and products.",
+        operation_description=(
+            "Search for products and categories by a query string `q`. Returns matching "
+            "categories first, then matching products, newest first, one page at a time; "
+            "follow `next` for the following page."
+        ),
         manual_parameters=[
             openapi.Parameter(
                 "q",
@@ -500,7 +638,21 @@ class CategoryProductSearchView(generics.ListAPIView):
                 description="Search query string",
                 required=False,
                 type=openapi.TYPE_STRING,
-            )
+            ),
+            openapi.Parameter(
+                "page_size",
+                openapi.IN_QUERY,
+                description="Results per page (default 20, max 100)",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Opaque cursor taken from `next`",
+                required=False,
+                type=openapi.TYPE_STRING,
+            ),
         ],
         responses={200: search_product_response},  # openapi_schema.py dagi response
     )
@@ -512,20 +664,21 @@ class CategoryProductSearchView(generics.ListAPIView):
 class SearchCompleteView(generics.ListAPIView):
     serializer_class = SearchCompleteSerializer
 
-    def get_queryset(self):
-        q = self.request.query_params.get("q", "")
-        return Ad.objects.filter(
-            Q(name__icontains=q) | Q(description__icontains=q), status="active"
-        ).order_by("name")
+    queryset = Ad.objects.filter(status="active").select_related("cover_photo")
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        results = SearchCompleteSerializer(queryset, many=True).data
+        q = request.query_params.get("q", "")
+        limit = autocomplete_limit(request.query_params.get("limit"))
+        ads = autocomplete_ads(self.get_queryset(), q, limit=limit)
+        results = SearchCompleteSerializer(ads, many=True).data
         return Response(results)
 
     @swagger_auto_schema(
         operation_summary="Search Autocomplete",
-        operation_description="Provides a list of products matching the search query `q` for autocomplete suggestions.",
+        operation_description=(
+            "Provides up to `limit` products whose name starts with, or contains words starting "
+            "with, the search query `q`. The most searched products come first."
+        ),
         manual_parameters=[
             openapi.Parameter(
                 "q",
@@ -533,7 +686,15 @@ class SearchCompleteView(generics.ListAPIView):
                 description="Search query string",
                 required=False,
                 type=openapi.TYPE_STRING,
-            )
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description=f"Number of suggestions (default {AUTOCOMPLETE_LIMIT}, "
+                f"max {AUTOCOMPLETE_MAX_LIMIT})",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
         ],
         responses={200: search_complete_response},
     )
@@ -541,6 +702,45 @@ class SearchCompleteView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
+@custom_response
+class SearchSuggestionView(generics.ListAPIView):
+    serializer_class = SearchSuggestionSerializer
+
+    def list(self, request, *args, **kwargs):
+        q = request.query_params.get("q", "")
+        limit = autocomplete_limit(request.query_params.get("limit"))
+        suggestions = get_suggestion_index().lookup(q, get_language(), limit=limit)
+        return Response(SearchSuggestionSerializer(suggestions, many=True).data)
+
+    @swagger_auto_schema(
+        operation_summary="Search Suggestions",
+        operation_description=(
+            "Suggests saved search queries and product names starting with `q`, served from an "
+            "in-memory index without touching the database."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Search query string",
+                required=False,
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description=f"Number of suggestions (default {AUTOCOMPLETE_LIMIT}, "
+                f"max {AUTOCOMPLETE_MAX_LIMIT})",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={200: search_suggestion_response},
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
 @custom_response
 class SearchCountIncreaseView(generics.RetrieveAPIView):
     serializer_class = SearchCountSerializer
@@ -548,17 +748,25 @@ class SearchCountIncreaseView(generics.RetrieveAPIView):
 
     def get_object(self):
         product_id = self.kwargs["category_id"]
-        product = get_object_or_404(Ad, id=product_id)
-
-        search_count, created = SearchCount.objects.get_or_create(product=product)
-        search_count.search_count += 1
-        search_count.save()
-
-        return search_count
+        try:
+            total, category_id, region_id = increment_search_count(product_id)
+        except Ad.DoesNotExist:
+            raise Http404
+        record_search(product_id, category_id, region_id)
+
+        # Built from Redis only; SearchCount rows are written by flush_search_counts.
+        return SearchCount(
+            product=Ad(id=product_id, category_id=category_id),
+            search_count=total,
+            updated_at=timezone.now(),
+        )
 
     @swagger_auto_schema(
         operation_summary="Increase Category Search Count",
-        operation_description="Increment the search count for a category by its ID.",
+        operation_description=(
+            "Increment the search count for a product by its ID. Counts are kept in Redis and "
+            "written to the database periodically."
+        ),
         manual_parameters=[
             openapi.Parameter(
                 "category_id",
@@ -575,11 +783,22 @@ class SearchCountIncreaseView(generics.RetrieveAPIView):
 
 
 @custom_response
-class PopularsView(generics.ListAPIView):
+class PopularsView(ResponseCacheMixin, generics.ListAPIView):
     serializer_class = PopularSearchSerializer
 
+    def get_cache_tags(self, request, response):
+        # New searches only show after the timeout; edited ads right away.
+        return [f"ad:{row['id']}" for row in response.data]
+
     def get_queryset(self):
-        return SearchCount.objects.select_related("product").order_by("-search_count")
+        params = self.request.query_params
+        products = popular_products(
+            popular_window(params.get("window")),
+            popular_limit(params.get("limit")),
+            category_id=scope_id(params.get("category_id")),
+            region_id=scope_id(params.get("region_id")),
+        )
+        return [SearchCount(product=ad, search_count=round(score)) for ad, score in products]
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -588,7 +807,42 @@ class PopularsView(generics.ListAPIView):
 
     @swagger_auto_schema(
         operation_summary="List Popular Products",
-        operation_description="Returns a list of products ordered by the number of searches in descending order.",
+        operation_description=(
+            "Returns the most searched products of a window, best first. `day` and `week` rank "
+            "by a score that halves every day or week, `all` by the all-time search count."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "window",
+                openapi.IN_QUERY,
+                description="Ranking window",
+                required=False,
+                type=openapi.TYPE_STRING,
+                enum=[*WINDOWS],
+                default=DEFAULT_WINDOW,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Maximum number of products (default 20, max 100)",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "category_id",
+                openapi.IN_QUERY,
+                description="Only products of this category",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "region_id",
+                openapi.IN_QUERY,
+                description="Only products of sellers in this region",
+                required=False,
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
         responses={200: popular_search_response},  # openapi_schema.py dagi response
     )
     def get(self, request, *args, **kwargs):
@@ -596,14 +850,20 @@ class PopularsView(generics.ListAPIView):
 
 
 @custom_response
-class SubCategoryListView(generics.ListAPIView):
+class SubCategoryListView(ResponseCacheMixin, ConditionalGetMixin, generics.ListAPIView):
     serializer_class = SubCategorySerializer
+    cache_timeout = 10 * 60
+    cache_tags = ("categories", "ads")
+
+    def get_validators(self, request):
+        return collection_validators("categories", "ads")
 
     def get_queryset(self):
         parent_id = self.request.query_params.get("parent__id")
+        queryset = Category.objects.annotate(product_count=Coalesce("ad_counter__ad_count", 0))
         if parent_id:
-            return Category.objects.filter(parent_id=parent_id)
-        return Category.objects.filter(parent__isnull=False)
+            return queryset.filter(parent_id=parent_id)
+        return queryset.filter(parent__isnull=False)
 
     @swagger_auto_schema(
         operation_summary="List Subcategories",
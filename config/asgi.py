@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
 
 application = get_asgi_application()
+
+from store.suggestions import warm_up_suggestion_index  # noqa: E402
+
+warm_up_suggestion_index()
@@ -0,0 +1,23 @@
+import os
+
+from celery import Celery, Task
+from django.db import InterfaceError, OperationalError
+from redis.exceptions import ConnectionError, TimeoutError
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
+
+
+class RetryingTask(Task):
+    # Lost connections to Redis or PostgreSQL are retried with a growing, jittered delay; any
+    # other error fails the task at once.
+    autoretry_for = (ConnectionError, TimeoutError, OperationalError, InterfaceError)
+    retry_backoff = True
+    retry_backoff_max = 5 * 60
+    retry_jitter = True
+    max_retries = 5
+
+
+app = Celery("config", task_cls=RetryingTask)
+# Every CELERY_* setting, e.g. CELERY_TASK_ROUTES for task_routes.
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -1,40 +1,66 @@
-import json
-import logging
+import functools
 
 from django.conf import settings
 from django.utils import translation
 from django.utils.deprecation import MiddlewareMixin
 
-logger = logging.getLogger(__name__)
+# Longer Accept-Language values are not parsed, as in Django's own negotiation.
+MAX_HEADER_LENGTH = 500
 
 
-class APILanguageMiddleware(MiddlewareMixin):
-
-    def process_request(self, request):
-        language = request.META.get("HTTP_ACCEPT_LANGUAGE")
+@functools.lru_cache(maxsize=512)
+def negotiate_language(header, supported):
+    """
+    The supported language the ``Accept-Language`` ``header`` prefers most, or ``None``.
+    Tags are tried by descending q-value, then by their primary subtag (``ru-RU`` is ``ru``);
+    ``q=0`` excludes a tag. Cached, since clients send a handful of distinct values.
+    """
+    if len(header) > MAX_HEADER_LENGTH:
+        return None
+    ranges = []
+    for position, item in enumerate(header.split(",")):
+        tag, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params:
+            name, _, value = params.partition("=")
+            try:
+                quality = float(value) if name.strip() == "q" else 1.0
+            except ValueError:
+                continue
+        if tag and quality > 0:
+            ranges.append((-quality, position, tag.strip().lower()))
 
-        if not language:
-            language = request.GET.get("lang")
+    for _, _, tag in sorted(ranges):
+        for candidate in (tag, tag.split("-")[0]):
+            if candidate in supported:
+                return candidate
+    return None
 
-        if not language and request.method == "POST":
-            language = request.POST.get("lang")
 
-        if not language and request.content_type == "application/json":
-            if hasattr(request, "body"):
-                try:
-                    data = json.loads(request.body.decode("utf-8"))
-                    language = data.get("lang")
-                except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                    logger.warning(f"JSON parse error in language middleware: {e}")
+class APILanguageMiddleware(MiddlewareMixin):
+    """
+    Picks the response language from ``Accept-Language``, else from the ``lang`` query
+    parameter, else ``LANGUAGE_CODE``. The request body is never read, so uploads and large
+    JSON bodies are not buffered before the view runs.
+    """
 
-        if not language:
-            language = settings.LANGUAGE_CODE
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.supported = tuple(code for code, _ in settings.LANGUAGES)
 
-        supported_languages = [lang[0] for lang in settings.LANGUAGES]
-        if language not in supported_languages:
-            language = settings.LANGUAGE_CODE
+    def process_request(self, request):
+        language = None
+        header = request.META.get("HTTP_ACCEPT_LANGUAGE")
+        if header:
+            language = negotiate_language(header, self.supported)
+        if language is None:
+            language = request.GET.get("lang")
+            if language not in self.supported:
+                language = settings.LANGUAGE_CODE
 
-        translation.activate(language)
+        if translation.get_language() != language:
+            translation.activate(language)
         request.LANGUAGE_CODE = language
 
     def process_response(self, request, response):
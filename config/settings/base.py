@@ -160,6 +160,38 @@ CACHES = {
     }
 }
 
+# Celery (see config/celery.py)
+# Under ``manage.py test`` tasks run in the calling process and the broker is in memory, so
+# neither a worker nor a second Redis database is needed.
+TESTING = sys.argv[1:2] == ["test"]
+CELERY_BROKER_URL = os.environ.get(
+    "CELERY_BROKER_URL", "memory://" if TESTING else f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+)
+CELERY_TASK_ALWAYS_EAGER = TESTING or os.environ.get("CELERY_TASK_ALWAYS_EAGER") == "true"
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_IGNORE_RESULT = True
+# A task interrupted by a lost worker is delivered again, which every task allows: view count
+# flushes skip batches whose flush id was already applied (store.buffers), search count flushes
+# and popularity snapshots write absolute values, and a photo is just rendered again. Photos
+# the lost worker had already taken off the queue wait for ``process_renditions --missing``.
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_TIME_LIMIT = 10 * 60
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "store.renditions.*": {"queue": "media"},
+    "store.tasks.*": {"queue": "counters"},
+}
+CELERY_BEAT_SCHEDULE = {
+    "flush-view-counts": {"task": "store.tasks.flush_view_counts", "schedule": 60},
+    "flush-search-counts": {"task": "store.tasks.flush_search_counts", "schedule": 60},
+    "snapshot-popular-searches": {
+        "task": "store.tasks.snapshot_popular_searches",
+        "schedule": 15 * 60,
+    },
+}
+
 # Django Rest Framework configurations
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
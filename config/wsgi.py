@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
 
 application = get_wsgi_application()
+
+from store.suggestions import warm_up_suggestion_index  # noqa: E402
+
+warm_up_suggestion_index()